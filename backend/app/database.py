@@ -4,6 +4,28 @@ from fastapi import FastAPI, Request, HTTPException
 from fastapi.requests import HTTPConnection 
 from app.config import settings
 
+async def add_column_if_missing(cursor, table, column, definition):
+    """Idempotent ALTER for tables created before a column was added"""
+    await cursor.execute(
+        """SELECT COUNT(*) FROM information_schema.COLUMNS
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s""",
+        (table, column)
+    )
+    (exists,) = await cursor.fetchone()
+    if not exists:
+        await cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+async def add_index_if_missing(cursor, table, index, columns):
+    """Idempotent CREATE INDEX for tables created before the index was added"""
+    await cursor.execute(
+        """SELECT COUNT(*) FROM information_schema.STATISTICS
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s""",
+        (table, index)
+    )
+    (exists,) = await cursor.fetchone()
+    if not exists:
+        await cursor.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+
 async def init_db(pool):
     """Initialize MySQL tables - FULL PRODUCTION SCHEMA"""
     async with pool.acquire() as conn:
@@ -33,6 +55,7 @@ async def init_db(pool):
                     csv_schema TEXT NOT NULL,
                     expected_features INT NOT NULL,
                     target_column VARCHAR(100) DEFAULT 'target',
+                    holdout_path VARCHAR(500) NULL,
                     
                     num_rounds INT DEFAULT 20,
                     local_epochs INT DEFAULT 5,
@@ -52,6 +75,8 @@ async def init_db(pool):
                     FOREIGN KEY (owner_id) REFERENCES users(id) ON DELETE CASCADE
                 )
             ''')
+            # Migration: optional holdout CSV the FL server evaluates global models on
+            await add_column_if_missing(cursor, "projects", "holdout_path", "VARCHAR(500) NULL")
             
             # 3. Training Sessions (MERGED & FIXED)
             # Contains both project_id linkage AND the new final_strategy column
@@ -64,9 +89,13 @@ async def init_db(pool):
                     completed_at TIMESTAMP NULL,
                     total_rounds INT DEFAULT 20,
                     final_strategy VARCHAR(50) DEFAULT 'FedAvg',
+                    server_port INT NULL,
+                    INDEX idx_sessions_status_project (status, project_id),
                     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
                 )
             ''')
+            # Migration: sessions now run concurrently, each on its own Flower port
+            await add_column_if_missing(cursor, "training_sessions", "server_port", "INT NULL")
             # # --- MIGRATION HELP (Optional but recommended) ---
             # # If you already have a table without 'final_strategy', this adds it safely.
             # try:
@@ -103,11 +132,19 @@ async def init_db(pool):
                     accuracy FLOAT,
                     loss FLOAT,
                     client_metrics TEXT,
+                    eval_accuracy FLOAT NULL,
+                    eval_loss FLOAT NULL,
+                    timings TEXT NULL,
                     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (session_id) REFERENCES training_sessions(id) ON DELETE CASCADE,
                     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
                 )
             ''')
+            # Migration: server-side holdout evaluation of each round's global model
+            await add_column_if_missing(cursor, "metrics", "eval_accuracy", "FLOAT NULL")
+            await add_column_if_missing(cursor, "metrics", "eval_loss", "FLOAT NULL")
+            # Migration: per-round timing breakdown reported by the FL server
+            await add_column_if_missing(cursor, "metrics", "timings", "TEXT NULL")
             
             # 6. Centralized Results
             await cursor.execute('''
@@ -147,6 +184,76 @@ async def init_db(pool):
                 );
             """)
             
+            # 9. Dataset Catalog (profiled once at upload, revalidated by size/mtime)
+            await cursor.execute('''
+                CREATE TABLE IF NOT EXISTS dataset_catalog (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    filename VARCHAR(255) NOT NULL,
+                    size_bytes BIGINT NOT NULL,
+                    mtime DOUBLE NOT NULL,
+                    num_rows INT NOT NULL,
+                    num_columns INT NOT NULL,
+                    sha256 CHAR(64) NOT NULL,
+                    column_stats MEDIUMTEXT,
+                    file_created TIMESTAMP NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    UNIQUE KEY unique_dataset_file (filename),
+                    INDEX idx_catalog_sha256 (sha256)
+                )
+            ''')
+            
+            # 10. Model Versions (registry of every stored global/centralized model)
+            await cursor.execute('''
+                CREATE TABLE IF NOT EXISTS model_versions (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    kind VARCHAR(20) NOT NULL,
+                    filename VARCHAR(255) NOT NULL,
+                    path VARCHAR(500) NOT NULL,
+                    session_id INT NULL,
+                    project_id INT NULL,
+                    round INT NULL,
+                    strategy VARCHAR(50) NULL,
+                    parent_id INT NULL,
+                    size_bytes BIGINT NOT NULL,
+                    sha256 CHAR(64) NOT NULL,
+                    accuracy FLOAT NULL,
+                    loss FLOAT NULL,
+                    eval_accuracy FLOAT NULL,
+                    eval_loss FLOAT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE KEY unique_model_file (filename),
+                    INDEX idx_versions_kind_project (kind, project_id, id),
+                    INDEX idx_versions_session_round (session_id, round)
+                )
+            ''')
+            # Migration: retention (app/services/retention.py) marks rounds it delta-encoded or pruned
+            await add_column_if_missing(cursor, "model_versions", "storage", "VARCHAR(10) NOT NULL DEFAULT 'file'")
+            await add_column_if_missing(cursor, "model_versions", "delta_base_id", "INT NULL")
+            await add_column_if_missing(cursor, "model_versions", "stored_bytes", "BIGINT NULL")
+            
+            # 11. Client Round Metrics (one row per client per round, written in bulk by /api/training/metrics/batch;
+            #     unique key serves per-session/round queries, idx_client_rounds_client per-client ones)
+            await cursor.execute('''
+                CREATE TABLE IF NOT EXISTS client_round_metrics (
+                    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                    session_id INT NOT NULL,
+                    round INT NOT NULL,
+                    client_id VARCHAR(255) NOT NULL,
+                    accuracy FLOAT NULL,
+                    loss FLOAT NULL,
+                    num_examples INT NULL,
+                    fit_seconds FLOAT NULL,
+                    bytes_sent BIGINT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE KEY unique_client_round (session_id, round, client_id),
+                    INDEX idx_client_rounds_client (client_id, session_id, round),
+                    FOREIGN KEY (session_id) REFERENCES training_sessions(id) ON DELETE CASCADE
+                )
+            ''')
+            # Migration: one client's trajectory across rounds/sessions without scanning every session
+            await add_index_if_missing(cursor, "client_round_metrics", "idx_client_rounds_client",
+                                       "client_id, session_id, round")
+            
             # Insert default admin
             await cursor.execute('''
                 INSERT IGNORE INTO users (email, hashed_password, full_name, role) 
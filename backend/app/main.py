@@ -1,4 +1,6 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import WebSocket, WebSocketDisconnect
@@ -6,13 +8,34 @@ from fastapi import WebSocket, WebSocketDisconnect
 # Import our implementation parts
 from app.database import lifespan
 from app.socket_manager import manager
-from app.routers import auth, training, metrics, clients, models, projects
+from app.services.jobs import job_queue
+from app.services.blobs import adopt_existing
+from app.services.model_registry import backfill as backfill_registry
+from app.services.retention import model_retention
+from app.routers import auth, training, metrics, clients, models, projects, export
 
 # Create directories
 os.makedirs("models", exist_ok=True)
 os.makedirs("datasets", exist_ok=True)
 
-app = FastAPI(title="Federated Learning API", lifespan=lifespan)
+@asynccontextmanager
+async def app_lifespan(app: FastAPI):
+    async with lifespan(app):
+        # Hash, dedupe and register pre-existing models/datasets without delaying startup
+        async def catch_up():
+            await asyncio.to_thread(adopt_existing)
+            await backfill_registry(app.state.pool)
+        startup = asyncio.create_task(catch_up())
+        # Prune/delta-encode finished sessions' intermediate checkpoints (MODEL_RETENTION_INTERVAL=0 turns it off)
+        retention = asyncio.create_task(model_retention.loop(app.state.pool)) if model_retention.interval > 0 else None
+        yield
+        startup.cancel()
+        if retention:
+            retention.cancel()
+    # Stop centralized training workers (running jobs are asked to cancel)
+    job_queue.shutdown()
+
+app = FastAPI(title="Federated Learning API", lifespan=app_lifespan)
 
 origins = [
     "http://139.59.87.244:5173",  # DigitalOcean Frontend access (if frontend is hosted on the same server)
@@ -39,6 +62,7 @@ app.include_router(metrics.router)
 app.include_router(clients.router)
 app.include_router(models.router)
 app.include_router(projects.router) 
+app.include_router(export.router)
 
 # WebSocket Endpoint
 @app.websocket("/ws")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field ,EmailStr
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Union
 from enum import Enum
 
 # --- Auth Models ---
@@ -32,12 +32,33 @@ class UserResponse(BaseModel):
 
 # --- Metrics Models ---
 class MetricsReport(BaseModel):                     # DONE ( fl-server --> here -->frontend )
+    session_id: Optional[int] = None                # set by the FL server; None = the newest training session
+    project_id: Optional[int] = None
     round: int = Field(..., gt=0)                   #  "round": 2,
     num_clients: int = Field(..., gt=0)             # "num_clients": 3,
     accuracy: float = Field(..., ge=0.0, le=1.0)    # "accuracy": 0.88,
     loss: float = Field(..., ge=0.0)                # "loss": 0.22,
     client_metrics: Dict[str, List[float]]          # "client_metrics": {"accuracies": [0.8, 0.85, 0.9]}
     timestamp: str                                  # "timestamp": "2026-02-12T16:45:00.123456"
+    client_latencies: Dict[str, float] = {}         # "client_latencies": {"hospital_a": 12.4} (seconds to return fit)
+    stragglers: List[str] = []                      # "stragglers": ["hospital_c"] (missed the round deadline)
+    eval_accuracy: Optional[float] = Field(None, ge=0.0, le=1.0)  # server-side holdout score of the new global model
+    eval_loss: Optional[float] = Field(None, ge=0.0)
+    timings: Dict[str, Union[float, Dict[str, float]]] = {}  # "timings": {"configure_fit": 0.01, "fit_clients": 12.8, ..., "client_fit": {"hospital_a": 11.9}}
+
+class ClientRoundMetrics(BaseModel):                # one client's fit result in one round ( fl-server --> here )
+    round: int = Field(..., gt=0)
+    client_id: str = Field(..., min_length=1, max_length=255)  # "hospital_a"
+    accuracy: Optional[float] = Field(None, ge=0.0, le=1.0)
+    loss: Optional[float] = Field(None, ge=0.0)
+    num_examples: Optional[int] = Field(None, ge=0)
+    fit_seconds: Optional[float] = Field(None, ge=0.0)       # client-reported model.fit time
+    bytes_sent: Optional[int] = Field(None, ge=0)            # size of the client's uploaded update
+
+class MetricsBatch(BaseModel):                      # fl-server background reporter --> here
+    session_id: Optional[int] = None                # applies to every report and client record in the batch
+    reports: List[MetricsReport] = []
+    client_records: List[ClientRoundMetrics] = []
 
 
 class ClientRegistration(BaseModel):
@@ -47,11 +68,16 @@ class ClientRegistration(BaseModel):
 class FedStrategy(str, Enum):
     FEDAVG = "FedAvg"
     FEDPROX = "FedProx"
+    FEDBUFF = "FedBuff"    # buffered asynchronous aggregation; metrics are per model version
 
 class VoteRequest(BaseModel):
     project_id: int
     client_id: str
-    strategy: FedStrategy  # "FedAvg" or "FedProx"
+    strategy: FedStrategy  # "FedAvg", "FedProx" or "FedBuff"
+
+class SessionServer(BaseModel):                     # FL server --> here (where a session's Flower server listens)
+    port: int = Field(..., gt=0, lt=65536)
+    host: Optional[str] = None                      # public host for clients; None = same host as the API
 
 class TrainingMode(BaseModel):
     mode: str 
@@ -0,0 +1,149 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from app.database import get_db_conn
+from datetime import datetime
+from decimal import Decimal
+from typing import AsyncIterator, List, Optional
+import aiomysql
+import csv
+import io
+import json
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+EXPORT_BATCH_ROWS = 500     # Rows pulled from the server-side cursor per fetchmany()
+
+# Exportable tables. "project" says how a project_id filter applies: the table's own column,
+# or through its session (metrics rows written before session-keyed ingest have no project_id)
+EXPORTS = {
+    "metrics": {
+        "columns": ("id", "session_id", "project_id", "round", "num_clients", "accuracy", "loss",
+                    "eval_accuracy", "eval_loss", "client_metrics", "timings", "timestamp"),
+        "json": ("client_metrics", "timings"),
+        "project": "session",
+    },
+    "client_round_metrics": {
+        "columns": ("id", "session_id", "round", "client_id", "accuracy", "loss", "num_examples",
+                    "fit_seconds", "bytes_sent", "created_at"),
+        "json": (),
+        "project": "session",
+    },
+    "centralized_results": {
+        "columns": ("id", "session_id", "project_id", "accuracy", "loss", "training_time", "timestamp"),
+        "json": (),
+        "project": "column",
+    },
+    "training_sessions": {
+        "columns": ("id", "project_id", "status", "started_at", "completed_at", "total_rounds",
+                    "final_strategy", "server_port"),
+        "json": (),
+        "project": "column",
+    },
+}
+
+# This router streams whole tables for offline analysis. Rows are read in id order (keyset), so
+# a page or an interrupted export resumes with after_id and nothing is held in memory at once.
+def export_spec(table: str) -> dict:
+    spec = EXPORTS.get(table)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown export '{table}' (one of {', '.join(EXPORTS)})")
+    return spec
+
+def export_query(table: str, after_id: int, project_id: Optional[int], session_id: Optional[int],
+                 limit: Optional[int] = None):
+    """SELECT for rows with id > after_id in id order (primary-key range scan, no OFFSET)"""
+    spec = EXPORTS[table]
+    where, args = ["id > %s"], [after_id]
+    if session_id is not None:
+        where.append("id = %s" if table == "training_sessions" else "session_id = %s")
+        args.append(session_id)
+    if project_id is not None:
+        if spec["project"] == "column":
+            where.append("project_id = %s")
+        else:
+            where.append("session_id IN (SELECT id FROM training_sessions WHERE project_id = %s)")
+        args.append(project_id)
+
+    sql = f"SELECT {', '.join(spec['columns'])} FROM {table} WHERE {' AND '.join(where)} ORDER BY id ASC"
+    if limit is not None:
+        sql += " LIMIT %s"
+        args.append(limit)
+    return sql, tuple(args)
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def export_record(spec: dict, row) -> dict:
+    record = {column: _plain(value) for column, value in zip(spec["columns"], row)}
+    for column in spec["json"]:
+        if isinstance(record[column], str):
+            record[column] = json.loads(record[column])
+    return record
+
+async def ndjson_lines(spec: dict, batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    async for rows in batches:
+        yield "".join(json.dumps(export_record(spec, row)) + "\n" for row in rows).encode()
+
+async def csv_lines(spec: dict, batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(spec["columns"])
+    async for rows in batches:
+        # JSON columns stay as their stored text in CSV
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()  # Header of an empty export
+
+@router.get("/{table}/page")
+async def export_page(table: str, after_id: int = Query(0, ge=0), limit: int = Query(500, ge=1, le=5000),
+                      project_id: Optional[int] = None, session_id: Optional[int] = None,
+                      conn = Depends(get_db_conn)):
+    """One keyset page: rows with id > after_id; pass next_after_id back for the next page (null = done)"""
+    spec = export_spec(table)
+    sql, args = export_query(table, after_id, project_id, session_id, limit)
+    async with conn.cursor() as cursor:
+        await cursor.execute(sql, args)
+        rows = await cursor.fetchall()
+
+    items: List[dict] = [export_record(spec, row) for row in rows]
+    return {"items": items, "next_after_id": items[-1]["id"] if len(items) == limit else None}
+
+@router.get("/{table}")
+async def export_table(request: Request, table: str, format: str = "ndjson", after_id: int = Query(0, ge=0),
+                       project_id: Optional[int] = None, session_id: Optional[int] = None):
+    """Stream a whole table (optionally one project/session) as NDJSON or CSV, in constant memory"""
+    spec = export_spec(table)
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    sql, args = export_query(table, after_id, project_id, session_id)
+    pool = request.app.state.pool
+
+    async def batches():
+        # Own connection for the lifetime of the stream: the request's dependency connection is
+        # released before the body is sent. SSCursor leaves the result set on the server and
+        # hands rows over as they are read, instead of buffering all of them first.
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.SSCursor) as cursor:
+                await cursor.execute(sql, args)
+                while True:
+                    rows = await cursor.fetchmany(EXPORT_BATCH_ROWS)
+                    if not rows:
+                        break
+                    yield rows
+
+    scope = f"_project{project_id}" if project_id is not None else ""
+    scope += f"_session{session_id}" if session_id is not None else ""
+    if format == "csv":
+        body, media_type = csv_lines(spec, batches()), "text/csv"
+    else:
+        body, media_type = ndjson_lines(spec, batches()), "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{table}{scope}.{format}"'
+    })
@@ -1,117 +1,392 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from app.database import get_db_conn
 from app.socket_manager import manager
-from app.models.schemas import MetricsReport
+from app.session_notifier import notifier
+from app.routers.training import load_active_sessions
+from app.models.schemas import MetricsReport, MetricsBatch
+from app.services.model_registry import record_round_metrics, record_rounds_metrics
+from app.services.downsample import downsample, series_cache
+from datetime import datetime
+from typing import List, Optional
 import json
 
 router = APIRouter(tags=["metrics"])
 
+METRICS_INSERT = """INSERT INTO metrics 
+    (session_id, project_id, round, num_clients, accuracy, loss, client_metrics, eval_accuracy, eval_loss, timings, timestamp)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""
+
+# Re-sent records (reporter retries) overwrite instead of failing the whole batch on the unique key
+CLIENT_METRICS_INSERT = """INSERT INTO client_round_metrics
+    (session_id, round, client_id, accuracy, loss, num_examples, fit_seconds, bytes_sent)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE accuracy = VALUES(accuracy), loss = VALUES(loss), num_examples = VALUES(num_examples),
+                            fit_seconds = VALUES(fit_seconds), bytes_sent = VALUES(bytes_sent)"""
+
 # This router handles receiving metrics from the FL server and providing endpoints for the frontend to fetch metrics data.
-# metrics.py
-@router.post("/api/training/metrics")
-async def report_metrics(metrics: MetricsReport, conn = Depends(get_db_conn)):
-    async with conn.cursor() as cursor:
-        # We fetch the latest session and join with projects to get num_rounds
-        # based on your database.py schema for 'training_sessions' and 'projects'
-        await cursor.execute("""
-            SELECT ts.id, p.num_rounds 
-            FROM training_sessions ts
-            JOIN projects p ON ts.owner_id = p.owner_id 
-            WHERE ts.status = 'running' 
-            ORDER BY ts.id DESC LIMIT 1
-        """)
-        row = await cursor.fetchone()
-        
-        if not row:
+def client_metrics_blob(metrics: MetricsReport) -> dict:
+    """Per-client data stored in metrics.client_metrics (accuracies plus round-deadline timing)"""
+    blob = dict(metrics.client_metrics)
+    if metrics.client_latencies:
+        blob["latencies"] = metrics.client_latencies
+    if metrics.stragglers:
+        blob["stragglers"] = metrics.stragglers
+    return blob
+
+def metrics_row(session: dict, metrics: MetricsReport) -> tuple:
+    return (
+        session["session_id"], session["project_id"], metrics.round, metrics.num_clients,
+        metrics.accuracy, metrics.loss,
+        json.dumps(client_metrics_blob(metrics)),
+        metrics.eval_accuracy, metrics.eval_loss,
+        json.dumps(metrics.timings) if metrics.timings else None, metrics.timestamp
+    )
+
+async def resolve_session(conn, session_id: Optional[int]) -> dict:
+    """{"session_id", "project_id", "num_rounds"} of the session a report belongs to.
+
+    Served from the in-memory session table (start_training/complete_training keep
+    it current), so a report for a training session costs no query at all.
+    """
+    if not notifier.primed:
+        await notifier.prime(await load_active_sessions(conn))
+
+    if session_id is None:
+        # FL servers that don't send session_id yet: the newest session still training
+        active = notifier.active()
+        if not active:
             raise HTTPException(status_code=404, detail="No active training session found")
-        
-        session_id, total_rounds = row[0], row[1]
+        return active[-1]
+
+    session = notifier.sessions.get(session_id)
+    if session is not None:
+        return session
 
-        # Insertion logic using exactly your MetricsReport model
+    # Not training any more, e.g. the last round's report arriving after /complete
+    async with conn.cursor() as cursor:
         await cursor.execute(
-            """INSERT INTO metrics 
-               (session_id, round, num_clients, accuracy, loss, client_metrics, timestamp)
-               VALUES (%s, %s, %s, %s, %s, %s, %s)""",
-            (
-                session_id, metrics.round, metrics.num_clients,
-                metrics.accuracy, metrics.loss, 
-                json.dumps(metrics.client_metrics), metrics.timestamp
-            )
+            """SELECT ts.id, ts.project_id, p.num_rounds
+               FROM training_sessions ts LEFT JOIN projects p ON p.id = ts.project_id
+               WHERE ts.id = %s""",
+            (session_id,)
         )
+        row = await cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="No training session with this ID")
+    return {"session_id": row[0], "project_id": row[1], "num_rounds": row[2]}
 
-        # FIX: Use the 'num_rounds' from the database instead of hardcoded '5'
-        if metrics.round >= total_rounds:
-            await cursor.execute(
-                "UPDATE training_sessions SET status = 'completed' WHERE id = %s",
-                (session_id,)
-            )
+async def complete_on_last_round(cursor, session: dict, last_round: int) -> bool:
+    """Mark the session complete once its final round is reported; True if it was still training"""
+    if not session.get("num_rounds") or last_round < session["num_rounds"]:
+        return False
+    await cursor.execute(
+        "UPDATE training_sessions SET status='completed', completed_at=%s WHERE id=%s AND status='training'",
+        (datetime.utcnow(), session["session_id"])
+    )
+    return cursor.rowcount > 0
+
+async def store_metrics_report(cursor, session: dict, metrics: MetricsReport) -> bool:
+    """Insert one round report; returns True if it completed the session"""
+    # Insertion logic using exactly your MetricsReport model
+    await cursor.execute(METRICS_INSERT, metrics_row(session, metrics))
+
+    # The round's global model (registered by /api/model/save) gets its scores for "best model" lookups
+    await record_round_metrics(cursor, session["session_id"], metrics.round, metrics.accuracy, metrics.loss,
+                               metrics.eval_accuracy, metrics.eval_loss)
+
+    # FIX: Use the 'num_rounds' from the database instead of hardcoded '5'
+    return await complete_on_last_round(cursor, session, metrics.round)
+
+async def store_metrics_batch(conn, session: dict, batch: MetricsBatch) -> bool:
+    """Write a batch of round reports and per-client records in one transaction; True if it completed the session.
+
+    One multi-row INSERT per table (aiomysql turns executemany on an
+    INSERT ... VALUES into a single statement), so a round from hundreds of
+    clients costs a few round trips instead of one per record.
+    """
+    session_id = session["session_id"]
+    async with conn.cursor() as cursor:
+        await conn.begin()
+        try:
+            if batch.reports:
+                await cursor.executemany(METRICS_INSERT, [metrics_row(session, m) for m in batch.reports])
+                await record_rounds_metrics(cursor, [
+                    (m.accuracy, m.loss, m.eval_accuracy, m.eval_loss, session_id, m.round) for m in batch.reports
+                ])
+            if batch.client_records:
+                await cursor.executemany(CLIENT_METRICS_INSERT, [
+                    (session_id, r.round, r.client_id, r.accuracy, r.loss, r.num_examples, r.fit_seconds, r.bytes_sent)
+                    for r in batch.client_records
+                ])
+            completed = bool(batch.reports) and \
+                await complete_on_last_round(cursor, session, max(m.round for m in batch.reports))
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+    return completed
+
+# metrics.py
+@router.post("/api/training/metrics")
+async def report_metrics(metrics: MetricsReport, conn = Depends(get_db_conn)):
+    session = await resolve_session(conn, metrics.session_id)
+    async with conn.cursor() as cursor:
+        completed = await store_metrics_report(cursor, session, metrics)
+    if completed:
+        await notifier.finish([session["session_id"]])
     
-    # WebSocket broadcast remains the same
-    await manager.broadcast(json.dumps({"type": "metrics_update", "data": metrics.dict()}))
+    # Broadcast the dict itself; json.dumps here made the dashboard receive a double-encoded string
+    await manager.broadcast({"type": "metrics_update", "data": metrics.dict()})
     return {"status": "received"}
 
+# Called by the FL server's background reporter: rounds that queued up while the backend was slow, plus per-client records
+@router.post("/api/training/metrics/batch")
+async def report_metrics_batch(batch: MetricsBatch, conn = Depends(get_db_conn)):
+    if not batch.reports and not batch.client_records:
+        raise HTTPException(status_code=400, detail="Empty metrics batch")
+    session_ids = {m.session_id for m in batch.reports if m.session_id is not None}
+    if batch.session_id is not None:
+        session_ids.add(batch.session_id)
+    if len(session_ids) > 1:
+        raise HTTPException(status_code=400, detail="A metrics batch must belong to one session")
+
+    session = await resolve_session(conn, session_ids.pop() if session_ids else None)
+    if await store_metrics_batch(conn, session, batch):
+        await notifier.finish([session["session_id"]])
+
+    # One coalesced update for the whole batch instead of a message per round
+    await manager.broadcast({"type": "metrics_batch", "data": {
+        "session_id": session["session_id"],
+        "reports": [m.dict() for m in batch.reports],
+        "client_records": len(batch.client_records)
+    }})
+    return {"status": "received", "count": len(batch.reports), "client_records": len(batch.client_records)}
+
+
+
+METRIC_POINT_COLUMNS = "round, accuracy, loss, num_clients, timestamp, eval_accuracy, eval_loss"
+
+def metric_point(row) -> dict:
+    return {
+        "round": row[0],
+        "accuracy": float(row[1]) if row[1] else 0,
+        "loss": float(row[2]) if row[2] else 0,
+        "num_clients": row[3],
+        "timestamp": row[4],
+        "eval_accuracy": row[5],
+        "eval_loss": row[6],
+    }
+
+async def downsampled_session_metrics(cursor, session_id: int, max_points: int) -> dict:
+    """Min/max-bucketed series of a session, cached per (session, max_points); only rows newer than the cache are read"""
+    series = series_cache.get(session_id, max_points)
+    await cursor.execute(
+        f"SELECT id, {METRIC_POINT_COLUMNS} FROM metrics WHERE session_id = %s AND id > %s ORDER BY id ASC",
+        (session_id, series.last_id),
+    )
+    series.extend([{"id": row[0], **metric_point(row[1:])} for row in await cursor.fetchall()])
+    points = [{k: v for k, v in point.items() if k != "id"} for point in series.points()]
+    return {
+        "metrics": points,
+        "downsampled": {"rows": series.count, "points": len(points), "bucket_rounds": series.width}
+    }
 
+async def latest_session_id(cursor) -> Optional[int]:
+    await cursor.execute("SELECT id FROM training_sessions ORDER BY id DESC LIMIT 1")
+    row = await cursor.fetchone()
+    return row[0] if row else None
 
 # this endpoint can be used for historical metrics or for a specific session
 @router.get("/api/metrics")
-async def get_metrics(session_id: int = None, conn = Depends(get_db_conn)):
+async def get_metrics(session_id: int = None, max_points: Optional[int] = Query(None, ge=8, le=5000),
+                      conn = Depends(get_db_conn)):
     # this endpoint can be used for historical metrics or for a specific session
-    """Get training metrics"""
+    """Get training metrics (max_points: shape-preserving downsampling of one session, default latest)"""
     async with conn.cursor() as cursor:
+        if max_points:
+            session_id = session_id or await latest_session_id(cursor)
+            if session_id is None:
+                return {"metrics": []}
+            return await downsampled_session_metrics(cursor, session_id, max_points)
+
         if session_id:
             await cursor.execute(
-                """SELECT round, accuracy, loss, num_clients, timestamp 
+                f"""SELECT {METRIC_POINT_COLUMNS} 
                    FROM metrics WHERE session_id = %s ORDER BY round ASC""",
                 (session_id,),
             )
         else:
             await cursor.execute(
-                """SELECT round, accuracy, loss, num_clients, timestamp 
+                f"""SELECT {METRIC_POINT_COLUMNS} 
                    FROM metrics ORDER BY id DESC LIMIT 100"""
             )
         rows = await cursor.fetchall()
 
-    return {
-        "metrics": [
-            {
-                "round": row[0],
-                "accuracy": float(row[1]) if row[1] else 0,
-                "loss": float(row[2]) if row[2] else 0,
-                "num_clients": row[3],
-                "timestamp": row[4],
-            }
-            for row in rows
-        ]
-    }
+    return {"metrics": [metric_point(row) for row in rows]}
 
 # Endpoint to get latest metrics for the most recent session
 @router.get("/api/metrics/latest")
-async def get_latest_metrics(conn = Depends(get_db_conn)):
+async def get_latest_metrics(max_points: Optional[int] = Query(None, ge=8, le=5000), conn = Depends(get_db_conn)):
     """Get metrics for the latest session"""
     async with conn.cursor() as cursor:
-        await cursor.execute("SELECT id FROM training_sessions ORDER BY id DESC LIMIT 1")
-        row = await cursor.fetchone()
-
-        if not row:
+        session_id = await latest_session_id(cursor)
+        if session_id is None:
             return {"metrics": []}
+        if max_points:
+            return await downsampled_session_metrics(cursor, session_id, max_points)
 
-        session_id = row[0]
         await cursor.execute(
-            """SELECT round, accuracy, loss, num_clients, timestamp 
+            f"""SELECT {METRIC_POINT_COLUMNS} 
                FROM metrics WHERE session_id = %s ORDER BY round ASC""",
             (session_id,),
         )
         rows = await cursor.fetchall()
 
+    return {"metrics": [metric_point(row) for row in rows]}
+
+# Per-round timing breakdown, for charting where round time goes and comparing sessions
+@router.get("/api/metrics/timings")
+async def get_round_timings(session_id: List[int] = Query([]), conn = Depends(get_db_conn)):
+    """Timing breakdown of each round for one or more sessions (?session_id=1&session_id=2); default latest"""
+    async with conn.cursor() as cursor:
+        if not session_id:
+            await cursor.execute("SELECT id FROM training_sessions ORDER BY id DESC LIMIT 1")
+            row = await cursor.fetchone()
+            if not row:
+                return {"sessions": {}}
+            session_id = [row[0]]
+
+        placeholders = ", ".join(["%s"] * len(session_id))
+        await cursor.execute(
+            f"""SELECT session_id, round, timings FROM metrics
+                WHERE session_id IN ({placeholders}) AND timings IS NOT NULL
+                ORDER BY session_id ASC, round ASC""",
+            tuple(session_id),
+        )
+        rows = await cursor.fetchall()
+
+    sessions = {sid: {"rounds": [], "mean": {}} for sid in session_id}
+    for sid, round_number, timings in rows:
+        sessions[sid]["rounds"].append({"round": round_number, "timings": json.loads(timings)})
+
+    # Mean seconds per phase, so sessions (e.g. FedAvg vs FedBuff, AGG_WORKERS settings) compare at a glance
+    for summary in sessions.values():
+        totals = {}
+        for entry in summary["rounds"]:
+            for phase, seconds in entry["timings"].items():
+                if isinstance(seconds, (int, float)):
+                    totals.setdefault(phase, []).append(seconds)
+        summary["mean"] = {phase: sum(v) / len(v) for phase, v in totals.items()}
+
+    return {"sessions": sessions}
+
+# Per-client series in client_round_metrics that can be aggregated (whitelist: names go into the SQL text)
+CLIENT_METRIC_COLUMNS = ("accuracy", "loss", "num_examples", "fit_seconds", "bytes_sent")
+
+def _number(value):
+    # AVG over BIGINT columns comes back as Decimal
+    return float(value) if value is not None else None
+
+@router.get("/api/metrics/clients")
+async def get_client_summaries(session_id: Optional[int] = None, metric: str = "accuracy",
+                               percentile: List[float] = Query([50, 90]), conn = Depends(get_db_conn)):
+    """Per-client mean / spread / percentiles / per-round trend of one metric over a session (default latest)"""
+    if metric not in CLIENT_METRIC_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {', '.join(CLIENT_METRIC_COLUMNS)}")
+    if len(percentile) > 5 or any(not 0 < q <= 100 for q in percentile):
+        raise HTTPException(status_code=400, detail="Up to 5 percentiles, each in (0, 100]")
+
+    async with conn.cursor() as cursor:
+        if session_id is None:
+            await cursor.execute("SELECT id FROM training_sessions ORDER BY id DESC LIMIT 1")
+            row = await cursor.fetchone()
+            if not row:
+                return {"session_id": None, "metric": metric, "clients": []}
+            session_id = row[0]
+
+        # Everything is computed by MySQL over the (session_id, round, client_id) key: nearest-rank
+        # percentiles from ROW_NUMBER() within each client, trend = least-squares slope per round
+        percentile_columns = "".join(
+            ", MAX(CASE WHEN rn = GREATEST(CEIL(%s * n / 100), 1) THEN v END)" for _ in percentile
+        )
+        await cursor.execute(f"""
+            WITH ranked AS (
+                SELECT client_id, round, {metric} AS v,
+                       ROW_NUMBER() OVER (PARTITION BY client_id ORDER BY {metric}) AS rn,
+                       COUNT(*) OVER (PARTITION BY client_id) AS n
+                FROM client_round_metrics
+                WHERE session_id = %s AND {metric} IS NOT NULL
+            )
+            SELECT client_id, COUNT(*), AVG(v), MIN(v), MAX(v), STDDEV_POP(v), MIN(round), MAX(round),
+                   (COUNT(*) * SUM(round * v) - SUM(round) * SUM(v))
+                     / NULLIF(COUNT(*) * SUM(round * round) - SUM(round) * SUM(round), 0)
+                   {percentile_columns}
+            FROM ranked
+            GROUP BY client_id
+            ORDER BY client_id
+        """, (session_id, *percentile))
+        rows = await cursor.fetchall()
+
     return {
-        "metrics": [
+        "session_id": session_id,
+        "metric": metric,
+        "clients": [
             {
-                "round": row[0],
-                "accuracy": float(row[1]) if row[1] else 0,
-                "loss": float(row[2]) if row[2] else 0,
-                "num_clients": row[3],
-                "timestamp": row[4],
+                "client_id": row[0],
+                "rounds": row[1],
+                "mean": _number(row[2]),
+                "min": _number(row[3]),
+                "max": _number(row[4]),
+                "stddev": _number(row[5]),
+                "first_round": row[6],
+                "last_round": row[7],
+                "trend": _number(row[8]),   # change per round
+                "percentiles": {f"{q:g}": _number(value) for q, value in zip(percentile, row[9:])}
             }
             for row in rows
         ]
     }
+
+@router.get("/api/metrics/clients/{client_id}")
+async def get_client_history(client_id: str, session_id: Optional[int] = None, project_id: Optional[int] = None,
+                             limit: int = Query(1000, ge=1, le=10000),
+                             max_points: Optional[int] = Query(None, ge=8, le=5000), conn = Depends(get_db_conn)):
+    """One client's per-round records, oldest first (served by the (client_id, session_id, round) index)"""
+    if max_points and session_id is None:
+        raise HTTPException(status_code=400, detail="max_points needs a session_id (rounds restart every session)")
+    where, args = ["crm.client_id = %s"], [client_id]
+    join = ""
+    if session_id is not None:
+        where.append("crm.session_id = %s")
+        args.append(session_id)
+    if project_id is not None:
+        join = "JOIN training_sessions ts ON ts.id = crm.session_id"
+        where.append("ts.project_id = %s")
+        args.append(project_id)
+
+    async with conn.cursor() as cursor:
+        await cursor.execute(f"""
+            SELECT crm.session_id, crm.round, crm.accuracy, crm.loss, crm.num_examples, crm.fit_seconds, crm.bytes_sent
+            FROM client_round_metrics crm {join}
+            WHERE {' AND '.join(where)}
+            ORDER BY crm.session_id ASC, crm.round ASC
+            LIMIT %s
+        """, (*args, limit))
+        rows = await cursor.fetchall()
+
+    rounds = [
+        {
+            "session_id": row[0],
+            "round": row[1],
+            "accuracy": row[2],
+            "loss": row[3],
+            "num_examples": row[4],
+            "fit_seconds": row[5],
+            "bytes_sent": row[6],
+        }
+        for row in rows
+    ]
+    if max_points:
+        rounds, bucket_rounds = downsample(rounds, max_points)
+        return {"client_id": client_id, "rounds": rounds, "downsampled": {"rows": len(rows), "bucket_rounds": bucket_rounds}}
+    return {"client_id": client_id, "rounds": rounds}
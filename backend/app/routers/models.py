@@ -1,70 +1,161 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from app.database import get_db_conn
 from app.models.schemas import ModelConfig 
 from app.routers.training import current_config # Import shared state from training router or a common state file
+from app.services.uploads import MultipartFileStream, save_stream, iter_upload_file
+from app.services.blobs import header_sha256, model_store
+from app.services.downloads import conditional_file_response
+from app.services.datasets import ingest_csv_upload, parse_csv_schema, sync_catalog
+from app.services.model_registry import find_model, get_version, list_versions, register_model
+from app.services.retention import model_retention, readable_path
+from typing import Optional
+import asyncio
+import hashlib
 import os
-import pickle
-import pandas as pd
 from datetime import datetime
 
 router = APIRouter(tags=["models"])
 
+# Global model formats: tensor stream from the FL server, legacy pickled Parameters
+MODEL_EXTENSIONS = {".flts", ".pkl"}
+
 # Ensure directories exist
 os.makedirs("models", exist_ok=True)
 os.makedirs("datasets", exist_ok=True)
 
-# this endpoint is called by the server after each round of federated training to save the global model weights. The model data is expected to be a dictionary containing the weights and any other relevant information. The model is saved as a pickle file with a timestamp in the filename for easy retrieval later.
+# this endpoint is called by the server after each round of federated training to save the global model weights. The FL server streams the aggregated tensors as a raw chunked body (application/x-fl-tensors); multipart uploads of a file are still accepted. Either way the body is written to disk in chunks, never held in memory whole, and hashed on the way so identical models share one blob (app/services/blobs.py). Every saved file is registered in model_versions with the session/round it came from.
 @router.post("/api/model/save")
-async def save_global_model(file: UploadFile = File(...)):
-    """Save global model weights as a pickle file"""
+async def save_global_model(request: Request, session_id: Optional[int] = None, project_id: Optional[int] = None,
+                            server_round: Optional[int] = Query(None, alias="round"), strategy: Optional[str] = None,
+                            accuracy: Optional[float] = None, loss: Optional[float] = None,
+                            conn = Depends(get_db_conn)):
+    """Save global model weights streamed by the FL server"""
     timestamp = int(datetime.utcnow().timestamp())
-    model_path = f"models/global_model_{timestamp}.pkl"
-    # Save the uploaded file to the models directory
-    with open(model_path, "wb") as f:
-        f.write(await file.read())
+    content_type = request.headers.get("content-type", "")
+    hasher = hashlib.sha256()
+    # Unique per session/round: concurrent sessions may save within the same second
+    stem = f"global_model_{timestamp}" if session_id is None else f"global_model_{timestamp}_s{session_id}_r{server_round}"
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Missing 'file' upload")
+        ext = os.path.splitext(upload.filename or "")[1]
+        model_path = f"models/{stem}{ext if ext in MODEL_EXTENSIONS else '.pkl'}"
+        try:
+            size = await save_stream(iter_upload_file(upload), model_path, hasher,
+                                     expected_sha256=header_sha256(request.headers))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            await form.close()
+        sha256 = hasher.hexdigest()
+        deduplicated = await asyncio.to_thread(model_store.commit, model_path, sha256)
+    else:
+        model_path = f"models/{stem}.flts"
+        try:
+            # A declared X-Content-SHA256 is checked against the body, never taken on trust
+            size = await save_stream(request.stream(), model_path, hasher,
+                                     expected_sha256=header_sha256(request.headers))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        sha256 = hasher.hexdigest()
+        deduplicated = await asyncio.to_thread(model_store.commit, model_path, sha256)
 
-    return {"status": "success", "model_path": model_path, "timestamp": timestamp}
+    version_id = await register_model(
+        conn, model_path, "global", sha256, size,
+        session_id=session_id, project_id=project_id, server_round=server_round, strategy=strategy,
+        accuracy=accuracy, loss=loss
+    )
+    return {"status": "success", "model_path": model_path, "timestamp": timestamp, "size": size,
+            "sha256": sha256, "deduplicated": deduplicated, "version_id": version_id}
 
 
 
+async def version_path(conn, version: dict) -> str:
+    """Readable file for a version (delta-encoded rounds are restored); 410 once it is gone"""
+    if version["storage"] == "pruned":
+        raise HTTPException(status_code=410, detail=f"Model {version['filename']} was pruned by the retention policy")
+    try:
+        path = await readable_path(conn, version)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=f"Model {version['filename']} could not be restored: {e}")
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=410, detail=f"Model file {version['filename']} is no longer on disk")
+    return path
+
+async def serve_version(request: Request, conn, version: Optional[dict], missing: str):
+    """ETag / If-None-Match / Range-aware download of a registered model file"""
+    if version is None:
+        raise HTTPException(status_code=404, detail=missing)
+    path = await version_path(conn, version)
+    return conditional_file_response(request, path, version["filename"], version["sha256"])
+
 @router.get("/api/model/download/global")
-async def download_global_model():
-    """Download latest global model"""
-    models = [f for f in os.listdir("models") if f.startswith("global_model_")]
-    if not models:
-        raise HTTPException(status_code=404, detail="No global model found")
-    
-    latest_model = sorted(models)[-1]
-    model_path = os.path.join("models", latest_model)
-    return FileResponse(model_path, media_type="application/octet-stream", filename=latest_model)
+async def download_global_model(request: Request, project_id: Optional[int] = None, session_id: Optional[int] = None,
+                                best: bool = False, conn = Depends(get_db_conn)):
+    """Download the latest global model (or, with best=true, the highest-accuracy one)"""
+    version = await find_model(conn, "global", project_id=project_id, session_id=session_id, best=best)
+    return await serve_version(request, conn, version, "No global model found")
 
 @router.get("/api/model/download/centralized")
-async def download_centralized_model():
+async def download_centralized_model(request: Request, project_id: Optional[int] = None, session_id: Optional[int] = None,
+                                     conn = Depends(get_db_conn)):
     """Download latest centralized model"""
-    models = [f for f in os.listdir("models") if f.startswith("centralized_")]
-    if not models:
-        raise HTTPException(status_code=404, detail="No centralized model found")
-    
-    latest_model = sorted(models)[-1]
-    model_path = os.path.join("models", latest_model)
-    return FileResponse(model_path, media_type="application/octet-stream", filename=latest_model)
+    version = await find_model(conn, "centralized", project_id=project_id, session_id=session_id)
+    return await serve_version(request, conn, version, "No centralized model found")
+
+@router.get("/api/model/versions")
+async def list_model_versions(kind: Optional[str] = None, project_id: Optional[int] = None,
+                              session_id: Optional[int] = None, limit: int = Query(200, ge=1, le=1000),
+                              include_pruned: bool = False, conn = Depends(get_db_conn)):
+    """Registered models, newest first; parent_id links each round's model to the previous one"""
+    return {"versions": await list_versions(conn, kind, project_id, session_id, limit, include_pruned)}
+
+@router.get("/api/model/versions/{version_id}/tensors")
+async def inspect_model_version(version_id: int, conn = Depends(get_db_conn)):
+    """Tensor names, dtypes, shapes and offsets of a .flts checkpoint (reads only its header)"""
+    from app.services.checkpoint import read_index  # numpy stays out of API startup
+
+    version = await get_version(conn, version_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Model version not found")
+    if not version["filename"].endswith(".flts"):
+        raise HTTPException(status_code=415, detail="Only .flts checkpoints can be inspected; "
+                                                    "convert with `python -m app.services.checkpoint convert`")
+    index = read_index(await version_path(conn, version))
+    return {"version_id": version_id, "format_version": index["version"], "tensors": index["tensors"]}
+
+@router.get("/api/model/versions/{version_id}/download")
+async def download_model_version(request: Request, version_id: int, conn = Depends(get_db_conn)):
+    return await serve_version(request, conn, await get_version(conn, version_id), "Model version not found")
 
 
 
+@router.get("/api/model/retention")
+async def get_model_retention():
+    """Retention settings, the last pass's report and current models/ disk usage"""
+    return {
+        "interval": model_retention.interval,
+        "deltas": model_retention.deltas,
+        "last_run": model_retention.last_report,
+        "usage": await asyncio.to_thread(model_store.usage)
+    }
+
+@router.post("/api/model/retention/run")
+async def run_model_retention(conn = Depends(get_db_conn)):
+    """Run a retention pass now instead of waiting for the background task"""
+    return await model_retention.run(conn)
+
 @router.get("/api/models/list")
-async def list_saved_models():
+async def list_saved_models(conn = Depends(get_db_conn)):
     """List all saved models"""
-    models = []
-    for filename in os.listdir("models"):
-        filepath = os.path.join("models", filename)
-        models.append({
-            "filename": filename,
-            "size": os.path.getsize(filepath),
-            "created": datetime.fromtimestamp(os.path.getctime(filepath)).isoformat(),
-            "type": "global" if "global" in filename else "centralized"
-        })
-    return {"models": sorted(models, key=lambda x: x['created'], reverse=True)}
+    models = [
+        {**version, "type": version["kind"]}
+        for version in await list_versions(conn)
+    ]
+    return {"models": models}
 
 
 
@@ -108,44 +199,57 @@ async def get_model_config(conn = Depends(get_db_conn)):
 
     
 @router.post("/api/config/dataset")
-async def upload_dataset(file: UploadFile = File(...)):
-    """Upload new dataset"""
+async def upload_dataset(request: Request, project_id: Optional[int] = None, conn = Depends(get_db_conn)):
+    """Upload new dataset (header checked against the project's csv_schema when project_id is given).
+
+    multipart/form-data with a `file` part; `project_id` may also be sent as a form
+    field ahead of the file. The body is read straight from the request stream.
+    """
+    try:
+        upload = MultipartFileStream(request, "file")
+        await upload.open()
+        if project_id is None and upload.fields.get("project_id"):
+            project_id = int(upload.fields["project_id"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid upload: {str(e)}")
     # FIX: basename removes directory paths, preventing traversal
-    safe_filename = os.path.basename(file.filename)
+    safe_filename = os.path.basename(upload.filename)
+    if not safe_filename:
+        raise HTTPException(status_code=400, detail="Invalid upload: missing filename")
     dataset_path = os.path.join("datasets", safe_filename)
-    with open(dataset_path, "wb") as f:
-        f.write(await file.read())
-    
+
+    expected_columns = None
+    if project_id is not None:
+        async with conn.cursor() as cursor:
+            await cursor.execute("SELECT csv_schema FROM projects WHERE id = %s", (project_id,))
+            row = await cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Project not found")
+        expected_columns = parse_csv_schema(row[0])
+
+    # Streamed to disk as it arrives and profiled on the way (never spooled or held in memory whole),
+    # stored once per content hash; /api/datasets/list reads the stats back from the catalog
     try:
-        df = pd.read_csv(dataset_path)
-        return {
-            "status": "success",
-            "filename": file.filename,
-            "path": dataset_path,
-            "rows": df.shape[0],
-            "columns": df.shape[1]
-        }
-    except Exception as e:
-        os.remove(dataset_path)
+        profile = await ingest_csv_upload(conn, upload.chunks(), dataset_path, expected_columns,
+                                          declared_sha256=header_sha256(request.headers))
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid dataset: {str(e)}")
 
+    return {
+        "status": "success",
+        "filename": upload.filename,
+        "path": dataset_path,
+        "rows": profile["rows"],
+        "columns": profile["columns"],
+        "sha256": profile["sha256"],
+        "deduplicated": profile["deduplicated"]
+    }
+
 
 
 @router.get("/api/datasets/list")
-async def list_datasets():
-    datasets = []
-    for filename in os.listdir("datasets"):
-        filepath = os.path.join("datasets", filename)
-        try:
-            df = pd.read_csv(filepath)
-            datasets.append({
-                "filename": filename,
-                "rows": len(df),
-                "columns": len(df.columns),
-                "created": datetime.fromtimestamp(os.path.getctime(filepath)).isoformat()
-            })
-        except:
-            pass
+async def list_datasets(conn = Depends(get_db_conn)):
+    datasets = await sync_catalog(conn, "datasets")
     return {"datasets": sorted(datasets, key=lambda x: x['created'], reverse=True)}
 
 
@@ -1,10 +1,17 @@
 # backend/app/controllers/project_controller.py - FIXED
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse
 from app.models.project import ProjectCreate
 from app.services.model_loader import DynamicModelLoader
+from app.services.datasets import clean_column, parse_csv_schema, save_csv_upload
+from app.services.uploads import MultipartFileStream
 from app.database import get_db_conn
 from app.routers.auth import get_current_user # 🔒 Import auth dependency to get current user info
+import asyncio
 import json
+import os
+
+HOLDOUT_DIR = os.path.join("datasets", "holdout")
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
@@ -119,6 +126,61 @@ async def get_model_code(project_id: int, conn = Depends(get_db_conn)):
     }
 
 
+# Holdout dataset: the FL server downloads it once per session and evaluates every new global model on it,
+# which lets the per-round client evaluation fan-out be disabled or run only every N rounds.
+@router.post("/{project_id}/holdout")
+async def upload_holdout(project_id: int, request: Request, conn = Depends(get_db_conn)):
+    """Register the held-out CSV used for server-side evaluation (replaces any previous one)"""
+    try:
+        upload = MultipartFileStream(request, "file")
+        await upload.open()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid upload: {str(e)}")
+    if not upload.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Holdout must be a CSV file")
+
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT csv_schema, target_column FROM projects WHERE id = %s", (project_id,))
+        row = await cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    await asyncio.to_thread(os.makedirs, HOLDOUT_DIR, exist_ok=True)
+    holdout_path = os.path.join(HOLDOUT_DIR, f"project_{project_id}.csv")
+    staged_path = f"{holdout_path}.upload"     # Validated before it replaces the current holdout
+
+    # Same columns the clients' datasets are validated against, checked by the shared
+    # CSV profiler as the header arrives; a bad file never reaches staged_path
+    expected = parse_csv_schema(row[0])
+    if clean_column(row[1]) not in expected:
+        raise HTTPException(status_code=400, detail="Project target column is not in its csv_schema")
+    try:
+        profile = await save_csv_upload(upload.chunks(), staged_path, expected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={
+            "message": f"Invalid holdout: {str(e)}",
+            "expected": expected
+        })
+    await asyncio.to_thread(os.replace, staged_path, holdout_path)
+
+    async with conn.cursor() as cursor:
+        await cursor.execute("UPDATE projects SET holdout_path = %s WHERE id = %s", (holdout_path, project_id))
+
+    return {"status": "success", "project_id": project_id, "holdout_path": holdout_path,
+            "size": profile["size"], "rows": profile["rows"]}
+
+@router.get("/{project_id}/holdout")
+async def download_holdout(project_id: int, conn = Depends(get_db_conn)):
+    """Fetched by the FL server to build its evaluation set"""
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT holdout_path FROM projects WHERE id = %s", (project_id,))
+        row = await cursor.fetchone()
+
+    if not row or not row[0] or not os.path.exists(row[0]):
+        raise HTTPException(status_code=404, detail="No holdout dataset registered for this project")
+    return FileResponse(row[0], media_type="text/csv", filename=os.path.basename(row[0]))
+
+
 @router.get("/")
 async def list_projects(
     owner_id: int = None, # Make this optional
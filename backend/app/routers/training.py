@@ -1,16 +1,27 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Query
 from app.database import get_db_conn
 from app.socket_manager import manager
-from app.models.schemas import TrainingMode, VoteRequest
+from app.session_notifier import notifier
+from app.models.schemas import TrainingMode, VoteRequest, SessionServer, FedStrategy
+from app.services.centralized import train_centralized
+from app.services.jobs import job_queue
+from app.services.blobs import header_sha256, model_store, sha256_file
+from app.services.model_registry import register_model
+from app.services.datasets import ingest_csv_upload, parse_csv_schema
+from app.services.uploads import MultipartFileStream
 from datetime import datetime
-import pandas as pd
-import tensorflow as tf
-import numpy as np
+from typing import List, Optional
+import asyncio
+import functools
+import secrets
 import time
 import os
 
 router = APIRouter(prefix="/api/training", tags=["training"])
 
+# Upper bound for a single long-poll on /wait (seconds)
+MAX_WAIT_TIMEOUT = 60
+
 # Global storage for current configuration
 current_config = {
     "model_code": None,
@@ -24,8 +35,9 @@ current_config = {
 @router.post("/vote")
 async def vote_strategy(vote: VoteRequest, conn = Depends(get_db_conn)):
     """Clients (Electron) call this to cast their vote"""
-    if vote.strategy not in ["FedAvg", "FedProx"]:
+    if vote.strategy not in FedStrategy.__members__.values():
         raise HTTPException(status_code=400, detail="Invalid strategy")
+    strategy = FedStrategy(vote.strategy).value
 
     async with conn.cursor() as cursor:
         # Insert or Update vote (One vote per client per project)
@@ -33,7 +45,7 @@ async def vote_strategy(vote: VoteRequest, conn = Depends(get_db_conn)):
             """INSERT INTO strategy_votes (project_id, client_id, strategy) 
                VALUES (%s, %s, %s) 
                ON DUPLICATE KEY UPDATE strategy = %s""",
-            (vote.project_id, vote.client_id, vote.strategy, vote.strategy)
+            (vote.project_id, vote.client_id, strategy, strategy)
         )
         
         # Get live tally to broadcast
@@ -84,6 +96,78 @@ async def get_status(conn = Depends(get_db_conn)):
         "strategy": row[2] 
     }
 
+async def load_active_sessions(conn):
+    """All rows still marked 'training' (used to prime the in-memory session table)"""
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            """SELECT ts.id, ts.project_id, ts.final_strategy, ts.server_port, p.num_rounds
+               FROM training_sessions ts LEFT JOIN projects p ON p.id = ts.project_id
+               WHERE ts.status = 'training' ORDER BY ts.id ASC"""
+        )
+        rows = await cursor.fetchall()
+    return [
+        {"status": "training", "session_id": row[0], "project_id": row[1], "strategy": row[2], "server_port": row[3],
+         "num_rounds": row[4]}
+        for row in rows
+    ]
+
+@router.get("/wait")
+async def wait_for_session(request: Request, after: int = 0, timeout: float = 30.0,
+                           running: List[int] = Query([])):
+    """Long-polled by FL Server; returns as soon as a session newer than `after` starts.
+
+    `running` lists the sessions the caller is serving; any of them that was
+    cancelled (e.g. by a newer Start) also ends the wait and comes back in `ended`.
+    Completed sessions are not listed: their workers still drain reports and exit on their own.
+    """
+    # Only the first call after a backend restart touches the DB; the connection
+    # is released before waiting so idle long-polls don't hold pool slots.
+    if not notifier.primed:
+        async with request.app.state.pool.acquire() as conn:
+            await notifier.prime(await load_active_sessions(conn))
+
+    session = await notifier.wait_for_session(after, min(max(timeout, 0.0), MAX_WAIT_TIMEOUT), running)
+    ended = notifier.ended(running)
+    if not session:
+        return {"status": "idle", "ended": ended}
+    return {**session, "ended": ended}
+
+@router.get("/sessions")
+async def list_active_sessions(project_id: int = None):
+    """Sessions currently training (one Flower server per project)"""
+    return {"sessions": notifier.active(project_id)}
+
+@router.post("/sessions/{session_id}/server")
+async def report_session_server(session_id: int, server: SessionServer, conn = Depends(get_db_conn)):
+    """FL Server calls this once a session's Flower server is bound to its port"""
+    session = notifier.sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="No training session with this ID")
+
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            "UPDATE training_sessions SET server_port = %s WHERE id = %s",
+            (server.port, session_id)
+        )
+
+    await notifier.publish({**session, "server_port": server.port, "server_host": server.host})
+    await manager.broadcast({"type": "session_server", "session_id": session_id, "port": server.port})
+    return {"status": "registered", "session_id": session_id, "port": server.port}
+
+@router.get("/server/{project_id}")
+async def get_project_server(project_id: int):
+    """Clients call this to find the Flower server for their project"""
+    sessions = [s for s in notifier.active(project_id) if s.get("server_port")]
+    if not sessions:
+        raise HTTPException(status_code=404, detail="No running FL server for this project")
+
+    session = sessions[-1]
+    return {
+        "session_id": session["session_id"],
+        "host": session.get("server_host"),
+        "port": session["server_port"]
+    }
+
 @router.post("/start")
 async def start_training(project_id: int = 1, conn = Depends(get_db_conn)): #project_id is hardcoded for now, we can extend the API later to specify which project to start training on
     """Frontend 'Start' button triggers this"""
@@ -92,37 +176,88 @@ async def start_training(project_id: int = 1, conn = Depends(get_db_conn)): #pro
     winner_strategy = final_res["strategy"]
 
     async with conn.cursor() as cursor:
-        # Cancel old running sessions
-        await cursor.execute("UPDATE training_sessions SET status='cancelled' WHERE status='training'")
+        # Cancel this project's old running sessions (other projects keep training)
+        await cursor.execute(
+            "SELECT id FROM training_sessions WHERE status='training' AND project_id=%s",
+            (project_id,)
+        )
+        cancelled = [row[0] for row in await cursor.fetchall()]
+        if cancelled:
+            await cursor.execute(
+                "UPDATE training_sessions SET status='cancelled' WHERE status='training' AND project_id=%s",
+                (project_id,)
+            )
         
+        # Cached with the session (app/session_notifier.py) so metrics reports need no lookup
+        await cursor.execute("SELECT num_rounds FROM projects WHERE id = %s", (project_id,))
+        row = await cursor.fetchone()
+        num_rounds = row[0] if row else None
+
         # Create new session with the winning strategy
         await cursor.execute(
-            """INSERT INTO training_sessions (status, started_at, final_strategy) 
-               VALUES ('training', %s, %s)""",
-            (datetime.utcnow(), winner_strategy)
+            """INSERT INTO training_sessions (project_id, status, started_at, final_strategy) 
+               VALUES (%s, 'training', %s, %s)""",
+            (project_id, datetime.utcnow(), winner_strategy)
         )
         session_id = cursor.lastrowid
 
-    # Notify everyone
+    # Wake up the FL server immediately, then notify everyone
+    await notifier.cancel(cancelled)
+    await notifier.publish({
+        "status": "training",
+        "session_id": session_id,
+        "project_id": project_id,
+        "strategy": winner_strategy,
+        "num_rounds": num_rounds
+    })
     await manager.broadcast({
         "type": "training_started",
         "session_id": session_id,
+        "project_id": project_id,
         "strategy": winner_strategy
     })
     
-    return {"status": "training", "strategy": winner_strategy, "session_id": session_id}
+    return {"status": "training", "strategy": winner_strategy, "session_id": session_id, "project_id": project_id}
 
-@router.post("/complete")
-async def complete_training(conn = Depends(get_db_conn)):
-    """FL Server calls this when 5 rounds are done"""
+async def end_sessions(conn, status: str, session_id: Optional[int] = None) -> List[int]:
+    """Move a session (or every session) from 'training' to `status`; returns the ids that changed.
+
+    Each row is updated on its own and checked with rowcount, so a session that was
+    already cancelled or completed is never reported as ending here.
+    """
     async with conn.cursor() as cursor:
-        await cursor.execute(
-            "UPDATE training_sessions SET status='completed', completed_at=%s WHERE status='training'",
-            (datetime.utcnow(),)
-        )
-    
-    await manager.broadcast({"type": "training_completed"})
-    return {"status": "completed"}
+        if session_id is not None:
+            candidates = [session_id]
+        else:
+            await cursor.execute("SELECT id FROM training_sessions WHERE status='training'")
+            candidates = [row[0] for row in await cursor.fetchall()]
+        ended = []
+        for candidate in candidates:
+            await cursor.execute(
+                "UPDATE training_sessions SET status=%s, completed_at=%s WHERE id=%s AND status='training'",
+                (status, datetime.utcnow(), candidate)
+            )
+            if cursor.rowcount:
+                ended.append(candidate)
+    return ended
+
+@router.post("/complete")
+async def complete_training(session_id: int = None, conn = Depends(get_db_conn)):
+    """FL Server calls this when a session's rounds are done (all sessions if no ID is given)"""
+    completed = await end_sessions(conn, "completed", session_id)
+    if completed:
+        await notifier.finish(completed)
+        await manager.broadcast({"type": "training_completed", "session_id": session_id})
+    return {"status": "completed", "sessions": completed}
+
+@router.post("/fail")
+async def fail_training(session_id: int, conn = Depends(get_db_conn)):
+    """FL Server calls this when a session's worker crashed before its rounds were done"""
+    failed = await end_sessions(conn, "failed", session_id)
+    if failed:
+        await notifier.finish(failed)
+        await manager.broadcast({"type": "training_failed", "session_id": session_id})
+    return {"status": "failed", "sessions": failed}
 
 
 
@@ -151,82 +286,109 @@ async def get_training_mode():
 # --- CENTRALIZED TRAINING ---
 
 @router.post("/centralized")
-async def run_centralized_training(
-    dataset_file: UploadFile = File(...),
-    conn = Depends(get_db_conn)
-):
-    """Run centralized training for comparison"""
-    # Save uploaded dataset
-    timestamp = int(time.time())
-    dataset_path = f"datasets/centralized_{timestamp}.csv"
-    with open(dataset_path, "wb") as f:
-        f.write(await dataset_file.read())
-    
-    # Load Data
+async def run_centralized_training(request: Request, project_id: Optional[int] = None):
+    """Queue centralized training for comparison; returns a job id right away.
+
+    The CSV comes as the `dataset_file` part of a multipart body (`project_id` may be
+    a form field ahead of it) and is read straight from the request stream.
+    Training runs in the job queue's worker processes, so the event loop (and /ws,
+    metrics ingest, ...) stays responsive. Per-epoch progress is broadcast as
+    `centralized_progress`, state changes as `centralized_job`.
+    """
+    pool = request.app.state.pool
     try:
-        df = pd.read_csv(dataset_path)
-        X = df.iloc[:, :-1].values
-        y = df.iloc[:, -1].values
-        
-        # Normalize
-        X = (X - X.mean(axis=0)) / (X.std(axis=0) + 1e-7)
-        
-        # Split
-        split_idx = int(0.8 * len(X))
-        X_train, X_test = X[:split_idx], X[split_idx:]
-        y_train, y_test = y[:split_idx], y[split_idx:]
-        
-        # Create Model (Hardcoded for now, matching your main.py)
-        model = tf.keras.Sequential([
-            tf.keras.layers.Dense(64, activation='relu', input_shape=(X.shape[1],)),
-            tf.keras.layers.Dropout(0.2),
-            tf.keras.layers.Dense(32, activation='relu'),
-            tf.keras.layers.Dropout(0.2),
-            tf.keras.layers.Dense(1, activation='sigmoid')
-        ])
-        model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
-        
-        # Train
-        start_time = time.time()
-        model.fit(X_train, y_train, epochs=100, batch_size=32, validation_data=(X_test, y_test), verbose=0)
-        training_time = time.time() - start_time
-        
-        # Evaluate
-        loss, accuracy = model.evaluate(X_test, y_test, verbose=0)
-        
-        # Save Model
-        model_path = f"models/centralized_{timestamp}.h5"
-        model.save(model_path)
-        
-        # Store Results
-        async with conn.cursor() as cursor:
-            # Find latest session to link results to
-            await cursor.execute(
-                "SELECT id FROM training_sessions WHERE status IN ('running', 'completed') ORDER BY id DESC LIMIT 1"
-            )
-            row = await cursor.fetchone()
-            session_id = row[0] if row else None
-            
-            await cursor.execute(
-                """INSERT INTO centralized_results (session_id, accuracy, loss, training_time)
-                   VALUES (%s, %s, %s, %s)""",
-                (session_id, accuracy, loss, training_time)
-            )
-        
+        upload = MultipartFileStream(request, "dataset_file")
+        await upload.open()
+        if project_id is None and upload.fields.get("project_id"):
+            project_id = int(upload.fields["project_id"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid upload: {str(e)}")
+
+    expected_columns = None
+    if project_id is not None:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT csv_schema FROM projects WHERE id = %s", (project_id,))
+                row = await cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Project not found")
+        expected_columns = parse_csv_schema(row[0])
+
+    # Save uploaded dataset (unique per job: several jobs may now run at once),
+    # streamed and validated chunk by chunk so a bad file is rejected before training
+    stem = f"centralized_{int(time.time())}_{secrets.token_hex(3)}"
+    dataset_path = f"datasets/{stem}.csv"
+    # (repeat uploads of the same data share one blob; see app/services/blobs.py)
+    try:
+        async with pool.acquire() as conn:
+            profile = await ingest_csv_upload(conn, upload.chunks(), dataset_path, expected_columns,
+                                              declared_sha256=header_sha256(request.headers), min_rows=2)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid dataset: {str(e)}")
+    model_path = f"models/{stem}.h5"
+
+    async def store_results(job, result):
+        # The worker wrote the model with model.save(); file it in the blob store like any other model
+        sha256 = None
+        if os.path.exists(model_path):
+            sha256 = await asyncio.to_thread(sha256_file, model_path)
+            await asyncio.to_thread(model_store.commit, model_path, sha256)
+
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                # Find latest session to link results to
+                await cursor.execute(
+                    "SELECT id FROM training_sessions WHERE status IN ('running', 'completed') ORDER BY id DESC LIMIT 1"
+                )
+                row = await cursor.fetchone()
+                session_id = row[0] if row else None
+
+                await cursor.execute(
+                    """INSERT INTO centralized_results (session_id, project_id, accuracy, loss, training_time)
+                       VALUES (%s, %s, %s, %s, %s)""",
+                    (session_id, project_id, result["accuracy"], result["loss"], result["training_time"])
+                )
+
+            if sha256 is not None:
+                await register_model(
+                    conn, model_path, "centralized", sha256, os.path.getsize(model_path),
+                    session_id=session_id, project_id=project_id,
+                    accuracy=result["accuracy"], loss=result["loss"]
+                )
+
         await manager.broadcast({
             "type": "centralized_complete",
-            "data": {"accuracy": float(accuracy), "loss": float(loss), "training_time": training_time}
+            "job_id": job["job_id"],
+            "data": {"accuracy": result["accuracy"], "loss": result["loss"], "training_time": result["training_time"]}
         })
-        
-        return {
-            "status": "success",
-            "accuracy": float(accuracy),
-            "loss": float(loss),
-            "training_time": training_time,
-            "model_path": model_path
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Centralized training failed: {str(e)}")
+
+    job = job_queue.submit(
+        "centralized",
+        functools.partial(train_centralized, sha256=profile["sha256"]),  # Feature cache key, no re-hash in the worker
+        dataset_path, model_path,
+        on_done=store_results, dataset_path=dataset_path, rows=profile["rows"]
+    )
+    return {"status": "queued", "job_id": job["job_id"], "job": job}
+
+@router.get("/centralized/jobs")
+async def list_centralized_jobs():
+    return {"jobs": job_queue.list("centralized")}
+
+@router.get("/centralized/jobs/{job_id}")
+async def get_centralized_job(job_id: str):
+    """Status, latest epoch progress and (once completed) results of a centralized training job"""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/centralized/jobs/{job_id}/cancel")
+async def cancel_centralized_job(job_id: str):
+    """Queued jobs are dropped; running ones stop at the end of the current epoch"""
+    job = job_queue.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 @router.get("/comparison")
 async def get_comparison_results(conn = Depends(get_db_conn)):
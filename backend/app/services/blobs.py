@@ -0,0 +1,142 @@
+# backend/app/services/blobs.py
+import hashlib
+import os
+from typing import Optional
+
+BLOB_DIRNAME = ".blobs"
+HASH_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class BlobStore:
+    """Content-addressed storage for one directory (models/ or datasets/).
+
+    Each distinct file body is kept once, as `<root>/.blobs/<sha[:2]>/<sha>`; the
+    names the rest of the app uses (global_model_<ts>.flts, centralized_<ts>.csv, ...)
+    are hard links to it. The filesystem link count is the reference count:
+    a blob with st_nlink == 1 has no aliases left and gc() removes it. On a
+    filesystem without hard links every alias simply stays a plain file.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.blob_dir = os.path.join(root, BLOB_DIRNAME)
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_dir, sha256[:2], sha256)
+
+    def has(self, sha256: str) -> bool:
+        return os.path.exists(self.blob_path(sha256))
+
+    def refcount(self, sha256: str) -> int:
+        try:
+            return os.stat(self.blob_path(sha256)).st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    def alias(self, sha256: str, path: str) -> bool:
+        """Point `path` at an existing blob; False if there is no such blob"""
+        blob = self.blob_path(sha256)
+        link_path = f"{path}.link"
+        try:
+            if os.path.exists(path) and os.path.samefile(blob, path):
+                return True  # rename() onto another link of the same inode is a no-op
+            os.link(blob, link_path)
+        except FileNotFoundError:
+            return False
+        os.replace(link_path, path)  # Atomic, also when `path` already exists
+        return True
+
+    def commit(self, path: str, sha256: str) -> bool:
+        """Turn a freshly written file into an alias of its blob.
+
+        Returns True when the content was already stored (the new copy is dropped
+        in favour of a link to the existing blob).
+        """
+        blob = self.blob_path(sha256)
+        try:
+            if os.path.exists(blob):
+                if os.path.samefile(blob, path):
+                    return False
+                return self.alias(sha256, path)
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            try:
+                os.link(path, blob)
+            except FileExistsError:
+                return self.alias(sha256, path)  # Same content committed concurrently
+        except OSError as e:
+            print(f"⚠️ Blob store unavailable for {path} (kept as a plain file): {e}")
+        return False
+
+    def commit_file(self, path: str) -> bool:
+        """commit() for a file written elsewhere (e.g. by a worker process); hashes it first"""
+        return self.commit(path, sha256_file(path))
+
+    def adopt(self) -> int:
+        """Fold plain files already in `root` into the store; returns bytes freed"""
+        freed = 0
+        for item in os.scandir(self.root):
+            if not item.is_file() or item.name.endswith((".part", ".link")):
+                continue
+            st = item.stat()
+            if st.st_nlink > 1:
+                continue  # Already an alias
+            if self.commit_file(item.path):
+                freed += st.st_size
+        return freed
+
+    def gc(self) -> int:
+        """Delete blobs no alias refers to any more; returns bytes freed"""
+        freed = 0
+        if not os.path.isdir(self.blob_dir):
+            return 0
+        for shard in os.scandir(self.blob_dir):
+            if not shard.is_dir():
+                continue
+            for item in os.scandir(shard.path):
+                st = item.stat()
+                if st.st_nlink == 1:
+                    os.remove(item.path)
+                    freed += st.st_size
+        return freed
+
+    def usage(self) -> dict:
+        """Logical (sum over aliases) vs physical (sum over blobs) bytes"""
+        logical = physical = blobs = 0
+        for item in os.scandir(self.root):
+            if item.is_file() and not item.name.endswith((".part", ".link")):
+                logical += item.stat().st_size
+        if os.path.isdir(self.blob_dir):
+            for shard in os.scandir(self.blob_dir):
+                for item in os.scandir(shard.path):
+                    blobs += 1
+                    physical += item.stat().st_size
+        return {"blobs": blobs, "logical_bytes": logical, "physical_bytes": physical}
+
+def header_sha256(headers) -> Optional[str]:
+    """Client-declared content hash (X-Content-SHA256), if well formed.
+
+    Only ever checked against the body actually received, never trusted on its
+    own: stored hashes are public (ETags, listings), so knowing one proves nothing.
+    """
+    value = (headers.get("x-content-sha256") or "").strip().lower()
+    if len(value) == 64 and all(c in "0123456789abcdef" for c in value):
+        return value
+    return None
+
+model_store = BlobStore("models")
+dataset_store = BlobStore("datasets")
+
+def adopt_existing() -> int:
+    """Startup pass (run in a thread): dedupe files written before the blob store existed"""
+    freed = model_store.adopt() + dataset_store.adopt()
+    if freed:
+        print(f"✓ Blob store: deduplicated existing files, {freed / 2**20:.1f} MiB freed")
+    return freed
+
+# deduplicates models/ and datasets/: upload endpoints hash what they write and commit() it here, so repeated centralized uploads and identical global models cost one blob plus a directory entry each; an X-Content-SHA256 header is verified against the received body.
@@ -0,0 +1,79 @@
+# backend/app/services/centralized.py
+import time
+from typing import Optional
+
+CENTRALIZED_EPOCHS = 100
+
+def train_centralized(job_id: str, dataset_path: str, model_path: str, progress, cancel_event,
+                      epochs: int = CENTRALIZED_EPOCHS, sha256: Optional[str] = None) -> dict:
+    """Centralized baseline training; runs inside a job-queue worker process.
+
+    Per-epoch progress is put on `progress` (a Manager queue) and training stops
+    at the next epoch boundary once `cancel_event` is set. TensorFlow (and numpy /
+    pandas via the feature cache) are imported here so only the worker processes
+    pay for them.
+    """
+    import tensorflow as tf
+    from app.services.features import load_features
+
+    # Normalized arrays come from the feature cache (memory-mapped; parsed once per dataset content)
+    load_start = time.time()
+    X, y, _, cache_hit = load_features(dataset_path, sha256)
+    load_time = time.time() - load_start
+
+    # Split
+    split_idx = int(0.8 * len(X))
+    X_train, X_test = X[:split_idx], X[split_idx:]
+    y_train, y_test = y[:split_idx], y[split_idx:]
+
+    # Create Model (Hardcoded for now, matching your main.py)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Dense(64, activation='relu', input_shape=(X.shape[1],)),
+        tf.keras.layers.Dropout(0.2),
+        tf.keras.layers.Dense(32, activation='relu'),
+        tf.keras.layers.Dropout(0.2),
+        tf.keras.layers.Dense(1, activation='sigmoid')
+    ])
+    model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+
+    class ProgressCallback(tf.keras.callbacks.Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            logs = logs or {}
+            progress.put({
+                "job_id": job_id,
+                "epoch": epoch + 1,
+                "epochs": epochs,
+                "loss": float(logs.get("loss", 0)),
+                "accuracy": float(logs.get("accuracy", 0)),
+                "val_loss": float(logs.get("val_loss", 0)),
+                "val_accuracy": float(logs.get("val_accuracy", 0))
+            })
+            if cancel_event.is_set():
+                self.model.stop_training = True
+
+    # Train
+    start_time = time.time()
+    model.fit(X_train, y_train, epochs=epochs, batch_size=32, validation_data=(X_test, y_test),
+              verbose=0, callbacks=[ProgressCallback()])
+    training_time = time.time() - start_time
+
+    if cancel_event.is_set():
+        return {"cancelled": True, "training_time": training_time}
+
+    # Evaluate
+    loss, accuracy = model.evaluate(X_test, y_test, verbose=0)
+
+    # Save Model
+    model.save(model_path)
+
+    return {
+        "cancelled": False,
+        "accuracy": float(accuracy),
+        "loss": float(loss),
+        "training_time": training_time,
+        "model_path": model_path,
+        "feature_cache": "hit" if cache_hit else "miss",
+        "load_time": load_time
+    }
+
+# the training body that used to run inline in the /api/training/centralized handler; app/services/jobs.py runs it in a process pool so the event loop never blocks on model.fit.
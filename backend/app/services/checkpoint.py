@@ -0,0 +1,293 @@
+# backend/app/services/checkpoint.py
+"""
+Global model checkpoints (.flts): reading, memory-mapping and conversion.
+
+The format is written by the FL server (fl-server/tensor_stream.py, version 2):
+
+    magic b"FLTS" | version u16 | index length u32                      (little endian)
+    index JSON    : {"alignment": 64, "tensors": [{"name", "dtype", "shape",
+                     "fortran_order", "offset", "nbytes"}, ...]}
+    raw buffers, each at its absolute, 64-byte aligned `offset`
+
+so any tensor can be np.memmap'ed straight from the file without reading the
+rest. Version 1 files (a JSON header in front of each buffer) are indexed by
+walking their headers. write_delta()/apply_delta() store a checkpoint losslessly
+as a compressed XOR against another one (used by model retention). Older
+checkpoints convert with:
+
+    python -m app.services.checkpoint convert models/*.pkl models/*.h5 --out models/converted
+    python -m app.services.checkpoint inspect models/converted/global_model_1768636640.flts
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import pickle
+import struct
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+MAGIC = b"FLTS"
+VERSION = 2
+ALIGNMENT = 64
+
+_STREAM_HEADER = struct.Struct("<4sHI")
+_TENSOR_HEADER = struct.Struct("<I")
+
+DELTA_MAGIC = b"FLTD"
+DELTA_CHUNK_SIZE = 4 << 20  # Multiple of 4, so the byte shuffle lines up with float32 words
+_DELTA_HEADER = struct.Struct("<4sH64s64sQ")  # magic, version, base sha256, target sha256, target size
+
+def _padding(n: int) -> int:
+    return -n % ALIGNMENT
+
+def read_index(path: str) -> dict:
+    """Tensor index of a .flts file: {"version", "tensors": [{name, dtype, shape, fortran_order, offset, nbytes}]}"""
+    with open(path, "rb") as f:
+        magic, version, count = _STREAM_HEADER.unpack(f.read(_STREAM_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a tensor checkpoint")
+        if version == VERSION:
+            index = json.loads(f.read(count))
+            return {"version": version, "tensors": index["tensors"]}
+        if version != 1:
+            raise ValueError(f"Unsupported checkpoint version {version}")
+
+        # Version 1: walk the per-tensor headers, skipping the buffers
+        tensors = []
+        for i in range(count):
+            (header_len,) = _TENSOR_HEADER.unpack(f.read(_TENSOR_HEADER.size))
+            header = json.loads(f.read(header_len))
+            tensors.append({"name": f"tensor_{i}", **header, "offset": f.tell()})
+            f.seek(header["nbytes"], os.SEEK_CUR)
+        return {"version": version, "tensors": tensors}
+
+def _memmap(path: str, entry: dict) -> np.ndarray:
+    shape = tuple(entry["shape"])
+    if entry["nbytes"] == 0:
+        return np.empty(shape, dtype=np.dtype(entry["dtype"]))  # mmap can't map zero bytes
+    return np.memmap(path, dtype=np.dtype(entry["dtype"]), mode="r", offset=entry["offset"], shape=shape,
+                     order="F" if entry["fortran_order"] else "C")
+
+def load_tensor(path: str, name: str, index: Optional[dict] = None) -> np.ndarray:
+    """One tensor as a read-only memory map; nothing else in the file is read"""
+    index = index or read_index(path)
+    for entry in index["tensors"]:
+        if entry["name"] == name:
+            return _memmap(path, entry)
+    raise KeyError(name)
+
+def load_checkpoint(path: str) -> List[np.ndarray]:
+    """All tensors, in order, as read-only memory maps (zero-copy)"""
+    return [_memmap(path, entry) for entry in read_index(path)["tensors"]]
+
+def write_checkpoint(path: str, arrays: List[np.ndarray], names: Optional[List[str]] = None):
+    """Write arrays as a version-2 checkpoint (same layout the FL server streams)"""
+    arrays = [np.asarray(a) for a in arrays]
+    entries = []
+    for i, a in enumerate(arrays):
+        if a.dtype.hasobject:
+            raise ValueError("Object arrays can't be stored as raw buffers")
+        fortran = a.flags.f_contiguous and not a.flags.c_contiguous
+        entries.append({"name": names[i] if names else f"tensor_{i}", "dtype": a.dtype.str,
+                        "shape": list(a.shape), "fortran_order": fortran, "nbytes": a.nbytes})
+
+    # Size the index with placeholder offsets at least as wide as the real ones (see tensor_stream.build_index)
+    total = sum(e["nbytes"] + _padding(e["nbytes"]) for e in entries)
+    for e in entries:
+        e["offset"] = total + (1 << 40)
+    width = len(json.dumps({"alignment": ALIGNMENT, "tensors": entries}, separators=(",", ":")))
+    offset = _STREAM_HEADER.size + width
+    offset += _padding(offset)
+    for e in entries:
+        e["offset"] = offset
+        offset += e["nbytes"] + _padding(e["nbytes"])
+    index = json.dumps({"alignment": ALIGNMENT, "tensors": entries}, separators=(",", ":")).encode().ljust(width)
+
+    part_path = f"{path}.part"
+    with open(part_path, "wb") as f:
+        f.write(_STREAM_HEADER.pack(MAGIC, VERSION, len(index)) + index)
+        f.write(bytes(_padding(f.tell())))
+        for a, e in zip(arrays, entries):
+            f.write(a.tobytes(order="F" if e["fortran_order"] else "C"))
+            f.write(bytes(_padding(e["nbytes"])))
+    os.replace(part_path, path)
+
+# --- Deltas between checkpoints of the same model ---
+
+def _shuffle(words: np.ndarray) -> bytes:
+    # Byte-plane shuffle: sign/exponent bytes of neighbouring rounds barely change, so after the
+    # XOR they form long zero runs zlib compresses well; the noisy low mantissa bytes stay apart
+    return np.ascontiguousarray(words.view(np.uint8).reshape(-1, 4).T).tobytes()
+
+def _unshuffle(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.uint8).reshape(4, -1).T.reshape(-1)
+
+def _padded(n: int) -> int:
+    return n + (-n % 4)
+
+def write_delta(path: str, target: str, base: str, target_sha256: str, base_sha256: str) -> int:
+    """Store `target` as a lossless delta against `base` (same-sized files); returns the delta's size.
+
+    The delta is the byte-wise XOR of the two files, byte-shuffled per 4-byte word
+    and zlib-compressed. Successive global models of one session share their
+    layout and most of each float's high bytes, so this is far smaller than the file.
+    """
+    size = os.path.getsize(target)
+    if size != os.path.getsize(base):
+        raise ValueError("Delta needs checkpoints of the same size (same model architecture)")
+    compressor = zlib.compressobj(6)
+    part_path = f"{path}.part"
+    with open(target, "rb") as t, open(base, "rb") as b, open(part_path, "wb") as out:
+        out.write(_DELTA_HEADER.pack(DELTA_MAGIC, 1, base_sha256.encode(), target_sha256.encode(), size))
+        for chunk in iter(lambda: t.read(DELTA_CHUNK_SIZE), b""):
+            n = _padded(len(chunk))
+            x = np.frombuffer(chunk.ljust(n, b"\0"), dtype=np.uint32) ^ \
+                np.frombuffer(b.read(len(chunk)).ljust(n, b"\0"), dtype=np.uint32)
+            out.write(compressor.compress(_shuffle(x)))
+        out.write(compressor.flush())
+    os.replace(part_path, path)
+    return os.path.getsize(path)
+
+def read_delta_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        magic, version, base_sha256, target_sha256, size = _DELTA_HEADER.unpack(f.read(_DELTA_HEADER.size))
+    if magic != DELTA_MAGIC or version != 1:
+        raise ValueError(f"{path} is not a checkpoint delta")
+    return {"base_sha256": base_sha256.decode(), "sha256": target_sha256.decode(), "size": size}
+
+def apply_delta(path: str, base: str, dst: str) -> str:
+    """Rebuild the checkpoint a delta was made from; returns its sha256 (callers compare with the header)"""
+    header = read_delta_header(path)
+    decompressor = zlib.decompressobj()
+    digest = hashlib.sha256()
+    part_path = f"{dst}.part"
+    with open(path, "rb") as d, open(base, "rb") as b, open(part_path, "wb") as out:
+        d.seek(_DELTA_HEADER.size)
+        pending = b""
+        remaining = header["size"]
+        while remaining > 0:
+            n = min(DELTA_CHUNK_SIZE, remaining)
+            need = _padded(n)
+            while len(pending) < need:
+                data = d.read(1 << 20)
+                if not data:
+                    raise ValueError(f"{path} is truncated")
+                pending += decompressor.decompress(data)
+            block, pending = pending[:need], pending[need:]
+            x = _unshuffle(block).view(np.uint32) ^ np.frombuffer(b.read(n).ljust(need, b"\0"), dtype=np.uint32)
+            chunk = x.view(np.uint8)[:n].tobytes()
+            digest.update(chunk)
+            out.write(chunk)
+            remaining -= n
+    os.replace(part_path, dst)
+    return digest.hexdigest()
+
+# --- Converters for pre-.flts checkpoints ---
+
+class _Parameters:
+    """Stand-in for flwr.common.Parameters, so old pickles load without Flower installed"""
+
+class _ParametersUnpickler(pickle.Unpickler):
+    # Only what pickled weights need: anything else in the file is refused, not executed
+    ALLOWED = {
+        ("flwr.common.typing", "Parameters"): _Parameters,
+        ("copyreg", "_reconstructor"): None,
+        ("builtins", "object"): None,
+        # Pickled ndarrays
+        ("numpy.core.multiarray", "_reconstruct"): None,
+        ("numpy._core.multiarray", "_reconstruct"): None,
+        ("numpy", "ndarray"): None,
+        ("numpy", "dtype"): None,
+    }
+
+    def find_class(self, module, name):
+        if (module, name) not in self.ALLOWED:
+            raise pickle.UnpicklingError(f"{module}.{name} is not allowed in a model checkpoint")
+        return self.ALLOWED[(module, name)] or super().find_class(module, name)
+
+def _npy_to_array(tensor_bytes: bytes) -> np.ndarray:
+    return np.load(io.BytesIO(tensor_bytes), allow_pickle=False)
+
+def arrays_from_pickle(path: str) -> List[np.ndarray]:
+    """Legacy global_model_*.pkl files.
+
+    Two generations exist: pickle.dump(Parameters) of .npy-encoded tensors, and
+    the earliest backend's pickle.dump of the weights as nested lists of floats
+    (ndarrays are accepted too).
+    """
+    with open(path, "rb") as f:
+        loaded = _ParametersUnpickler(f).load()
+    if isinstance(loaded, _Parameters):
+        return [_npy_to_array(t) for t in loaded.tensors]
+    if isinstance(loaded, list):
+        return [a if isinstance(a, np.ndarray) else np.asarray(a, dtype=np.float32) for a in loaded]
+    raise ValueError(f"Unrecognised checkpoint contents ({type(loaded).__name__})")
+
+def arrays_from_h5(path: str):
+    """Centralized Keras .h5 models: weights in layer order, named like Keras does"""
+    import h5py  # Ships with TensorFlow; only needed for this conversion
+
+    arrays, names = [], []
+    with h5py.File(path, "r") as f:
+        weights = f["model_weights"] if "model_weights" in f else f
+        for layer in weights.attrs["layer_names"]:
+            layer = layer.decode() if isinstance(layer, bytes) else layer
+            group = weights[layer]
+            for weight in group.attrs.get("weight_names", []):
+                weight = weight.decode() if isinstance(weight, bytes) else weight
+                arrays.append(group[weight][()])
+                names.append(weight)
+    return arrays, names
+
+def convert(src: str, dst: str) -> dict:
+    """Convert a .pkl / .h5 / version-1 .flts checkpoint to a version-2 .flts"""
+    ext = os.path.splitext(src)[1].lower()
+    names = None
+    if ext == ".pkl":
+        arrays = arrays_from_pickle(src)
+    elif ext in (".h5", ".hdf5"):
+        arrays, names = arrays_from_h5(src)
+    elif ext == ".flts":
+        index = read_index(src)
+        arrays = [np.array(_memmap(src, e)) for e in index["tensors"]]
+        names = [e["name"] for e in index["tensors"]]
+    else:
+        raise ValueError(f"Don't know how to convert {ext} files")
+    write_checkpoint(dst, arrays, names)
+    return read_index(dst)
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or convert model checkpoints")
+    sub = parser.add_subparsers(dest="command", required=True)
+    inspect_cmd = sub.add_parser("inspect", help="Print the tensor index of a .flts file")
+    inspect_cmd.add_argument("path")
+    convert_cmd = sub.add_parser("convert", help="Convert .pkl / .h5 / v1 .flts files to .flts v2")
+    convert_cmd.add_argument("paths", nargs="+")
+    convert_cmd.add_argument("--out", default=os.path.join("models", "converted"))
+    args = parser.parse_args()
+
+    if args.command == "inspect":
+        index = read_index(args.path)
+        print(f"{args.path}: version {index['version']}, {len(index['tensors'])} tensors")
+        for e in index["tensors"]:
+            print(f"  {e['name']:<40} {e['dtype']:>5} {str(tuple(e['shape'])):>16} @ {e['offset']}")
+        return
+
+    os.makedirs(args.out, exist_ok=True)
+    for src in args.paths:
+        dst = os.path.join(args.out, os.path.splitext(os.path.basename(src))[0] + ".flts")
+        try:
+            index = convert(src, dst)
+        except Exception as e:
+            print(f"✗ {src}: {e}")
+            continue
+        print(f"✓ {src} -> {dst} ({len(index['tensors'])} tensors, {os.path.getsize(dst)} bytes)")
+
+if __name__ == "__main__":
+    main()
+
+# the storage format for global models: fl-server streams it to /api/model/save as-is, and the backend, the fl-client or the Electron app can memory-map single tensors from the stored file using the index at its head.
@@ -0,0 +1,272 @@
+# backend/app/services/datasets.py
+import asyncio
+import csv
+import hashlib
+import json
+import math
+import os
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from app.services.blobs import dataset_store
+from app.services.uploads import save_stream
+
+DATASET_DIR = "datasets"
+PROFILE_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+class ColumnStats:
+    """Running stats for one CSV column (Welford mean/variance, no values kept)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0        # Non-empty values
+        self.missing = 0
+        self.numeric = True
+        self.min = math.inf
+        self.max = -math.inf
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: str):
+        value = value.strip()
+        if not value:
+            self.missing += 1
+            return
+        self.count += 1
+        if not self.numeric:
+            return
+        try:
+            x = float(value)
+        except ValueError:
+            self.numeric = False  # First non-numeric value: stop tracking moments
+            return
+        delta = x - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (x - self._mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    def to_dict(self) -> dict:
+        stats = {"name": self.name, "type": "numeric" if self.numeric else "text",
+                 "count": self.count, "missing": self.missing}
+        if self.numeric and self.count:
+            stats.update({
+                "min": self.min,
+                "max": self.max,
+                "mean": self._mean,
+                "std": math.sqrt(self._m2 / self.count)
+            })
+        return stats
+
+class CsvProfiler:
+    """Single pass over a CSV fed as raw byte chunks: row count, SHA-256 and per-column stats.
+
+    Chunks can split lines (and quoted fields) anywhere; complete records are
+    parsed as soon as they are available, so memory stays at one chunk plus one
+    record regardless of file size. Raises ValueError on malformed input.
+    """
+
+    def __init__(self, expected_columns: Optional[List[str]] = None, encoding: str = "utf-8"):
+        self.expected_columns = expected_columns
+        self.encoding = encoding
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.rows = 0
+        self.header: Optional[List[str]] = None
+        self.columns: List[ColumnStats] = []
+        self._tail = b""       # Incomplete last line of the previous chunk
+        self._record = ""      # Lines of a record whose quoted field spans a newline
+
+    def feed(self, chunk: bytes):
+        self.sha256.update(chunk)
+        self.size += len(chunk)
+        lines = (self._tail + chunk).split(b"\n")
+        self._tail = lines.pop()
+        for line in lines:
+            self._add_line(line + b"\n")
+
+    def _add_line(self, line: bytes):
+        try:
+            text = line.decode(self.encoding)
+        except UnicodeDecodeError as e:
+            raise ValueError(f"row {self.rows + 1} is not valid {self.encoding}: {e}") from None
+        self._record += text
+        if self._record.count('"') % 2:
+            return  # Inside a quoted field; the record continues on the next line
+        record, self._record = self._record, ""
+        if not record.strip():
+            return
+        fields = next(csv.reader([record]))
+        if self.header is None:
+            self.set_header(fields)
+        else:
+            self.add_row(fields)
+
+    def set_header(self, fields: List[str]):
+        self.header = [f.strip().lstrip("\ufeff") for f in fields]
+        if not any(self.header):
+            raise ValueError("CSV header is empty")
+        if self.expected_columns is not None:
+            missing = [c for c in self.expected_columns if c not in self.header]
+            unexpected = [c for c in self.header if c not in self.expected_columns]
+            if missing or unexpected:
+                raise ValueError(f"columns do not match the project schema "
+                                 f"(missing: {missing or 'none'}, unexpected: {unexpected or 'none'})")
+        self.columns = [ColumnStats(name) for name in self.header]
+
+    def add_row(self, fields: List[str]):
+        if len(fields) > len(self.columns):
+            raise ValueError(f"row {self.rows + 1}: expected {len(self.columns)} fields, saw {len(fields)}")
+        self.rows += 1
+        for column, value in zip(self.columns, fields):
+            column.add(value)
+        for column in self.columns[len(fields):]:
+            column.missing += 1  # Short rows are padded with missing values
+
+    def finish(self) -> dict:
+        if self._tail:
+            self._add_line(self._tail)
+            self._tail = b""
+        if self._record:
+            raise ValueError("unterminated quoted field at end of file")
+        if self.header is None:
+            raise ValueError("file is empty")
+        return {
+            "rows": self.rows,
+            "columns": len(self.columns),
+            "size": self.size,
+            "sha256": self.sha256.hexdigest(),
+            "column_stats": [c.to_dict() for c in self.columns]
+        }
+
+def profile_file(path: str, chunk_size: int = PROFILE_CHUNK_SIZE) -> dict:
+    """Profile a CSV already on disk (blocking; run it in a thread)"""
+    profiler = CsvProfiler()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            profiler.feed(chunk)
+    return profiler.finish()
+
+async def save_csv_upload(chunks: AsyncIterator[bytes], path: str, expected_columns: Optional[List[str]] = None,
+                          expected_sha256: Optional[str] = None) -> dict:
+    """Stream an uploaded CSV (e.g. MultipartFileStream.chunks()) to `path`, profiling it chunk by chunk on the way.
+
+    The header is checked against `expected_columns` as soon as the first line
+    has arrived, and any malformed row aborts the upload; in both cases the
+    partial file is removed and ValueError raised. So is a body that does not hash
+    to `expected_sha256` (the client's X-Content-SHA256). Returns the CsvProfiler result.
+    """
+    profiler = CsvProfiler(expected_columns)
+    profile = {}
+
+    async def profiled_chunks():
+        async for chunk in chunks:
+            await asyncio.to_thread(profiler.feed, chunk)
+            yield chunk
+        # Inside the stream, so a bad last record still fails before the rename
+        profile.update(profiler.finish())
+        if expected_sha256 is not None and profile["sha256"] != expected_sha256:
+            raise ValueError("file does not match its X-Content-SHA256")
+
+    await save_stream(profiled_chunks(), path)
+    return profile
+
+async def ingest_csv_upload(conn, chunks: AsyncIterator[bytes], path: str, expected_columns: Optional[List[str]] = None,
+                            declared_sha256: Optional[str] = None, min_rows: int = 0) -> dict:
+    """Store an uploaded CSV at `path` as an alias of its content blob and catalog it.
+
+    The body is always read and profiled; a declared content hash (X-Content-SHA256)
+    must match it. Content that is already stored costs no second copy on disk.
+    Raises ValueError for invalid files; the result carries `deduplicated`.
+    """
+    profile = await save_csv_upload(chunks, path, expected_columns, declared_sha256)
+    if profile["rows"] < min_rows:
+        os.remove(path)
+        raise ValueError(f"need at least {min_rows} rows, got {profile['rows']}")
+    profile["deduplicated"] = await asyncio.to_thread(dataset_store.commit, path, profile["sha256"])
+
+    await record_dataset(conn, path, profile)
+    return profile
+
+def clean_column(name) -> str:
+    """A schema column name without the brackets/quotes of list-literal schemas (same as the client)"""
+    return str(name).strip(" []'\"")
+
+def parse_csv_schema(raw) -> List[str]:
+    """projects.csv_schema is a JSON list (older rows: comma-separated text or a Python
+    list literal such as "['age','bmi']", which electron-client/python/universal_client.py also accepts)"""
+    try:
+        columns = json.loads(raw) if isinstance(raw, str) else raw
+    except ValueError:
+        columns = raw.split(",")
+    if columns and len(columns) == 1 and str(columns[0]).strip().startswith("["):
+        columns = str(columns[0]).split(",")   # A list literal stored as the JSON list's only item
+    return [clean_column(c) for c in columns or []]
+
+def _entry(row) -> dict:
+    filename, size, mtime, rows, columns, sha256, column_stats, created = row
+    return {
+        "filename": filename,
+        "rows": rows,
+        "columns": columns,
+        "size": size,
+        "sha256": sha256,
+        "created": created.isoformat() if isinstance(created, datetime) else created,
+        "column_stats": json.loads(column_stats) if column_stats else []
+    }
+
+CATALOG_COLUMNS = "filename, size_bytes, mtime, num_rows, num_columns, sha256, column_stats, file_created"
+
+async def record_dataset(conn, path: str, profile: dict):
+    """Upsert the catalog entry for `path` from a CsvProfiler result"""
+    st = os.stat(path)
+    async with conn.cursor() as cursor:
+        await cursor.execute(f"""
+            INSERT INTO dataset_catalog ({CATALOG_COLUMNS})
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                size_bytes = VALUES(size_bytes), mtime = VALUES(mtime),
+                num_rows = VALUES(num_rows), num_columns = VALUES(num_columns),
+                sha256 = VALUES(sha256), column_stats = VALUES(column_stats),
+                file_created = VALUES(file_created)
+        """, (
+            os.path.basename(path),
+            st.st_size,
+            st.st_mtime,
+            profile["rows"],
+            profile["columns"],
+            profile["sha256"],
+            json.dumps(profile["column_stats"]),
+            datetime.fromtimestamp(st.st_ctime)
+        ))
+
+async def sync_catalog(conn, directory: str = DATASET_DIR) -> List[dict]:
+    """Catalog entries for every CSV in `directory`, re-profiling only files whose size/mtime changed"""
+    async with conn.cursor() as cursor:
+        await cursor.execute(f"SELECT {CATALOG_COLUMNS} FROM dataset_catalog")
+        catalog = {row[0]: row for row in await cursor.fetchall()}
+
+    entries = []
+    on_disk = set()
+    for item in os.scandir(directory):
+        if not item.is_file() or not item.name.endswith(".csv"):
+            continue  # Subdirectories (holdouts) and in-progress .part uploads
+        on_disk.add(item.name)
+        st = item.stat()
+        row = catalog.get(item.name)
+        if row is None or row[1] != st.st_size or abs(row[2] - st.st_mtime) > 1e-3:
+            try:
+                profile = await asyncio.to_thread(profile_file, item.path)
+            except (OSError, ValueError):
+                continue  # Not a readable CSV; don't list it
+            await record_dataset(conn, item.path, profile)
+            row = (item.name, st.st_size, st.st_mtime, profile["rows"], profile["columns"],
+                   profile["sha256"], json.dumps(profile["column_stats"]), datetime.fromtimestamp(st.st_ctime))
+        entries.append(_entry(row))
+
+    removed = [name for name in catalog if name not in on_disk]
+    if removed:
+        async with conn.cursor() as cursor:
+            await cursor.executemany("DELETE FROM dataset_catalog WHERE filename = %s", [(n,) for n in removed])
+    return entries
+
+# backs /api/datasets/list and the dataset upload endpoints: uploads are profiled while they stream to disk, deduplicated through the blob store, and the result is stored in the dataset_catalog table; listing only stats the directory and re-profiles files whose size or mtime no longer match their catalog row.
@@ -0,0 +1,91 @@
+# backend/app/services/downloads.py
+import os
+import re
+from typing import Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+RANGE_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match / If-Range comparison (strong; a W/ prefix never matches)"""
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) inclusive for a single `bytes=` range; None if unsatisfiable.
+
+    Multi-range requests are served as the whole file (ValueError).
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        raise ValueError("unsupported range")
+    first, last = match.groups()
+    if not first and not last:
+        raise ValueError("empty range")
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return None
+    return start, end
+
+def iter_file_range(path: str, start: int, end: int, chunk_size: int = RANGE_CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def conditional_file_response(request: Request, path: str, filename: str, sha256: str,
+                              media_type: str = "application/octet-stream") -> Response:
+    """FileResponse with a strong ETag (the content hash), If-None-Match and single-range support.
+
+    - If-None-Match matching the ETag: 304, no body (client's cached copy is current)
+    - Range (with an If-Range that still matches, if sent): 206 with just that slice,
+      so an interrupted download resumes where it stopped
+    - otherwise the whole file, advertising Accept-Ranges
+    """
+    etag = f'"{sha256}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = os.path.getsize(path)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or etag_matches(if_range, etag)):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            byte_range = ()   # Not a range we serve: fall through to the full file
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range:
+            start, end = byte_range
+            headers.update({
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+                "Content-Disposition": f'attachment; filename="{filename}"'
+            })
+            return StreamingResponse(iter_file_range(path, start, end), status_code=206,
+                                     media_type=media_type, headers=headers)
+
+    return FileResponse(path, media_type=media_type, filename=filename, headers=headers)
+
+# used by the model download endpoints (app/routers/models.py): registry rows carry the content hash, so the ETag costs nothing to compute and is strong by construction.
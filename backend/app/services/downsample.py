@@ -0,0 +1,96 @@
+# backend/app/services/downsample.py
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+MAX_CACHED_SERIES = 64      # (session, max_points) entries kept in memory, least recently used dropped first
+
+def _extremes(rows: List[dict], keys: Sequence[str]) -> List[dict]:
+    """The rows holding the min and max of each key, in round order"""
+    keep = {}
+    for key in keys:
+        values = [r for r in rows if r.get(key) is not None]
+        if values:
+            for r in (min(values, key=lambda r: r[key]), max(values, key=lambda r: r[key])):
+                keep[id(r)] = r
+    return sorted(keep.values(), key=lambda r: (r["round"], r.get("id", 0)))
+
+class MinMaxSeries:
+    """Min/max bucketing of a per-round series that can be extended one row at a time.
+
+    Rounds fall into buckets `width` rounds wide; each bucket keeps only the real
+    rows holding the min and max of every key, so peaks and dips survive and every
+    plotted value is an actual report. `width` is a power of two: when the rounds
+    outgrow the bucket budget it doubles and neighbouring buckets merge (the
+    extremes of a union are among the extremes of its parts), so new rounds never
+    require the earlier ones again.
+    """
+
+    def __init__(self, max_points: int, keys: Sequence[str] = ("accuracy", "loss")):
+        self.keys = tuple(keys)
+        # Each bucket holds up to 2 rows per key; one point is reserved for the latest row
+        self.max_buckets = max(1, (max_points - 1) // (2 * len(self.keys)))
+        self.width = 1
+        self.buckets: Dict[int, List[dict]] = {}
+        self.count = 0
+        self.last_id = 0
+        self.latest: Optional[dict] = None
+
+    def add(self, row: dict):
+        index = (row["round"] - 1) // self.width
+        self.buckets[index] = _extremes(self.buckets.get(index, []) + [row], self.keys)
+        while max(self.buckets) >= self.max_buckets:
+            self._coarsen()
+        self.count += 1
+        self.last_id = max(self.last_id, row.get("id", 0))
+        if self.latest is None or row["round"] >= self.latest["round"]:
+            self.latest = row
+
+    def extend(self, rows: List[dict]):
+        """Add metrics rows (with their `id`) newer than the last one folded in"""
+        for row in rows:
+            # Two requests that fetched the same new rounds don't count them twice
+            if row["id"] > self.last_id:
+                self.add(row)
+
+    def _coarsen(self):
+        merged: Dict[int, List[dict]] = {}
+        for index, rows in self.buckets.items():
+            merged.setdefault(index // 2, []).extend(rows)
+        self.buckets = {index: _extremes(rows, self.keys) for index, rows in merged.items()}
+        self.width *= 2
+
+    def points(self) -> List[dict]:
+        rows = [r for index in sorted(self.buckets) for r in self.buckets[index]]
+        if self.latest is not None and (not rows or rows[-1] is not self.latest):
+            rows.append(self.latest)  # A live chart should always end at the newest round
+        return rows
+
+def downsample(rows: List[dict], max_points: int, keys: Sequence[str] = ("accuracy", "loss")) -> Tuple[List[dict], int]:
+    """One-off min/max downsampling of rows (ordered by round); returns (points, rounds per bucket)"""
+    if len(rows) <= max_points:
+        return rows, 1
+    series = MinMaxSeries(max_points, keys)
+    for row in rows:
+        series.add(row)
+    return series.points(), series.width
+
+class SeriesCache:
+    """Downsampled series per (session, max_points), extended with only the rows added since the last call"""
+
+    def __init__(self, max_entries: int = MAX_CACHED_SERIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int], MinMaxSeries]" = OrderedDict()
+
+    def get(self, session_id: int, max_points: int) -> MinMaxSeries:
+        key = (session_id, max_points)
+        series = self._entries.get(key)
+        if series is None:
+            series = self._entries[key] = MinMaxSeries(max_points)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(key)
+        return series
+
+series_cache = SeriesCache()
+
+# shrinks long metric histories for charts (app/routers/metrics.py): a 2000-round session comes back as a few hundred real rows that keep every spike, and repeat requests only read rounds newer than the cached series' last id.
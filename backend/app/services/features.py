@@ -0,0 +1,68 @@
+# backend/app/services/features.py
+import json
+import os
+import shutil
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.services.blobs import sha256_file
+
+FEATURE_CACHE_DIR = os.path.join("datasets", ".features")
+FEATURE_CACHE_VERSION = 1   # Bump when the preprocessing below changes
+
+def cache_dir(sha256: str, root: str = FEATURE_CACHE_DIR) -> str:
+    return os.path.join(root, f"{sha256}.v{FEATURE_CACHE_VERSION}")
+
+def _build(dataset_path: str, target_dir: str):
+    """Parse + normalize once and write X.npy / y.npy / meta.json into a fresh directory"""
+    import pandas as pd  # Only a cache miss pays for pandas
+
+    df = pd.read_csv(dataset_path)
+    X = df.iloc[:, :-1].to_numpy(dtype=np.float32)
+    y = df.iloc[:, -1].to_numpy(dtype=np.float32)
+
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    X = (X - mean) / (std + 1e-7)
+
+    tmp_dir = f"{target_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    np.save(os.path.join(tmp_dir, "X.npy"), X)
+    np.save(os.path.join(tmp_dir, "y.npy"), y)
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump({
+            "source": os.path.basename(dataset_path),
+            "rows": int(X.shape[0]),
+            "features": list(df.columns[:-1]),
+            "target": df.columns[-1],
+            "mean": mean.tolist(),
+            "std": std.tolist()
+        }, f)
+    try:
+        os.rename(tmp_dir, target_dir)  # Atomic: readers see a complete entry or none
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)  # Another worker built it first
+
+def load_features(dataset_path: str, sha256: Optional[str] = None,
+                  root: str = FEATURE_CACHE_DIR) -> Tuple[np.ndarray, np.ndarray, dict, bool]:
+    """Normalized features, target and normalization stats for a CSV (last column = target).
+
+    Keyed by the file's content hash, so every alias of the same data shares one
+    entry. X and y come back as read-only memory maps: a cache hit costs a few
+    page-table entries, not a CSV parse. Returns (X, y, meta, cache_hit).
+    """
+    sha256 = sha256 or sha256_file(dataset_path)
+    entry = cache_dir(sha256, root)
+    hit = os.path.isdir(entry)
+    if not hit:
+        os.makedirs(root, exist_ok=True)
+        _build(dataset_path, entry)
+
+    X = np.load(os.path.join(entry, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(entry, "y.npy"), mmap_mode="r")
+    with open(os.path.join(entry, "meta.json")) as f:
+        meta = json.load(f)
+    return X, y, meta, hit
+
+# preprocessing cache shared by centralized training (app/services/centralized.py) and anything else that needs the same normalized arrays; entries live in datasets/.features/<sha256>.v<N>/ and are never modified after the atomic rename that publishes them.
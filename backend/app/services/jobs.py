@@ -0,0 +1,170 @@
+# backend/app/services/jobs.py
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import queue
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from app.socket_manager import manager
+
+CENTRALIZED_WORKERS = int(os.getenv("CENTRALIZED_WORKERS", "1"))  # Concurrent training jobs (one process each)
+MAX_FINISHED_JOBS = 100     # Finished jobs kept around for the status endpoint
+
+FINISHED = ("completed", "failed", "cancelled")
+
+def _run_job(fn, job_id, args, progress, cancel_event):
+    """Worker-side wrapper: announce the job started, then run it"""
+    if cancel_event.is_set():
+        # Cancelled after the pool had already handed it to a worker
+        return {"cancelled": True}
+    progress.put({"job_id": job_id, "status": "running"})
+    return fn(job_id, *args, progress, cancel_event)
+
+class JobQueue:
+    """Runs CPU-heavy jobs (centralized training) in a process pool, off the event loop.
+
+    submit() returns immediately with a job id. Workers report progress through a
+    Manager queue that a background task drains and forwards over the WebSocket
+    (`<kind>_progress` messages); cancellation is a Manager event the job checks
+    between epochs. The pool and Manager are only started on the first submit.
+    """
+
+    def __init__(self, max_workers: int = CENTRALIZED_WORKERS):
+        self.max_workers = max(max_workers, 1)
+        self.jobs: Dict[str, dict] = {}
+        self._futures: Dict[str, concurrent.futures.Future] = {}
+        self._cancel_events = {}
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._mp_manager = None
+        self._progress = None
+        self._pump_task: Optional[asyncio.Task] = None
+        self._finish_tasks: Set[asyncio.Task] = set()   # The loop only holds weak references to tasks
+
+    def _start(self):
+        if self._executor is not None:
+            return
+        # spawn, not fork: the parent has a running event loop, DB pool and sockets
+        ctx = multiprocessing.get_context("spawn")
+        self._mp_manager = ctx.Manager()
+        self._progress = self._mp_manager.Queue()
+        self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx)
+        self._pump_task = asyncio.get_running_loop().create_task(self._pump())
+
+    def submit(self, kind: str, fn: Callable, *args,
+               on_done: Optional[Callable[[dict, dict], Awaitable[None]]] = None, **info) -> dict:
+        """Queue fn(job_id, *args, progress, cancel_event); on_done(job, result) runs when it succeeds"""
+        self._start()
+        self._prune()
+
+        job_id = uuid.uuid4().hex[:12]
+        cancel_event = self._mp_manager.Event()
+        self.jobs[job_id] = {
+            "job_id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "progress": None,
+            "result": None,
+            "error": None,
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            **info
+        }
+        future = self._executor.submit(_run_job, fn, job_id, args, self._progress, cancel_event)
+        self._futures[job_id] = future
+        self._cancel_events[job_id] = cancel_event
+        task = asyncio.get_running_loop().create_task(self._finish(job_id, future, on_done))
+        self._finish_tasks.add(task)
+        task.add_done_callback(self._finish_tasks.discard)
+        return dict(self.jobs[job_id])
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self.jobs.get(job_id)
+        return dict(job) if job else None
+
+    def list(self, kind: Optional[str] = None) -> list:
+        return [dict(j) for j in self.jobs.values() if kind is None or j["kind"] == kind]
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        job = self.jobs.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return self.get(job_id)
+        if self._futures[job_id].cancel():
+            # Still waiting for a worker: it will never start
+            job["status"] = "cancelled"
+        else:
+            # Running: the job stops at its next epoch boundary
+            self._cancel_events[job_id].set()
+            job["status"] = "cancelling"
+        return self.get(job_id)
+
+    async def _finish(self, job_id, future, on_done):
+        job = self.jobs[job_id]
+        try:
+            result = await asyncio.wrap_future(future)
+        except concurrent.futures.CancelledError:
+            result, job["status"] = None, "cancelled"
+        except Exception as e:
+            result, job["status"], job["error"] = None, "failed", str(e)
+        else:
+            if result.get("cancelled"):
+                job["status"] = "cancelled"
+            else:
+                job["status"], job["result"] = "completed", result
+        finally:
+            job["finished_at"] = datetime.utcnow().isoformat()
+            self._futures.pop(job_id, None)
+            self._cancel_events.pop(job_id, None)
+
+        if job["status"] == "completed" and on_done is not None:
+            try:
+                await on_done(dict(job), result)
+            except Exception as e:
+                job["status"], job["error"] = "failed", f"Could not store results: {e}"
+        await manager.broadcast({"type": f"{job['kind']}_job", "job": dict(job)})
+
+    def _next_progress(self):
+        try:
+            return self._progress.get(timeout=1.0)
+        except queue.Empty:
+            return None
+
+    async def _pump(self):
+        """Forward worker progress to job state and WebSocket clients"""
+        while True:
+            message = await asyncio.to_thread(self._next_progress)
+            if message is None:
+                continue
+            job = self.jobs.get(message["job_id"])
+            if job is None:
+                continue
+            if message.get("status") == "running":
+                if job["status"] == "queued":
+                    job["status"], job["started_at"] = "running", datetime.utcnow().isoformat()
+                await manager.broadcast({"type": f"{job['kind']}_job", "job": dict(job)})
+                continue
+            job["progress"] = message
+            await manager.broadcast({"type": f"{job['kind']}_progress", "job_id": job["job_id"], "data": message})
+
+    def _prune(self):
+        finished = [jid for jid, j in self.jobs.items() if j["status"] in FINISHED]
+        for job_id in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self.jobs[job_id]
+
+    def shutdown(self):
+        if self._executor is None:
+            return
+        for event in self._cancel_events.values():
+            event.set()
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._mp_manager.shutdown()
+        self._executor = None
+
+job_queue = JobQueue()
+
+# keeps long-running training out of the FastAPI event loop: the /api/training/centralized endpoint submits here and returns a job id, workers stream per-epoch progress back over /ws, and status/cancel endpoints read the in-memory job table.
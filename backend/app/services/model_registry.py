@@ -0,0 +1,156 @@
+# backend/app/services/model_registry.py
+import asyncio
+import os
+from datetime import datetime
+from typing import List, Optional
+
+from app.services.blobs import sha256_file
+
+MODEL_DIR = "models"
+
+VERSION_COLUMNS = """id, kind, filename, path, session_id, project_id, round, strategy, parent_id,
+                     size_bytes, sha256, accuracy, loss, eval_accuracy, eval_loss, created_at,
+                     storage, delta_base_id, stored_bytes"""
+
+# storage: 'file' (on disk as-is), 'delta' (kept as a delta against delta_base_id), 'pruned' (deleted)
+
+def version_dict(row) -> dict:
+    (version_id, kind, filename, path, session_id, project_id, server_round, strategy, parent_id,
+     size, sha256, accuracy, loss, eval_accuracy, eval_loss, created_at,
+     storage, delta_base_id, stored_bytes) = row
+    return {
+        "id": version_id,
+        "kind": kind,
+        "filename": filename,
+        "path": path,
+        "session_id": session_id,
+        "project_id": project_id,
+        "round": server_round,
+        "strategy": strategy,
+        "parent_id": parent_id,
+        "size": size,
+        "sha256": sha256,
+        "accuracy": accuracy,
+        "loss": loss,
+        "eval_accuracy": eval_accuracy,
+        "eval_loss": eval_loss,
+        "created": created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+        "storage": storage,
+        "delta_base_id": delta_base_id,
+        "stored_bytes": size if stored_bytes is None else stored_bytes
+    }
+
+async def register_model(conn, path: str, kind: str, sha256: str, size: int,
+                         session_id: Optional[int] = None, project_id: Optional[int] = None,
+                         server_round: Optional[int] = None, strategy: Optional[str] = None,
+                         accuracy: Optional[float] = None, loss: Optional[float] = None) -> int:
+    """Record a stored model; its parent is the session's previous version (lineage)"""
+    async with conn.cursor() as cursor:
+        parent_id = None
+        if session_id is not None:
+            await cursor.execute(
+                "SELECT id FROM model_versions WHERE session_id = %s AND kind = %s ORDER BY id DESC LIMIT 1",
+                (session_id, kind)
+            )
+            row = await cursor.fetchone()
+            parent_id = row[0] if row else None
+
+        await cursor.execute("""
+            INSERT INTO model_versions
+            (kind, filename, path, session_id, project_id, round, strategy, parent_id,
+             size_bytes, sha256, accuracy, loss)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id),
+                                    size_bytes = VALUES(size_bytes), sha256 = VALUES(sha256),
+                                    storage = 'file', delta_base_id = NULL, stored_bytes = NULL
+        """, (
+            kind, os.path.basename(path), path, session_id, project_id, server_round, strategy, parent_id,
+            size, sha256, accuracy, loss
+        ))
+        # LAST_INSERT_ID(id) above makes this the existing row's id when the filename was already registered
+        return cursor.lastrowid
+
+ROUND_METRICS_UPDATE = """
+    UPDATE model_versions
+    SET accuracy = COALESCE(%s, accuracy), loss = COALESCE(%s, loss),
+        eval_accuracy = COALESCE(%s, eval_accuracy), eval_loss = COALESCE(%s, eval_loss)
+    WHERE session_id = %s AND round = %s AND kind = 'global'
+"""
+
+async def record_round_metrics(cursor, session_id: int, server_round: int, accuracy: Optional[float],
+                               loss: Optional[float], eval_accuracy: Optional[float] = None,
+                               eval_loss: Optional[float] = None):
+    """Attach a round's reported metrics to the global model saved for that round (runs on the caller's cursor)"""
+    await cursor.execute(ROUND_METRICS_UPDATE, (accuracy, loss, eval_accuracy, eval_loss, session_id, server_round))
+
+async def record_rounds_metrics(cursor, rows: List[tuple]):
+    """record_round_metrics() for many rounds: rows of (accuracy, loss, eval_accuracy, eval_loss, session_id, round)"""
+    if rows:
+        await cursor.executemany(ROUND_METRICS_UPDATE, rows)
+
+async def find_model(conn, kind: str, project_id: Optional[int] = None, session_id: Optional[int] = None,
+                     best: bool = False) -> Optional[dict]:
+    """Latest (or best-scoring) version, optionally scoped to a project or session.
+
+    "Best" prefers the server-side holdout accuracy and falls back to the
+    clients' averaged accuracy for rounds without one.
+    """
+    where, args = ["kind = %s", "storage <> 'pruned'"], [kind]
+    if project_id is not None:
+        where.append("project_id = %s")
+        args.append(project_id)
+    if session_id is not None:
+        where.append("session_id = %s")
+        args.append(session_id)
+    order = "COALESCE(eval_accuracy, accuracy) IS NULL, COALESCE(eval_accuracy, accuracy) DESC, id DESC" if best else "id DESC"
+
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            f"SELECT {VERSION_COLUMNS} FROM model_versions WHERE {' AND '.join(where)} ORDER BY {order} LIMIT 1",
+            tuple(args)
+        )
+        row = await cursor.fetchone()
+    return version_dict(row) if row else None
+
+async def get_version(conn, version_id: int) -> Optional[dict]:
+    async with conn.cursor() as cursor:
+        await cursor.execute(f"SELECT {VERSION_COLUMNS} FROM model_versions WHERE id = %s", (version_id,))
+        row = await cursor.fetchone()
+    return version_dict(row) if row else None
+
+async def list_versions(conn, kind: Optional[str] = None, project_id: Optional[int] = None,
+                        session_id: Optional[int] = None, limit: int = 200,
+                        include_pruned: bool = False) -> List[dict]:
+    where, args = ([] if include_pruned else ["storage <> 'pruned'"]), []
+    for column, value in (("kind", kind), ("project_id", project_id), ("session_id", session_id)):
+        if value is not None:
+            where.append(f"{column} = %s")
+            args.append(value)
+    clause = f"WHERE {' AND '.join(where)}" if where else ""
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            f"SELECT {VERSION_COLUMNS} FROM model_versions {clause} ORDER BY id DESC LIMIT %s",
+            (*args, limit)
+        )
+        return [version_dict(row) for row in await cursor.fetchall()]
+
+async def backfill(pool, directory: str = MODEL_DIR) -> int:
+    """Register model files that predate the registry (startup, once); returns how many"""
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("SELECT filename FROM model_versions")
+            known = {row[0] for row in await cursor.fetchall()}
+
+        added = 0
+        for item in sorted(os.scandir(directory), key=lambda e: e.stat().st_mtime):
+            if not item.is_file() or item.name in known or item.name.endswith((".part", ".link")):
+                continue
+            kind = "global" if item.name.startswith("global_model_") else "centralized"
+            sha256 = await asyncio.to_thread(sha256_file, item.path)
+            await register_model(conn, os.path.join(directory, item.name), kind, sha256, item.stat().st_size)
+            added += 1
+    if added:
+        print(f"✓ Model registry: registered {added} existing model file(s)")
+    return added
+
+# replaces directory scans for model lookups: /api/model/save and centralized jobs register every file here, round metrics are attached as they are reported, and downloads/listing become indexed queries on model_versions.
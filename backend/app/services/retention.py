@@ -0,0 +1,206 @@
+# backend/app/services/retention.py
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.services.blobs import model_store
+from app.services.model_registry import MODEL_DIR, VERSION_COLUMNS, get_version, version_dict
+from app.socket_manager import manager
+
+RETENTION_INTERVAL = float(os.getenv("MODEL_RETENTION_INTERVAL", "3600"))  # Seconds between passes; 0 disables the task
+RETENTION_DELTAS = os.getenv("MODEL_RETENTION_DELTAS", "0") == "1"         # Keep dropped rounds as deltas, not nothing
+RESTORE_TTL = 3600          # Restored copies of delta-encoded rounds outlive their last download by this long
+
+DELTA_DIR = os.path.join(MODEL_DIR, ".deltas")
+RESTORE_DIR = os.path.join(MODEL_DIR, ".restored")
+
+FINISHED_SESSIONS = ("completed", "cancelled")
+
+def _score(version: dict) -> Optional[float]:
+    # Same ranking as find_model(best=True): holdout accuracy, else the clients' averaged accuracy
+    return version["eval_accuracy"] if version["eval_accuracy"] is not None else version["accuracy"]
+
+def plan_session(versions: List[dict]) -> Tuple[dict, dict, List[dict]]:
+    """(final, best, versions to compact) for one finished session's global models"""
+    final = max(versions, key=lambda v: (v["round"] or 0, v["id"]))
+    scored = [v for v in versions if _score(v) is not None]
+    best = max(scored, key=lambda v: (_score(v), v["id"])) if scored else final
+    kept_hashes = {final["sha256"], best["sha256"]}
+    # Earlier passes' deltas need their base (a model saved late may have become the new final)
+    bases = {v["delta_base_id"] for v in versions if v["storage"] == "delta"}
+    # A round identical to a kept model is just another link to the same blob: dropping it frees nothing
+    compact = [v for v in versions
+               if v["storage"] == "file" and v["sha256"] not in kept_hashes and v["id"] not in bases]
+    return final, best, compact
+
+def delta_path(version: dict) -> str:
+    return os.path.join(DELTA_DIR, f"{version['filename']}.delta")
+
+def restored_path(version: dict) -> str:
+    return os.path.join(RESTORE_DIR, version["filename"])
+
+def _has_delta(version: dict) -> bool:
+    from app.services.checkpoint import read_delta_header
+
+    try:
+        return read_delta_header(delta_path(version))["sha256"] == version["sha256"]
+    except (OSError, ValueError):
+        return False
+
+def _compact_file(version: dict, base: dict, deltas: bool) -> dict:
+    """Delta-encode (optional) and delete one round's file; returns its new storage state"""
+    try:
+        st = os.stat(version["path"])
+    except FileNotFoundError:
+        # Removed by an earlier pass that stopped before updating the registry
+        if deltas and _has_delta(version):
+            return {"storage": "delta", "stored_bytes": os.path.getsize(delta_path(version)), "freed": 0}
+        return {"storage": "pruned", "stored_bytes": 0, "freed": 0}
+
+    storage, stored_bytes = "pruned", 0
+    if deltas:
+        from app.services.checkpoint import write_delta
+
+        os.makedirs(DELTA_DIR, exist_ok=True)
+        try:
+            stored_bytes = write_delta(delta_path(version), version["path"], base["path"],
+                                       version["sha256"], base["sha256"])
+            storage = "delta"
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Model retention: no delta for {version['filename']}, pruning it ({e})")
+
+    os.remove(version["path"])
+    # A plain file frees its bytes now; a blob alias frees them when gc() drops the last link
+    return {"storage": storage, "stored_bytes": stored_bytes, "freed": st.st_size if st.st_nlink == 1 else 0}
+
+def _restore(version: dict, base: dict) -> str:
+    from app.services.checkpoint import apply_delta
+
+    dst = restored_path(version)
+    if os.path.exists(dst):
+        os.utime(dst)  # Keeps it past the next sweep
+        return dst
+    os.makedirs(RESTORE_DIR, exist_ok=True)
+    tmp_path = f"{dst}.{uuid.uuid4().hex}"  # Concurrent downloads of the same round don't share a temp file
+    if apply_delta(delta_path(version), base["path"], tmp_path) != version["sha256"]:
+        os.remove(tmp_path)
+        raise ValueError(f"Restored {version['filename']} does not match its recorded sha256")
+    os.replace(tmp_path, dst)
+    return dst
+
+def _sweep() -> int:
+    """Drop unreferenced blobs and stale restored copies; returns blob bytes freed"""
+    if os.path.isdir(RESTORE_DIR):
+        cutoff = time.time() - RESTORE_TTL
+        for item in os.scandir(RESTORE_DIR):
+            if item.is_file() and item.stat().st_mtime < cutoff:
+                os.remove(item.path)
+    return model_store.gc()
+
+async def readable_path(conn, version: dict) -> Optional[str]:
+    """Where a version's bytes can be read: its file, or a restored copy of its delta (None once pruned)"""
+    if version["storage"] == "file":
+        return version["path"]
+    if version["storage"] == "delta":
+        base = await get_version(conn, version["delta_base_id"])
+        if base is None:
+            return None
+        return await asyncio.to_thread(_restore, version, base)
+    return None
+
+class ModelRetention:
+    """Tiered retention for global model checkpoints.
+
+    Rounds of a session that is still training are all kept. Once the session is
+    completed or cancelled, only its final and best (see find_model) models stay
+    on disk; the other rounds are deleted, or with MODEL_RETENTION_DELTAS=1 kept as
+    a compressed delta against the final model (app/services/checkpoint.py) that
+    downloads transparently restore. Registry rows stay, with `storage` set to
+    'delta' or 'pruned', so lineage survives and listings skip what is gone.
+    """
+
+    def __init__(self, interval: float = RETENTION_INTERVAL, deltas: bool = RETENTION_DELTAS):
+        self.interval = interval
+        self.deltas = deltas
+        self.last_report: Optional[dict] = None
+        # session_id -> (file versions, newest version id) when a pass left nothing to compact;
+        # a model registered (or re-registered) for the session later changes it and re-opens the session
+        self.settled: Dict[int, Tuple[int, int]] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        # Created lazily so it binds to uvicorn's running loop, not the import-time one
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _session_versions(self, cursor, session_id: int) -> List[dict]:
+        await cursor.execute(
+            f"""SELECT {VERSION_COLUMNS} FROM model_versions
+                WHERE session_id = %s AND kind = 'global' AND storage <> 'pruned'""",
+            (session_id,)
+        )
+        return [version_dict(row) for row in await cursor.fetchall()]
+
+    async def run(self, conn) -> dict:
+        """One retention pass over finished sessions; returns what it did and the space reclaimed"""
+        async with self.lock:
+            started = time.monotonic()
+            report = {"sessions": 0, "delta_encoded": 0, "pruned": 0, "freed_bytes": 0, "delta_bytes": 0}
+            async with conn.cursor() as cursor:
+                await cursor.execute(f"""
+                    SELECT mv.session_id, COUNT(*), MAX(mv.id) FROM model_versions mv
+                    JOIN training_sessions ts ON ts.id = mv.session_id
+                    WHERE mv.kind = 'global' AND mv.storage = 'file'
+                      AND ts.status IN ({', '.join(['%s'] * len(FINISHED_SESSIONS))})
+                    GROUP BY mv.session_id HAVING COUNT(*) > 1
+                """, FINISHED_SESSIONS)
+                session_ids = [row[0] for row in await cursor.fetchall()
+                               if self.settled.get(row[0]) != (row[1], row[2])]
+
+                for session_id in session_ids:
+                    versions = await self._session_versions(cursor, session_id)
+                    final, best, compact = plan_session(versions)
+                    for version in compact:
+                        result = await asyncio.to_thread(_compact_file, version, final, self.deltas)
+                        await cursor.execute(
+                            "UPDATE model_versions SET storage = %s, delta_base_id = %s, stored_bytes = %s WHERE id = %s",
+                            (result["storage"], final["id"] if result["storage"] == "delta" else None,
+                             result["stored_bytes"], version["id"])
+                        )
+                        report["delta_encoded" if result["storage"] == "delta" else "pruned"] += 1
+                        report["freed_bytes"] += result["freed"]
+                        report["delta_bytes"] += result["stored_bytes"]
+                    report["sessions"] += bool(compact)
+                    kept = [v["id"] for v in versions if v["storage"] == "file" and v not in compact]
+                    self.settled[session_id] = (len(kept), max(kept, default=None))
+
+            report["freed_bytes"] += await asyncio.to_thread(_sweep)
+            report["reclaimed_bytes"] = report["freed_bytes"] - report["delta_bytes"]
+            report["duration"] = round(time.monotonic() - started, 3)
+            report["finished_at"] = datetime.utcnow().isoformat()
+            self.last_report = report
+
+        if report["delta_encoded"] or report["pruned"]:
+            print(f"✓ Model retention: {report['pruned']} round(s) pruned, {report['delta_encoded']} delta-encoded "
+                  f"across {report['sessions']} session(s), {report['reclaimed_bytes'] / 2**20:.1f} MiB reclaimed")
+            await manager.broadcast({"type": "model_retention", "data": report})
+        return report
+
+    async def loop(self, pool):
+        """Background task (app.main): a pass every `interval` seconds"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                async with pool.acquire() as conn:
+                    await self.run(conn)
+            except Exception as e:
+                print(f"⚠️ Model retention pass failed: {e}")
+
+model_retention = ModelRetention()
+
+# keeps models/ from growing by one near-duplicate checkpoint per round: finished sessions shrink to their final and best models (plus optional deltas under models/.deltas/), the registry records what happened to every round, and the blob store's gc() returns the space.
@@ -0,0 +1,158 @@
+# backend/app/services/uploads.py
+import asyncio
+import hashlib
+import os
+from typing import AsyncIterator, Dict, List, Optional
+from fastapi import Request, UploadFile
+from multipart.multipart import MultipartParser, parse_options_header
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+async def iter_upload_file(upload: UploadFile, chunk_size: int = UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Read an UploadFile in fixed-size chunks instead of one big `await file.read()`"""
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+class MultipartFileStream:
+    """Incremental multipart/form-data reader over the raw request body.
+
+    `UploadFile = File(...)` makes Starlette spool the whole body to a temp file
+    before the endpoint runs. This instead feeds request.stream() to the
+    multipart parser and hands out the `file_field` part's bytes as they arrive,
+    so they can be validated and written in one pass. Text fields must come
+    before the file part (FormData keeps append order); they are in `fields`
+    once open() returns. Raises ValueError on a malformed body.
+    """
+
+    def __init__(self, request: Request, file_field: str):
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise ValueError("expected a multipart/form-data body")
+        self.file_field = file_field
+        self.fields: Dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self._body = request.stream().__aiter__()
+        self._parser = MultipartParser(params[b"boundary"], callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = self._header_value = b""
+        self._part_name: Optional[str] = None
+        self._value = b""
+        self._skip = False      # Some other file part; its bytes are dropped
+        self._in_file = False
+        self._file_done = False
+        self._pending: List[bytes] = []  # File bytes parsed but not handed out yet
+
+    # --- parser callbacks (run inside _parser.write) ---
+
+    def _on_part_begin(self):
+        self._headers, self._part_name, self._value, self._skip = {}, None, b"", False
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._part_name = options.get(b"name", b"").decode("utf-8")
+        if self._part_name == self.file_field and b"filename" in options and self.filename is None:
+            self.filename = options[b"filename"].decode("utf-8")
+            self._in_file = True
+        elif self._file_done:
+            raise ValueError(f"form field '{self._part_name}' must come before the '{self.file_field}' file")
+        else:
+            self._skip = b"filename" in options
+
+    def _on_part_data(self, data, start, end):
+        if self._in_file:
+            self._pending.append(data[start:end])
+        elif not self._skip:
+            self._value += data[start:end]
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file, self._file_done = False, True
+        elif not self._skip:
+            self.fields[self._part_name] = self._value.decode("utf-8")
+
+    # --- reading ---
+
+    async def _pump(self) -> bool:
+        """Feed the parser the next body chunk; False once the body is exhausted"""
+        try:
+            chunk = await self._body.__anext__()
+        except StopAsyncIteration:
+            self._parser.finalize()
+            return False
+        if chunk:
+            self._parser.write(chunk)
+        return True
+
+    async def open(self):
+        """Read up to the start of the file part (collecting the fields before it)"""
+        while self.filename is None:
+            if not await self._pump():
+                raise ValueError(f"missing '{self.file_field}' file upload")
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """The file part's bytes, in the sizes they arrive in; call open() first"""
+        while True:
+            if self._pending:
+                chunk, self._pending = b"".join(self._pending), []
+                yield chunk
+            if self._file_done:
+                break
+            if not await self._pump():
+                raise ValueError("body ended in the middle of the file upload")
+        while await self._pump():
+            pass  # Closing boundary (a field after the file raises in _on_headers_finished)
+
+async def save_stream(chunks: AsyncIterator[bytes], path: str, hasher=None,
+                      expected_sha256: Optional[str] = None) -> int:
+    """Write an async byte stream to `path` chunk by chunk; returns bytes written.
+
+    Data lands in `<path>.part` first and is renamed into place when complete, so
+    readers (e.g. the model download endpoints) never see a half-written file.
+    If given, `hasher` (a hashlib object) is updated with every chunk. With
+    `expected_sha256` (a SHA-256 is computed if no hasher is passed), a body that
+    hashes to anything else raises ValueError and nothing is renamed into place.
+    Disk writes run in a worker thread so a slow disk doesn't stall the event loop.
+    """
+    if expected_sha256 is not None and hasher is None:
+        hasher = hashlib.sha256()
+    part_path = f"{path}.part"
+    size = 0
+    try:
+        f = await asyncio.to_thread(open, part_path, "wb")
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(f.write, chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+                size += len(chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+        if expected_sha256 is not None and hasher.hexdigest() != expected_sha256:
+            raise ValueError("body does not match its X-Content-SHA256")
+        await asyncio.to_thread(os.replace, part_path, path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    return size
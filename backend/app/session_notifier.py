@@ -0,0 +1,90 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional, Set
+
+class SessionNotifier:
+    """In-memory table of active training sessions; wakes up long-polling FL server managers"""
+
+    def __init__(self):
+        self.sessions: Dict[int, dict] = {}   # session_id -> session info, only 'training' rows
+        self.cancelled: Set[int] = set()      # session_ids stopped before their last round
+        self.primed = False
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def condition(self) -> asyncio.Condition:
+        # Created lazily so it binds to uvicorn's running loop, not the import-time one
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def prime(self, sessions: List[dict]):
+        """Load the sessions that were already training before this process started"""
+        async with self.condition:
+            for session in sessions:
+                self.sessions.setdefault(session["session_id"], session)
+            self.primed = True
+            self.condition.notify_all()
+
+    async def publish(self, session: dict):
+        """Insert/update a session; anything no longer 'training' is dropped from the table"""
+        async with self.condition:
+            session_id = session["session_id"]
+            if session.get("status") == "training":
+                self.sessions[session_id] = {**self.sessions.get(session_id, {}), **session}
+            else:
+                self.sessions.pop(session_id, None)
+                if session.get("status") == "cancelled":
+                    self.cancelled.add(session_id)
+            self.condition.notify_all()
+
+    async def finish(self, session_ids: List[int]):
+        """Drop sessions that completed; their FL server workers exit on their own"""
+        async with self.condition:
+            for session_id in session_ids:
+                self.sessions.pop(session_id, None)
+            self.condition.notify_all()
+
+    async def cancel(self, session_ids: List[int]):
+        """Drop sessions that were cancelled; waiting managers are told to stop their workers"""
+        async with self.condition:
+            for session_id in session_ids:
+                self.sessions.pop(session_id, None)
+                self.cancelled.add(session_id)
+            self.condition.notify_all()
+
+    def active(self, project_id: Optional[int] = None) -> List[dict]:
+        return [
+            dict(s) for _, s in sorted(self.sessions.items())
+            if project_id is None or s.get("project_id") == project_id
+        ]
+
+    def ended(self, session_ids: Iterable[int]) -> List[int]:
+        """Those of session_ids that were cancelled (completed ones are left to finish their drain)"""
+        return [sid for sid in session_ids if sid in self.cancelled]
+
+    def _next_session(self, after_id: int) -> Optional[dict]:
+        newer = [sid for sid in self.sessions if sid > after_id]
+        return dict(self.sessions[min(newer)]) if newer else None
+
+    async def wait_for_session(self, after_id: int, timeout: float, running: Iterable[int] = ()) -> Optional[dict]:
+        """Block until a training session newer than after_id exists (oldest first), or time out.
+
+        Also returns early (with None if there is no newer session) as soon as one of
+        `running` is cancelled, so the caller can stop that session's server.
+        """
+        running = list(running)
+        async with self.condition:
+            try:
+                await asyncio.wait_for(
+                    self.condition.wait_for(
+                        lambda: self._next_session(after_id) is not None or bool(self.ended(running))
+                    ),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                return None
+            return self._next_session(after_id)
+
+notifier = SessionNotifier()
+
+# keeps the table of currently training sessions in memory so the FL server can long-poll /api/training/wait instead of hitting the database every few seconds. start_training and complete_training publish to it, waiting requests are released the moment a new session is created, and clients use it to look up the port of their project's Flower server.
@@ -0,0 +1,100 @@
+"""
+Backend cold-start benchmark: time and memory to import the FastAPI app
+
+Each run starts a fresh interpreter that imports app.main (what uvicorn does
+before serving, and what every --reload restart repeats) and reports the
+import wall time, the process's peak RSS and which heavy ML libraries ended
+up loaded. TensorFlow and pandas should only ever appear in centralized
+training workers, never in the API process.
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --runs 1 --importtime 15
+
+With --importtime, the slowest modules from `python -X importtime` are listed
+for one extra run. Run from backend/; no database is needed (the pool is only
+opened in the app lifespan), placeholder settings are filled in if unset.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ["tensorflow", "keras", "pandas", "numpy", "sklearn", "h5py"]
+
+PROBE = f"""
+import json, resource, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    rss_kib //= 1024
+print(json.dumps({{
+    "seconds": elapsed,
+    "rss_mib": rss_kib / 1024,
+    "modules": len(sys.modules),
+    "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+def child_env():
+    env = dict(os.environ)
+    # Settings() requires these; importing the app never connects with them
+    for key in ("DB_HOST", "DB_USER", "DB_PASSWORD", "DB_NAME", "SECRET_KEY"):
+        env.setdefault(key, "bench")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+def run_probe(backend_dir):
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=backend_dir, env=child_env(),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def slowest_imports(backend_dir, top):
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                         cwd=backend_dir, env=child_env(), capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = [p.strip() for p in line.split(":", 1)[1].split("|")]
+        rows.append((int(cumulative_us), int(self_us), name))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", type=int, default=0, metavar="N",
+                        help="Also list the N slowest imports (cumulative)")
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print(f"{'run':>4} | {'import s':>9} | {'peak RSS MiB':>12} | {'modules':>7} | heavy libs loaded")
+    print("-" * 64)
+
+    samples = []
+    for i in range(args.runs):
+        sample = run_probe(backend_dir)
+        samples.append(sample)
+        print(f"{i + 1:>4} | {sample['seconds']:>9.3f} | {sample['rss_mib']:>12.1f} | "
+              f"{sample['modules']:>7} | {', '.join(sample['heavy']) or '-'}")
+
+    seconds = [s["seconds"] for s in samples]
+    rss = [s["rss_mib"] for s in samples]
+    print("-" * 64)
+    print(f"{'med':>4} | {statistics.median(seconds):>9.3f} | {statistics.median(rss):>12.1f} |")
+
+    if args.importtime:
+        print("\nSlowest imports (cumulative):")
+        for cumulative_us, self_us, name in slowest_imports(backend_dir, args.importtime):
+            print(f"  {cumulative_us / 1000:>9.1f} ms  (self {self_us / 1000:>7.1f} ms)  {name}")
+
+    if any(m in s["heavy"] for s in samples for m in ("tensorflow", "pandas")):
+        sys.exit("TensorFlow/pandas imported at API startup; move the import into the code path that needs it")
+
+if __name__ == "__main__":
+    main()
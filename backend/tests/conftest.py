@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Same import root as uvicorn (run from backend/): `app.services...`
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# app.config reads these at import time; the routers under test never open a connection
+for name in ("DB_HOST", "DB_USER", "DB_PASSWORD", "DB_NAME", "SECRET_KEY"):
+    os.environ.setdefault(name, "test")
@@ -0,0 +1,51 @@
+import hashlib
+import os
+
+from app.services.blobs import BlobStore, header_sha256, sha256_file
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return hashlib.sha256(data).hexdigest()
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = BlobStore(str(tmp_path))
+    a, b = str(tmp_path / "a.csv"), str(tmp_path / "b.csv")
+    sha = write(a, b"x,y\n1,2\n")
+    write(b, b"x,y\n1,2\n")
+
+    assert store.commit(a, sha) is False    # First copy becomes the blob
+    assert store.commit(b, sha) is True     # Second is just another link to it
+    assert os.path.samefile(a, b)
+    assert store.refcount(sha) == 2
+    assert store.usage() == {"blobs": 1, "logical_bytes": 16, "physical_bytes": 8}
+
+def test_alias_and_gc(tmp_path):
+    store = BlobStore(str(tmp_path))
+    a = str(tmp_path / "a.flts")
+    sha = write(a, b"model")
+    store.commit(a, sha)
+
+    alias = str(tmp_path / "copy.flts")
+    assert store.alias(sha, alias)
+    assert not store.alias("0" * 64, str(tmp_path / "missing.flts"))
+
+    os.remove(a)
+    assert store.gc() == 0      # Still referenced by the alias
+    os.remove(alias)
+    assert store.gc() == 5
+    assert not store.has(sha)
+
+def test_adopt_folds_in_existing_files(tmp_path):
+    for name in ("a.csv", "b.csv"):
+        write(str(tmp_path / name), b"same")
+    write(str(tmp_path / "c.csv"), b"other")
+    store = BlobStore(str(tmp_path))
+    assert store.adopt() == 4
+    assert sha256_file(str(tmp_path / "a.csv")) == hashlib.sha256(b"same").hexdigest()
+
+def test_header_sha256():
+    sha = "AB" * 32
+    assert header_sha256({"x-content-sha256": f" {sha} "}) == sha.lower()
+    assert header_sha256({"x-content-sha256": "xyz"}) is None
+    assert header_sha256({}) is None
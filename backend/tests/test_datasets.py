@@ -0,0 +1,72 @@
+import pytest
+
+from app.services.datasets import CsvProfiler, clean_column, parse_csv_schema, profile_file
+
+CSV = (
+    'age,name,score\n'
+    '34,"Smith, Ann",1.5\n'
+    '51,"multi\nline",2.5\n'
+    '\n'
+    '29,"say ""hi""",\n'
+    '40,Bob,-3\n'
+).encode()
+
+def profile(data, chunk_size, **kwargs):
+    profiler = CsvProfiler(**kwargs)
+    for start in range(0, len(data), chunk_size):
+        profiler.feed(data[start:start + chunk_size])
+    return profiler.finish()
+
+def test_same_result_for_any_chunk_boundary():
+    expected = profile(CSV, len(CSV))
+    assert expected["rows"] == 4
+    assert expected["size"] == len(CSV)
+    for chunk_size in range(1, len(CSV)):
+        assert profile(CSV, chunk_size) == expected
+
+def test_column_stats():
+    stats = {c["name"]: c for c in profile(CSV, 7)["column_stats"]}
+    assert stats["age"]["type"] == "numeric"
+    assert (stats["age"]["min"], stats["age"]["max"], stats["age"]["mean"]) == (29, 51, 38.5)
+    assert stats["name"]["type"] == "text"
+    assert (stats["score"]["count"], stats["score"]["missing"]) == (3, 1)
+
+def test_multibyte_characters_split_across_chunks():
+    data = "city,n\nZürich,1\nKraków,2\n".encode()
+    assert profile(data, 1)["rows"] == 2
+
+def test_header_checked_against_schema():
+    profile(CSV, 5, expected_columns=["score", "age", "name"])
+    with pytest.raises(ValueError, match="missing"):
+        profile(CSV, 5, expected_columns=["age", "name", "score", "label"])
+
+@pytest.mark.parametrize("data, message", [
+    (b"", "empty"),
+    (b"a,b\n1,2,3\n", "expected 2 fields"),
+    (b'a,b\n1,"open\n', "unterminated"),
+    (b"a,b\n\xff\xfe,1\n", "not valid utf-8"),
+])
+def test_malformed_files_are_rejected(data, message):
+    with pytest.raises(ValueError, match=message):
+        profile(data, 3)
+
+def test_profile_file(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(CSV)
+    assert profile_file(str(path), chunk_size=4) == profile(CSV, len(CSV))
+
+def test_parse_csv_schema():
+    assert parse_csv_schema('["a", " b"]') == ["a", "b"]
+    assert parse_csv_schema("a, b,c") == ["a", "b", "c"]
+    assert parse_csv_schema(None) == []
+
+def test_parse_list_literal_schema():
+    # The form zDummy/dummy-project-entry.py stores; the client strips it the same way
+    expected = ["age", "bmi", "glucose", "target"]
+    assert parse_csv_schema("['age','bmi','glucose','target']") == expected
+    assert parse_csv_schema('["[\'age\', \'bmi\', \'glucose\', \'target\']"]') == expected
+    assert clean_column(" 'target' ") == "target"
+
+    profiler = CsvProfiler(parse_csv_schema("['age','bmi','glucose','target']"))
+    profiler.feed(b"age,bmi,glucose,target\n1,2,3,0\n")
+    assert profiler.finish()["rows"] == 1
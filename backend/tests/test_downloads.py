@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+from fastapi.responses import FileResponse, StreamingResponse
+
+from app.services.downloads import conditional_file_response, etag_matches, parse_range
+
+DATA = bytes(range(256)) * 4     # 1024 bytes
+SHA = "ab" * 32
+ETAG = f'"{SHA}"'
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=1000-", (1000, 1023)),          # Open-ended
+    ("bytes=-24", (1000, 1023)),            # Suffix
+    ("bytes=-5000", (0, 1023)),             # Suffix longer than the file
+    ("bytes=1000-5000", (1000, 1023)),      # End clamped to the file
+    ("bytes=1024-", None),                  # Starts past the end: 416
+    ("bytes=-0", None),
+    ("bytes=10-5", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, len(DATA)) == expected
+
+@pytest.mark.parametrize("header", ["bytes=0-1,5-9", "bytes=-", "items=0-5", "bytes=a-b"])
+def test_parse_range_rejects_what_it_does_not_serve(header):
+    with pytest.raises(ValueError):
+        parse_range(header, len(DATA))
+
+def test_etag_matches():
+    assert etag_matches(f'"x", {ETAG}', ETAG)
+    assert etag_matches("*", ETAG)
+    assert not etag_matches(f"W/{ETAG}", ETAG)
+    assert not etag_matches(None, ETAG)
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = tmp_path / "model.flts"
+    path.write_bytes(DATA)
+    return str(path)
+
+def respond(path, **headers):
+    scope = {"type": "http", "method": "GET", "path": "/", "query_string": b"",
+             "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]}
+    return conditional_file_response(Request(scope), path, "model.flts", SHA)
+
+def body(response: StreamingResponse) -> bytes:
+    async def collect():
+        return b"".join([chunk async for chunk in response.body_iterator])
+    return asyncio.run(collect())
+
+def test_full_file_advertises_ranges(model_file):
+    response = respond(model_file)
+    assert isinstance(response, FileResponse) and response.status_code == 200
+    assert response.headers["etag"] == ETAG
+    assert response.headers["accept-ranges"] == "bytes"
+
+def test_not_modified(model_file):
+    response = respond(model_file, if_none_match=ETAG)
+    assert response.status_code == 304
+    assert response.body == b""
+
+@pytest.mark.parametrize("header, start, end", [("bytes=100-199", 100, 199), ("bytes=-24", 1000, 1023),
+                                                ("bytes=1000-", 1000, 1023)])
+def test_partial_content(model_file, header, start, end):
+    response = respond(model_file, range=header, if_range=ETAG)
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(DATA)}"
+    assert body(response) == DATA[start:end + 1]
+
+def test_unsatisfiable_range(model_file):
+    response = respond(model_file, range="bytes=2048-")
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(DATA)}"
+
+def test_multi_range_gets_the_whole_file(model_file):
+    assert respond(model_file, range="bytes=0-1,5-9").status_code == 200
+
+def test_stale_if_range_gets_the_whole_file(model_file):
+    # The file changed since the partial download started: resuming would splice two versions
+    response = respond(model_file, range="bytes=100-", if_range='"old"')
+    assert isinstance(response, FileResponse) and response.status_code == 200
@@ -0,0 +1,45 @@
+import math
+
+from app.services.downsample import MinMaxSeries, SeriesCache, downsample
+
+def make_rows(n):
+    rows = []
+    for i in range(1, n + 1):
+        rows.append({"id": i, "round": i, "accuracy": 0.5 + 0.4 * math.sin(i / 7), "loss": 1.0 / i})
+    if n > 1000:
+        rows[136]["accuracy"] = 0.99    # A one-round spike
+        rows[731]["loss"] = 5.0         # ... and one in the other series
+    return rows
+
+def test_short_series_untouched():
+    rows = make_rows(50)
+    assert downsample(rows, 100) == (rows, 1)
+
+def test_keeps_extremes_and_latest_within_budget():
+    rows = make_rows(2000)
+    points, width = downsample(rows, 200)
+    assert len(points) <= 200
+    assert width > 1
+    for key in ("accuracy", "loss"):
+        assert max(p[key] for p in points) == max(r[key] for r in rows)
+        assert min(p[key] for p in points) == min(r[key] for r in rows)
+    assert points[-1] is rows[-1]
+    assert [p["round"] for p in points] == sorted(p["round"] for p in points)
+    assert all(p in rows for p in points)   # Every plotted value is a real report
+
+def test_incremental_extension_matches_one_off():
+    rows = make_rows(1500)
+    series = MinMaxSeries(120)
+    for start in range(0, len(rows), 97):
+        series.extend(rows[start:start + 97])
+    series.extend(rows[-10:])     # Rows already folded in are ignored
+    assert series.count == len(rows)
+    assert series.points() == downsample(rows, 120)[0]
+
+def test_cache_evicts_least_recently_used():
+    cache = SeriesCache(max_entries=2)
+    first = cache.get(1, 100)
+    cache.get(2, 100)
+    assert cache.get(1, 100) is first
+    cache.get(3, 100)
+    assert list(cache._entries) == [(1, 100), (3, 100)]
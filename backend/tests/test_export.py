@@ -0,0 +1,75 @@
+import asyncio
+import json
+from datetime import datetime
+
+from app.routers import export
+from app.routers.export import EXPORTS, csv_lines, export_query, ndjson_lines
+
+def test_keyset_query_filters_and_orders_by_id():
+    sql, args = export_query("metrics", 500, project_id=2, session_id=None, limit=100)
+    assert "WHERE id > %s AND session_id IN (SELECT id FROM training_sessions WHERE project_id = %s)" in sql
+    assert sql.endswith("ORDER BY id ASC LIMIT %s") and "OFFSET" not in sql
+    assert args == (500, 2, 100)
+
+    sql, args = export_query("training_sessions", 0, project_id=2, session_id=9)
+    assert "id > %s AND id = %s AND project_id = %s" in sql and "LIMIT" not in sql
+    assert args == (0, 9, 2)
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, args):
+        after_id, limit = args[0], args[-1]
+        self.result = [row for row in self.rows if row[0] > after_id][:limit]
+
+    async def fetchall(self):
+        return self.result
+
+class FakeConn:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self):
+        return FakeCursor(self.rows)
+
+def test_pages_resume_from_next_after_id():
+    started = datetime(2026, 1, 1)
+    rows = [(i, 1, "completed", started, None, 5, "FedAvg", None) for i in (3, 8, 9)]
+    conn = FakeConn(rows)
+    first = asyncio.run(export.export_page("training_sessions", 0, 2, None, None, conn))
+    assert [item["id"] for item in first["items"]] == [3, 8]
+    assert first["items"][0]["started_at"] == "2026-01-01T00:00:00"
+    assert first["next_after_id"] == 8
+    last = asyncio.run(export.export_page("training_sessions", 8, 2, None, None, conn))
+    assert [item["id"] for item in last["items"]] == [9] and last["next_after_id"] is None
+
+async def batches(*pages):
+    for rows in pages:
+        yield rows
+
+def collect(lines):
+    async def run():
+        return b"".join([chunk async for chunk in lines]).decode()
+    return asyncio.run(run())
+
+def metrics_row(i):
+    return (i, 1, 1, i, 2, 0.5, 1.0, None, None, '{"accuracies": [0.5]}', None, datetime(2026, 1, 1))
+
+def test_ndjson_decodes_json_columns():
+    text = collect(ndjson_lines(EXPORTS["metrics"], batches([metrics_row(1)], [metrics_row(2)])))
+    records = [json.loads(line) for line in text.splitlines()]
+    assert [r["id"] for r in records] == [1, 2]
+    assert records[0]["client_metrics"] == {"accuracies": [0.5]}
+
+def test_csv_has_one_header_even_when_empty():
+    text = collect(csv_lines(EXPORTS["metrics"], batches([metrics_row(1)], [metrics_row(2)])))
+    lines = text.splitlines()
+    assert lines[0].startswith("id,session_id,project_id") and len(lines) == 3
+    assert collect(csv_lines(EXPORTS["metrics"], batches())).splitlines() == [lines[0]]
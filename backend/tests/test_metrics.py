@@ -0,0 +1,143 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.schemas import ClientRoundMetrics, MetricsBatch, MetricsReport
+from app.routers import metrics
+from app.session_notifier import SessionNotifier
+
+class FakeCursor:
+    """Records statements; SELECTs answer from `results` in order"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, args=()):
+        if self.conn.fail_on and self.conn.fail_on in query:
+            raise RuntimeError("db down")
+        self.conn.log.append(("execute", " ".join(query.split()), args))
+
+    async def executemany(self, query, rows):
+        if self.conn.fail_on and self.conn.fail_on in query:
+            raise RuntimeError("db down")
+        self.conn.log.append(("executemany", " ".join(query.split()), list(rows)))
+
+    async def fetchone(self):
+        return self.conn.results.pop(0)
+
+    async def fetchall(self):
+        return self.conn.results.pop(0)
+
+class FakeConn:
+    def __init__(self, results=(), fail_on=None):
+        self.results = list(results)
+        self.fail_on = fail_on
+        self.log = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    async def begin(self):
+        self.log.append(("begin",))
+
+    async def commit(self):
+        self.log.append(("commit",))
+
+    async def rollback(self):
+        self.log.append(("rollback",))
+
+SESSION = {"session_id": 7, "project_id": 2, "num_rounds": 3}
+
+def report(round_number, session_id=7):
+    return MetricsReport(session_id=session_id, round=round_number, num_clients=2, accuracy=0.5, loss=1.0,
+                         client_metrics={"accuracies": [0.4, 0.6]}, timestamp="2026-01-01T00:00:00")
+
+def records(round_number):
+    return [ClientRoundMetrics(round=round_number, client_id=c, accuracy=0.5, bytes_sent=64) for c in ("a", "b")]
+
+# --- Bulk ingest ---
+
+def test_batch_is_one_transaction_of_multi_row_inserts():
+    conn = FakeConn()
+    batch = MetricsBatch(session_id=7, reports=[report(2), report(3)], client_records=records(2) + records(3))
+    assert asyncio.run(metrics.store_metrics_batch(conn, SESSION, batch)) is True   # Round 3 of 3
+
+    kinds = [entry[0] for entry in conn.log]
+    assert kinds == ["begin", "executemany", "executemany", "executemany", "execute", "commit"]
+    inserts = [entry for entry in conn.log if entry[0] == "executemany"]
+    assert [len(rows) for _, _, rows in inserts] == [2, 2, 4]
+    assert all(row[0] == 7 for row in inserts[2][2])
+    assert "status='completed'" in conn.log[4][1]
+
+def test_batch_rolls_back_when_any_insert_fails():
+    conn = FakeConn(fail_on="client_round_metrics")
+    batch = MetricsBatch(session_id=7, reports=[report(1)], client_records=records(1))
+    with pytest.raises(RuntimeError):
+        asyncio.run(metrics.store_metrics_batch(conn, SESSION, batch))
+    assert conn.log[0] == ("begin",) and conn.log[-1] == ("rollback",)
+    assert ("commit",) not in conn.log
+
+# --- Session-keyed ingest ---
+
+@pytest.fixture
+def notifier(monkeypatch):
+    notifier = SessionNotifier()
+    monkeypatch.setattr(metrics, "notifier", notifier)
+    asyncio.run(notifier.prime([{"status": "training", **SESSION}]))
+    return notifier
+
+def test_report_for_a_training_session_needs_no_query(notifier):
+    conn = FakeConn()
+    assert asyncio.run(metrics.resolve_session(conn, 7)) == {"status": "training", **SESSION}
+    assert asyncio.run(metrics.resolve_session(conn, None))["session_id"] == 7
+    assert conn.log == []
+
+def test_late_report_reads_the_finished_session(notifier):
+    conn = FakeConn(results=[(5, 1, 4), None])
+    assert asyncio.run(metrics.resolve_session(conn, 5)) == {"session_id": 5, "project_id": 1, "num_rounds": 4}
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(metrics.resolve_session(conn, 99))
+    assert e.value.status_code == 404
+
+def test_last_round_report_completes_the_session(notifier):
+    conn = FakeConn()
+    asyncio.run(metrics.report_metrics(report(3), conn))
+    statements = [entry[1] for entry in conn.log]
+    assert statements[0].startswith("INSERT INTO metrics")
+    assert any("status='completed'" in s for s in statements)
+    assert notifier.active() == [] and notifier.ended([7]) == []    # Completed, not cancelled
+
+def test_batch_must_belong_to_one_session(notifier):
+    batch = MetricsBatch(session_id=7, reports=[report(1), report(2, session_id=8)])
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(metrics.report_metrics_batch(batch, FakeConn()))
+    assert e.value.status_code == 400
+
+# --- Per-client aggregates ---
+
+def test_client_summaries_are_computed_by_one_query():
+    row = ("a", 3, Decimal("0.5"), 0.4, 0.6, 0.08, 1, 3, 0.1, 0.5, 0.6)
+    conn = FakeConn(results=[[row]])
+    summary = asyncio.run(metrics.get_client_summaries(7, "accuracy", [50, 90], conn))
+
+    (_, query, args), = conn.log
+    assert query.startswith("WITH ranked AS") and "GROUP BY client_id" in query
+    assert args == (7, 50, 90)
+    client, = summary["clients"]
+    assert client["mean"] == 0.5 and client["trend"] == 0.1
+    assert client["percentiles"] == {"50": 0.5, "90": 0.6}
+
+@pytest.mark.parametrize("metric, percentile", [("client_id; DROP", [50]), ("loss", [0]), ("loss", [10] * 6)])
+def test_client_summaries_reject_bad_parameters(metric, percentile):
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(metrics.get_client_summaries(7, metric, percentile, FakeConn()))
+    assert e.value.status_code == 400
@@ -0,0 +1,102 @@
+import asyncio
+import os
+
+import pytest
+
+from app.services import retention
+from app.services.retention import ModelRetention, plan_session
+
+def version(version_id, server_round, sha256=None, accuracy=None, storage="file", delta_base_id=None, session_id=1):
+    return {"id": version_id, "kind": "global", "filename": f"r{version_id}.flts", "path": f"models/r{version_id}.flts",
+            "session_id": session_id, "project_id": 1, "round": server_round, "strategy": "FedAvg", "parent_id": None,
+            "size": 4, "sha256": sha256 or f"{version_id:064x}", "accuracy": accuracy, "loss": None,
+            "eval_accuracy": None, "eval_loss": None, "created": None, "storage": storage,
+            "delta_base_id": delta_base_id, "stored_bytes": 4}
+
+def test_plan_keeps_final_and_best():
+    versions = [version(1, 1, accuracy=0.9), version(2, 2, accuracy=0.6), version(3, 3, accuracy=0.5)]
+    final, best, compact = plan_session(versions)
+    assert (final["id"], best["id"], [v["id"] for v in compact]) == (3, 1, [2])
+
+def test_plan_skips_duplicates_of_kept_models_and_delta_bases():
+    # Round 1 is another link to the final model's blob; round 2 is the base of an earlier pass's delta
+    versions = [version(1, 1, sha256="a" * 64), version(2, 2), version(3, 3, storage="delta", delta_base_id=2),
+                version(4, 4, sha256="a" * 64), version(5, 2)]
+    final, best, compact = plan_session(versions)
+    assert final["id"] == 4 and [v["id"] for v in compact] == [5]
+
+class FakeCursor:
+    """Just enough of model_versions / training_sessions for ModelRetention.run"""
+
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, args=()):
+        versions = [v for v in self.db["versions"] if v["kind"] == "global"]
+        if "COUNT(*)" in query:
+            counts = {}
+            for v in versions:
+                if v["storage"] == "file" and self.db["status"][v["session_id"]] in args:
+                    count, newest = counts.get(v["session_id"], (0, 0))
+                    counts[v["session_id"]] = (count + 1, max(newest, v["id"]))
+            self.rows = [(sid, c, m) for sid, (c, m) in counts.items() if c > 1]
+        elif query.lstrip().startswith("UPDATE"):
+            storage, base_id, stored_bytes, version_id = args
+            target = next(v for v in versions if v["id"] == version_id)
+            target.update(storage=storage, delta_base_id=base_id, stored_bytes=stored_bytes)
+        else:
+            self.db["plans"] += 1
+            self.rows = [tuple(v[k] for k in ROW_KEYS) for v in versions
+                         if v["session_id"] == args[0] and v["storage"] != "pruned"]
+
+    async def fetchall(self):
+        return self.rows
+
+ROW_KEYS = ("id", "kind", "filename", "path", "session_id", "project_id", "round", "strategy", "parent_id", "size",
+            "sha256", "accuracy", "loss", "eval_accuracy", "eval_loss", "created", "storage", "delta_base_id",
+            "stored_bytes")
+
+class FakeConn:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+@pytest.fixture
+def models_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("models")
+    monkeypatch.setattr(retention, "_sweep", lambda: 0)
+
+def add_model(db, v):
+    with open(v["path"], "wb") as f:
+        f.write(v["sha256"][:4].encode())
+    db["versions"].append(v)
+
+def test_late_model_reopens_a_settled_session(models_dir):
+    db = {"versions": [], "status": {1: "completed"}, "plans": 0}
+    for v in (version(1, 1, accuracy=0.9), version(2, 2, accuracy=0.6), version(3, 3, accuracy=0.5)):
+        add_model(db, v)
+    policy = ModelRetention(interval=0, deltas=False)
+    conn = FakeConn(db)
+
+    report = asyncio.run(policy.run(conn))
+    assert report["pruned"] == 1 and not os.path.exists("models/r2.flts")
+
+    asyncio.run(policy.run(conn))
+    assert db["plans"] == 1     # Settled: final and best are all that is left
+
+    add_model(db, version(4, 4, accuracy=0.4))    # Final model registered after the session ended
+    report = asyncio.run(policy.run(conn))
+    assert db["plans"] == 2
+    assert report["pruned"] == 1
+    assert {v["id"]: v["storage"] for v in db["versions"]} == {1: "file", 2: "pruned", 3: "pruned", 4: "file"}
+    assert not os.path.exists("models/r3.flts")
@@ -0,0 +1,62 @@
+import asyncio
+
+from app.session_notifier import SessionNotifier
+
+def session(session_id, project_id=1, status="training"):
+    return {"status": status, "session_id": session_id, "project_id": project_id}
+
+def test_wait_returns_the_next_newer_session():
+    async def scenario():
+        notifier = SessionNotifier()
+        await notifier.prime([session(1)])
+        assert (await notifier.wait_for_session(0, 1))["session_id"] == 1
+
+        waiter = asyncio.create_task(notifier.wait_for_session(1, 5))
+        await asyncio.sleep(0)
+        await notifier.publish(session(2, project_id=2))
+        assert (await waiter)["session_id"] == 2
+        assert await notifier.wait_for_session(2, 0.01) is None
+
+    asyncio.run(scenario())
+
+def test_wait_ends_when_a_running_session_is_cancelled():
+    async def scenario():
+        notifier = SessionNotifier()
+        await notifier.prime([session(1), session(2, project_id=2)])
+        waiter = asyncio.create_task(notifier.wait_for_session(2, 5, running=[1, 2]))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        await notifier.cancel([1])      # e.g. a newer Start for project 1 cancelled it
+        assert await asyncio.wait_for(waiter, 1) is None
+        assert notifier.ended([1, 2]) == [1]
+
+    asyncio.run(scenario())
+
+def test_completed_sessions_are_not_reported_as_ended():
+    # The last round's report completes the session while its worker is still draining;
+    # the manager must not be told to terminate it
+    async def scenario():
+        notifier = SessionNotifier()
+        await notifier.prime([session(1), session(2, project_id=2)])
+        waiter = asyncio.create_task(notifier.wait_for_session(2, 0.1, running=[1, 2]))
+        await asyncio.sleep(0)
+
+        await notifier.finish([1])
+        await notifier.publish(session(2, status="completed"))
+        assert await waiter is None         # Timed out instead of waking up
+        assert notifier.ended([1, 2]) == []
+        assert notifier.active() == []
+
+    asyncio.run(scenario())
+
+def test_publish_drops_finished_sessions():
+    async def scenario():
+        notifier = SessionNotifier()
+        await notifier.publish(session(3))
+        await notifier.publish({**session(3), "server_port": 8081})
+        assert notifier.active(1) == [{**session(3), "server_port": 8081}]
+        await notifier.publish(session(3, status="completed"))
+        assert notifier.active() == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,55 @@
+import asyncio
+
+from app.routers import training
+from app.session_notifier import SessionNotifier
+
+class FakeCursor:
+    """training_sessions as {id: status}"""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.rows, self.rowcount = [], 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, args=()):
+        if query.startswith("SELECT"):
+            self.rows = [(sid,) for sid, status in self.statuses.items() if status == "training"]
+        else:
+            status, _, session_id = args
+            self.rowcount = int(self.statuses.get(session_id) == "training")
+            if self.rowcount:
+                self.statuses[session_id] = status
+
+    async def fetchall(self):
+        return self.rows
+
+class FakeConn:
+    def __init__(self, statuses):
+        self.statuses = statuses
+
+    def cursor(self):
+        return FakeCursor(self.statuses)
+
+def test_complete_reports_only_sessions_that_were_training(monkeypatch):
+    notifier = SessionNotifier()
+    monkeypatch.setattr(training, "notifier", notifier)
+    statuses = {1: "cancelled", 2: "training", 3: "training"}
+    conn = FakeConn(statuses)
+
+    async def scenario():
+        await notifier.prime([{"status": "training", "session_id": 2}, {"status": "training", "session_id": 3}])
+        assert (await training.complete_training(1, conn))["sessions"] == []
+        assert (await training.complete_training(2, conn))["sessions"] == [2]
+        assert (await training.complete_training(2, conn))["sessions"] == []
+        assert (await training.fail_training(3, conn))["sessions"] == [3]
+        assert (await training.complete_training(None, conn))["sessions"] == []
+
+    asyncio.run(scenario())
+    assert statuses == {1: "cancelled", 2: "completed", 3: "failed"}
+    assert notifier.active() == []
+    assert notifier.ended([1, 2, 3]) == []      # Nothing here was cancelled through the notifier
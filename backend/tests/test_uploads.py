@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from app.services.datasets import save_csv_upload
+from app.services.uploads import MultipartFileStream, save_stream
+
+BOUNDARY = "----fedapp-test"
+
+class FakeRequest:
+    """The parts of a Starlette Request MultipartFileStream uses; the body arrives in `chunk_size` pieces"""
+
+    def __init__(self, body, chunk_size=7, content_type=f"multipart/form-data; boundary={BOUNDARY}"):
+        self.headers = {"content-type": content_type}
+        self.body = body
+        self.chunk_size = chunk_size
+        self.consumed = 0
+
+    async def stream(self):
+        for start in range(0, len(self.body), self.chunk_size):
+            self.consumed = start + self.chunk_size
+            yield self.body[start:start + self.chunk_size]
+        yield b""
+
+def multipart(*parts):
+    body = b""
+    for name, value, filename in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n".encode()
+        if filename:
+            body += b"Content-Type: text/csv\r\n"
+        body += b"\r\n" + value + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+async def collect(request, field="file"):
+    upload = MultipartFileStream(request, field)
+    await upload.open()
+    return upload, b"".join([chunk async for chunk in upload.chunks()])
+
+def test_multipart_fields_and_file():
+    csv = b"a,b\r\n1,2\r\n" * 50
+    request = FakeRequest(multipart(("project_id", b"7", None), ("other", b"", "x.bin"), ("file", csv, "data.csv")))
+    upload, data = asyncio.run(collect(request))
+    assert upload.fields == {"project_id": "7"}
+    assert upload.filename == "data.csv"
+    assert data == csv
+
+def test_file_is_read_incrementally():
+    csv = b"a,b\n" + b"1,2\n" * 1000
+    request = FakeRequest(multipart(("file", csv, "big.csv")), chunk_size=64)
+
+    async def first_chunk():
+        upload = MultipartFileStream(request, "file")
+        await upload.open()
+        async for _ in upload.chunks():
+            return request.consumed
+
+    assert asyncio.run(first_chunk()) < len(request.body) // 10
+
+@pytest.mark.parametrize("body, message", [
+    (multipart(("project_id", b"1", None)), "missing 'file'"),
+    (multipart(("file", b"a\n", "a.csv"), ("project_id", b"1", None)), "must come before"),
+    (multipart(("file", b"a\n" * 20, "a.csv"))[:-40], "ended in the middle"),
+])
+def test_malformed_multipart(body, message):
+    with pytest.raises(ValueError, match=message):
+        asyncio.run(collect(FakeRequest(body)))
+
+def test_not_multipart():
+    with pytest.raises(ValueError):
+        MultipartFileStream(FakeRequest(b"", content_type="text/csv"), "file")
+
+async def chunks_of(data, size=5):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+def test_save_stream_checks_declared_hash(tmp_path):
+    path = str(tmp_path / "model.flts")
+    data = b"tensor bytes" * 10
+    good = hashlib.sha256(data).hexdigest()
+
+    with pytest.raises(ValueError):
+        asyncio.run(save_stream(chunks_of(data), path, hashlib.sha256(), expected_sha256="0" * 64))
+    assert os.listdir(tmp_path) == []   # Nothing renamed into place, no .part left behind
+
+    assert asyncio.run(save_stream(chunks_of(data), path, hashlib.sha256(), expected_sha256=good)) == len(data)
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+def test_save_stream_hashes_by_itself_when_given_only_the_expected_hash(tmp_path):
+    path = str(tmp_path / "model.flts")
+    data = b"tensor bytes" * 10
+    with pytest.raises(ValueError):
+        asyncio.run(save_stream(chunks_of(data), path, expected_sha256="0" * 64))
+    assert asyncio.run(save_stream(chunks_of(data), path, expected_sha256=hashlib.sha256(data).hexdigest())) == len(data)
+
+def test_bad_csv_never_replaces_the_existing_file(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"a,b\n1,2\n")
+    with pytest.raises(ValueError):
+        asyncio.run(save_csv_upload(chunks_of(b"a,b\n1,2,3\n"), str(path)))
+    with pytest.raises(ValueError, match="X-Content-SHA256"):
+        asyncio.run(save_csv_upload(chunks_of(b"a,b\n3,4\n"), str(path), expected_sha256="0" * 64))
+    assert path.read_bytes() == b"a,b\n1,2\n"
+    assert sorted(os.listdir(tmp_path)) == ["data.csv"]
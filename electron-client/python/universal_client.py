@@ -7,8 +7,10 @@ import sys
 import tempfile
 import importlib.util
 import os
+import time
 # import json
 import ast
+from urllib.parse import urlparse
 
 
 # API_BASE = "https://api.kaif-federatedapp.me"
@@ -28,14 +30,16 @@ class UniversalClient(fl.client.NumPyClient):
 
     def fit(self, parameters, config):
         self.model.set_weights(parameters)
+        fit_started = time.perf_counter()
         history = self.model.fit(
             self.x_train, self.y_train,
             epochs=5, batch_size=32, validation_split=0.1, verbose=0
         )
+        fit_seconds = time.perf_counter() - fit_started
         loss = history.history['loss'][-1]
         accuracy = history.history['accuracy'][-1]
         print(f"[{self.client_id}] Round - Acc: {accuracy:.4f}, Loss: {loss:.4f}", flush=True)
-        return self.model.get_weights(), len(self.x_train), {"loss": float(loss), "accuracy": float(accuracy)}
+        return self.model.get_weights(), len(self.x_train), {"loss": float(loss), "accuracy": float(accuracy), "client_id": self.client_id, "fit_seconds": fit_seconds}
 
     def evaluate(self, parameters, config):
         self.model.set_weights(parameters)
@@ -66,6 +70,19 @@ def load_model_from_api(api_url, project_id, input_shape):
 
 
 
+def resolve_server_address(api_url, project_id, fallback='127.0.0.1:8080'):
+    """Ask the backend which port this project's Flower server is running on"""
+    try:
+        res = requests.get(f"{api_url}/api/training/server/{project_id}", timeout=10)
+        res.raise_for_status()
+        data = res.json()
+        host = data.get('host') or urlparse(api_url).hostname
+        return f"{host}:{data['port']}"
+    except Exception as e:
+        print(f"⚠️ Could not look up FL server for project {project_id} ({e}), using {fallback}", flush=True)
+        return fallback
+
+
 def validate_dataset(csv_path, expected_schema):
     try:
         df = pd.read_csv(csv_path)
@@ -118,11 +135,14 @@ def main():
     parser.add_argument('--project-id', type=int, required=True)
     parser.add_argument('--client-id', type=str, required=True)
     parser.add_argument('--data-path', type=str, required=True)
-    # Default to VPS IP:PORT (no Cloudflare tunnel, no SSL)
-    parser.add_argument('--server', type=str, default='127.0.0.1:8080')
+    # Default: ask the API which port the project's FL server is on (sessions run concurrently)
+    parser.add_argument('--server', type=str, default=None)
     parser.add_argument('--api-url', type=str, default='http://127.0.0.1:8000')
     args = parser.parse_args()
 
+    if not args.server:
+        args.server = resolve_server_address(args.api_url, args.project_id)
+
     print(f"🚀 Universal FL Client: {args.client_id}", flush=True)
     print(f"Project ID: {args.project_id}", flush=True)
     print(f"Server: {args.server}", flush=True)
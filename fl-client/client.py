@@ -9,11 +9,16 @@ import numpy as np
 import pandas as pd
 from typing import Dict, Tuple
 import argparse
+import hashlib
+import json
 import requests
 import pickle
 import os
+import time
 
 BACKEND_URL = "http://localhost:8000"
+DOWNLOAD_CHUNK_SIZE = 1 << 20   # 1 MiB
+DOWNLOAD_ATTEMPTS = 5           # Resumed attempts before giving up on a model download
 
 class DiabetesClient(fl.client.NumPyClient):
     """Flower client for diabetes prediction model"""
@@ -35,7 +40,8 @@ class DiabetesClient(fl.client.NumPyClient):
         # Update local model with global parameters
         self.model.set_weights(parameters)
         
-        # Train locally
+        # Train locally (timed so the server can split its round-trip time into compute vs network)
+        fit_started = time.perf_counter()
         history = self.model.fit(
             self.x_train, 
             self.y_train,
@@ -44,6 +50,7 @@ class DiabetesClient(fl.client.NumPyClient):
             validation_split=0.1,
             verbose=0
         )
+        fit_seconds = time.perf_counter() - fit_started
         
         # Get training metrics
         loss = history.history['loss'][-1]
@@ -56,7 +63,9 @@ class DiabetesClient(fl.client.NumPyClient):
         # Return updated model parameters and metrics
         return self.model.get_weights(), len(self.x_train), {
             "loss": float(loss),
-            "accuracy": float(accuracy)
+            "accuracy": float(accuracy),
+            "client_id": self.client_id,  # Lets the server name stragglers/latencies per hospital
+            "fit_seconds": fit_seconds
         }
     
     def evaluate(self, parameters, config):
@@ -112,33 +121,84 @@ def load_local_data(data_path):
     
     return X_train, y_train, X_test, y_test, X.shape[1]
 
+def _save_download_meta(meta_path, meta):
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+
 def download_global_model(client_id):
-    """Download global model from server after training"""
-    try:
-        print(f"\n📥 Downloading global model for {client_id}...")
-        
-        response = requests.get(
-            f"{BACKEND_URL}/api/model/download/global",
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            # Save model locally
-            os.makedirs(f"client_models/{client_id}", exist_ok=True)
-            model_path = f"client_models/{client_id}/global_model.pkl"
-            
-            with open(model_path, 'wb') as f:
-                f.write(response.content)
-            
-            print(f"✓ Global model saved to: {model_path}")
-            return model_path
-        else:
-            print(f"⚠ Failed to download model: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"⚠ Error downloading model: {e}")
-        return None
+    """Download global model from server after training.
+
+    Cached by ETag: if the server's model is unchanged it answers 304 and nothing
+    is re-sent. A dropped connection resumes with a Range request from the bytes
+    already on disk instead of starting over.
+    """
+    model_dir = f"client_models/{client_id}"
+    os.makedirs(model_dir, exist_ok=True)
+    meta_path = os.path.join(model_dir, "global_model.json")
+    partial_path = os.path.join(model_dir, "global_model.download")
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+    print(f"\n📥 Downloading global model for {client_id}...")
+    for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+        headers = {}
+        if meta.get("etag") and os.path.exists(meta.get("path", "")):
+            headers["If-None-Match"] = meta["etag"]
+        offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+        if offset and meta.get("partial_etag"):
+            # Only resume if the server still has the same model (otherwise it sends all of it)
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = meta["partial_etag"]
+
+        try:
+            with requests.get(f"{BACKEND_URL}/api/model/download/global", headers=headers,
+                              stream=True, timeout=(10, 60)) as response:
+                if response.status_code == 304:
+                    print(f"✓ Global model unchanged, using cached copy: {meta['path']}")
+                    return meta["path"]
+                if response.status_code == 416:
+                    os.remove(partial_path)  # Partial file no longer matches; start over
+                    continue
+                if response.status_code not in (200, 206):
+                    print(f"⚠ Failed to download model: {response.status_code}")
+                    return None
+
+                etag = response.headers.get("ETag")
+                # Keep the server's format: .flts tensor stream or legacy .pkl
+                ext = os.path.splitext(response.headers.get("content-disposition", "").strip('"; '))[1] or ".pkl"
+                meta["partial_etag"] = etag
+                _save_download_meta(meta_path, meta)
+
+                with open(partial_path, "ab" if response.status_code == 206 else "wb") as f:
+                    for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+        except requests.RequestException as e:
+            print(f"⚠ Download interrupted ({e}); retrying ({attempt}/{DOWNLOAD_ATTEMPTS})")
+            time.sleep(min(2 ** attempt, 30))
+            continue
+
+        # The ETag is the content's SHA-256: check the reassembled file before trusting it
+        if etag:
+            h = hashlib.sha256()
+            with open(partial_path, "rb") as f:
+                for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+                    h.update(chunk)
+            if h.hexdigest() != etag.strip('"'):
+                print(f"⚠ Downloaded model failed its checksum; retrying ({attempt}/{DOWNLOAD_ATTEMPTS})")
+                os.remove(partial_path)
+                continue
+
+        model_path = os.path.join(model_dir, f"global_model{ext}")
+        os.replace(partial_path, model_path)
+        meta = {"etag": etag, "path": model_path}
+        _save_download_meta(meta_path, meta)
+        print(f"✓ Global model saved to: {model_path}")
+        return model_path
+
+    print("⚠ Error downloading model: giving up after repeated failures")
+    return None
 
 def register_client(client_id, total_samples):
     """Register client with backend"""
@@ -0,0 +1,131 @@
+import concurrent.futures
+import numpy as np
+
+MIN_SHARD_SIZE = 1 << 16        # Elements; smaller shards cost more in dispatch than they save
+SHARDS_PER_WORKER = 4           # Over-split a little so uneven layer sizes still balance
+
+class StreamingAggregator:
+    """Weighted average (FedAvg/FedProx) folded one client result at a time.
+
+    Each result is multiplied by its example count into a preallocated scratch
+    buffer and added to float32 running sums, so aggregation needs O(model)
+    memory no matter how many clients report. The arithmetic matches Flower's
+    `aggregate` (layer * n, summed in arrival order, divided by the total).
+
+    With workers > 1 the flattened tensors are split into shards that are
+    reduced concurrently on a thread pool (NumPy ufuncs release the GIL). Every
+    element still sees exactly the same operations in the same order, so the
+    result is bit-identical to the serial path.
+    """
+
+    def __init__(self, workers=1, executor=None, min_shard_size=MIN_SHARD_SIZE):
+        self.workers = max(int(workers), 1)
+        self.min_shard_size = min_shard_size
+        self._executor = executor
+        self._owns_executor = False
+        self._sums = None
+        self._scratch = None
+        self._dtypes = None
+        self._shards = None
+        self.num_examples = 0
+        self.num_results = 0
+
+    @property
+    def parallel(self):
+        return self._shards is not None and len(self._shards) > 1
+
+    def _allocate(self, arrays):
+        self._sums = [np.zeros(a.shape, dtype=np.float32) for a in arrays]
+        self._dtypes = [a.dtype for a in arrays]
+
+        total = sum(a.size for a in arrays)
+        if self.workers > 1 and total >= 2 * self.min_shard_size:
+            self._shards = self._build_shards(arrays, total)
+            self._scratch = np.empty(total, dtype=np.float32)   # One slot per element: shards never overlap
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+                self._owns_executor = True
+        else:
+            self._scratch = np.empty(max((a.size for a in arrays), default=0), dtype=np.float32)
+
+    def _build_shards(self, arrays, total):
+        """(layer index, start, stop, offset into the flat scratch buffer) covering every element"""
+        shard_size = max(self.min_shard_size, -(-total // (self.workers * SHARDS_PER_WORKER)))
+        shards, offset = [], 0
+        for index, array in enumerate(arrays):
+            for start in range(0, array.size, shard_size):
+                shards.append((index, start, min(start + shard_size, array.size), offset + start))
+            offset += array.size
+        return shards
+
+    def add(self, arrays, num_examples):
+        """Fold one client's weights (list of ndarrays, may be read-only views) into the sums"""
+        if self._sums is None:
+            self._allocate(arrays)
+        elif len(arrays) != len(self._sums):
+            raise ValueError(f"Expected {len(self._sums)} tensors, got {len(arrays)}")
+        for acc, layer in zip(self._sums, arrays):
+            if layer.shape != acc.shape:
+                raise ValueError(f"Tensor shape {layer.shape} does not match {acc.shape}")
+
+        weight = np.float32(num_examples)
+        if self.parallel:
+            self._add_sharded(arrays, weight)
+        else:
+            for acc, layer in zip(self._sums, arrays):
+                scratch = self._scratch[:layer.size].reshape(layer.shape)
+                np.multiply(layer, weight, out=scratch, casting="unsafe")
+                np.add(acc, scratch, out=acc)
+
+        self.num_examples += num_examples
+        self.num_results += 1
+
+    def _add_sharded(self, arrays, weight):
+        flat_layers = [np.ascontiguousarray(layer).reshape(-1) for layer in arrays]
+        flat_sums = [acc.reshape(-1) for acc in self._sums]
+
+        def fold(shard):
+            index, start, stop, offset = shard
+            scratch = self._scratch[offset:offset + stop - start]
+            acc = flat_sums[index][start:stop]
+            np.multiply(flat_layers[index][start:stop], weight, out=scratch, casting="unsafe")
+            np.add(acc, scratch, out=acc)
+
+        for _ in self._executor.map(fold, self._shards):
+            pass
+
+    def result(self):
+        """Weighted average as a list of ndarrays in the clients' original dtypes"""
+        if not self.num_results:
+            self.close()
+            return None
+
+        if self.parallel:
+            flat_sums = [acc.reshape(-1) for acc in self._sums]
+
+            def divide(shard):
+                index, start, stop, _ = shard
+                acc = flat_sums[index][start:stop]
+                np.divide(acc, self.num_examples, out=acc)
+
+            for _ in self._executor.map(divide, self._shards):
+                pass
+        else:
+            for acc in self._sums:
+                np.divide(acc, self.num_examples, out=acc)
+
+        averaged = [
+            acc if acc.dtype == dtype else acc.astype(dtype)
+            for acc, dtype in zip(self._sums, self._dtypes)
+        ]
+        self._sums = None   # Sums were divided in place; the aggregator is spent
+        self.close()
+        return averaged
+
+    def close(self):
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._owns_executor = False
+
+# used by StreamingAggregationMixin in dynamic_server.py; see benchmarks/bench_aggregation.py for memory/time against Flower's aggregate().
@@ -0,0 +1,96 @@
+"""
+Aggregation benchmark: Flower's aggregate() vs StreamingAggregator
+
+Simulates N clients returning the same model as .npy-encoded tensors (what a
+FitRes holds) and measures the extra memory (tracemalloc peak) and wall time
+each approach needs to produce the weighted average.
+
+    python benchmarks/bench_aggregation.py --clients 10 100 500 --params 250000
+    python benchmarks/bench_aggregation.py --clients 20 --params 20000000 --workers 1 2 4 8
+
+With --workers, the streaming path is also run sharded across that many
+threads and checked to be bit-identical to the serial result.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+from flwr.common import Parameters, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.server.strategy.aggregate import aggregate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from aggregation import StreamingAggregator
+from tensor_stream import npy_array
+
+def make_layer_shapes(num_params):
+    """Dense-net-like layers summing to roughly num_params"""
+    hidden = max(int((num_params / 2) ** 0.5), 1)
+    return [(hidden, hidden), (hidden,), (hidden, hidden), (hidden,), (hidden, 1), (1,)]
+
+def simulate_clients(num_clients, shapes, seed=0):
+    rng = np.random.default_rng(seed)
+    base = [rng.standard_normal(shape).astype(np.float32) for shape in shapes]
+    results = []
+    for _ in range(num_clients):
+        weights = [layer + np.float32(0.01) * rng.standard_normal(layer.shape).astype(np.float32) for layer in base]
+        results.append((ndarrays_to_parameters(weights).tensors, int(rng.integers(50, 500))))
+    return results
+
+def flower_aggregate(results):
+    """What FedAvg.aggregate_fit does: decode every client's weights, then average"""
+    decoded = [
+        (parameters_to_ndarrays(Parameters(tensors=tensors, tensor_type="numpy.ndarray")), n)
+        for tensors, n in results
+    ]
+    return aggregate(decoded)
+
+def streaming_aggregate(results, workers=1):
+    aggregator = StreamingAggregator(workers=workers)
+    for tensors, n in results:
+        aggregator.add([npy_array(t) for t in tensors], n)
+    return aggregator.result()
+
+def measure(fn, results):
+    tracemalloc.start()
+    start = time.perf_counter()
+    output = fn(results)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return output, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--params", type=int, default=250_000, help="Approximate parameters per model")
+    parser.add_argument("--workers", type=int, nargs="*", default=[], help="Also time sharded aggregation")
+    args = parser.parse_args()
+
+    shapes = make_layer_shapes(args.params)
+    model_mb = sum(int(np.prod(s)) for s in shapes) * 4 / 2**20
+    print(f"Model: {model_mb:.2f} MiB float32 ({len(shapes)} tensors)\n")
+    print(f"{'clients':>8} | {'flower peak MiB':>15} | {'flower s':>9} | {'stream peak MiB':>15} | {'stream s':>9} | {'max |diff|':>10}")
+    print("-" * 82)
+
+    for num_clients in args.clients:
+        results = simulate_clients(num_clients, shapes)
+        ref, flower_s, flower_peak = measure(flower_aggregate, results)
+        out, stream_s, stream_peak = measure(streaming_aggregate, results)
+        diff = max(float(np.max(np.abs(a - b))) for a, b in zip(ref, out))
+        print(f"{num_clients:>8} | {flower_peak / 2**20:>15.1f} | {flower_s:>9.3f} | "
+              f"{stream_peak / 2**20:>15.1f} | {stream_s:>9.3f} | {diff:>10.2e}")
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            sharded = streaming_aggregate(results, workers=workers)
+            elapsed = time.perf_counter() - start
+            identical = all(np.array_equal(a, b) for a, b in zip(out, sharded))
+            print(f"{'':>8}   sharded x{workers:<3} {elapsed:>9.3f} s  "
+                  f"speedup {stream_s / elapsed:>5.2f}x  bit-identical={identical}")
+        del results, ref, out
+
+if __name__ == "__main__":
+    main()
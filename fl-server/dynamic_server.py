@@ -1,27 +1,74 @@
 import flwr as fl
+from flwr.common import Code, FitIns, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.server.history import History
+from flwr.server.server import evaluate_clients, fit_client
 from flwr.server.strategy import FedAvg, FedProx
+import concurrent.futures
 import requests
 import time
-import pickle
 import os
+import multiprocessing
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
+from reporter import BackgroundReporter
+from tensor_stream import iter_tensor_stream, npy_array
+from aggregation import StreamingAggregator
+from server_eval import HoldoutEvaluator
 
 # Config
 # API_BASE = os.getenv("API_BASE", "http://localhost:8000")
-POLL_INTERVAL = 3
+WAIT_TIMEOUT = 30   # Seconds the backend holds each long-poll open
+RETRY_DELAY = 5     # Back-off after a failed long-poll (backend down, etc.)
 # Load environment variables from .env at project root
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 
 API_BASE = os.getenv("API_BASE", "http://localhost:8000")
+FL_BIND_HOST = os.getenv("FL_BIND_HOST", "0.0.0.0")
+FL_PUBLIC_HOST = os.getenv("FL_PUBLIC_HOST")        # Host clients should dial; unset = same host as the API
+FL_PORTS = os.getenv("FL_PORTS", "8080-8089")       # One Flower server per concurrent session
+TENSOR_STREAM_MEDIA_TYPE = "application/x-fl-tensors"
+AGG_WORKERS = int(os.getenv("AGG_WORKERS", "1"))   # Threads for sharded aggregation; 1 = serial
+ROUND_DEADLINE = float(os.getenv("ROUND_DEADLINE", "0"))  # Seconds per fit round; 0 = wait for every client
+ROUND_QUORUM = int(os.getenv("ROUND_QUORUM", "2"))        # Results needed before a round may close at its deadline
+LATE_RESULTS = os.getenv("LATE_RESULTS", "drop")          # "drop" or "carry" (fold into the next round)
+FEDBUFF_BUFFER_SIZE = int(os.getenv("FEDBUFF_BUFFER_SIZE", "2"))            # Updates per FedBuff model version
+FEDBUFF_STALENESS_EXPONENT = float(os.getenv("FEDBUFF_STALENESS_EXPONENT", "0.5"))  # weight = (1 + staleness) ** -exponent
+FEDBUFF_SERVER_LR = float(os.getenv("FEDBUFF_SERVER_LR", "1.0"))
+FEDBUFF_MAX_FAILURES = int(os.getenv("FEDBUFF_MAX_FAILURES", "3"))  # Consecutive failed fits before a client is benched
+CLIENT_EVAL_EVERY = int(os.getenv("CLIENT_EVAL_EVERY", "1"))  # Client evaluate fan-out every N rounds; 0 = never
 
 
 # --- 1. The Reporting Logic (Mixin) ---
-# We use a Mixin so we can attach this logic to EITHER strategy
+# We use a Mixin so we can attach this logic to EITHER strategy.
+# Everything is handed to a BackgroundReporter so aggregate_fit never waits on HTTP.
 class ReportingMixin:
-    def report_metrics(self, server_round, results):
+    reporter = None     # Set per session in run_fl_session
+    session_id = project_id = strategy_name = None  # Ditto; sent with every model upload
+    fit_latencies = {}  # client_id -> seconds to return its fit result this round
+    stragglers = []     # client_ids that missed this round's deadline
+    _pending_report = None  # Held until the round (incl. evaluation) is over, see flush_report
+    _timings = None         # phase -> seconds spent in it so far this round
+    _round_started = None   # monotonic time the current round's clock started
+
+    def record_fit_timing(self, server_round, latencies, stragglers):
+        self.fit_latencies = latencies
+        self.stragglers = stragglers
+
+    def add_timing(self, phase, started):
+        """Add the time since `started` (a time.monotonic() reading) to this round's `phase`"""
+        if self._timings is None:
+            self._timings = {}
+        if self._round_started is None:
+            self._round_started = started
+        self._timings[phase] = self._timings.get(phase, 0.0) + (time.monotonic() - started)
+
+    def report_metrics(self, server_round, results, extra_client_metrics=None):
         if not results:
             return
+        started = time.monotonic()
+        # A report still held from an earlier round (its evaluation never ran) goes out first
+        self.flush_report()
         
         # Calculate Averages
         accuracies = [r.metrics.get("accuracy", 0) for _, r in results]
@@ -29,66 +76,536 @@ class ReportingMixin:
         avg_acc = sum(accuracies) / len(accuracies)
         avg_loss = sum(losses) / len(losses)
 
-        # Send to Backend
-        try:
-            payload = {
-                "round": server_round,
-                "num_clients": len(results),
-                "accuracy": avg_acc,
-                "loss": avg_loss,
-                "client_metrics": {"accuracies": accuracies},
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            requests.post(f"{API_BASE}/api/training/metrics", json=payload)
-            print(f"✅ Round {server_round} ({self.__class__.__name__}): Acc={avg_acc:.4f}")
-        except Exception as e:
-            print(f"❌ Reporting failed: {e}")
+        # Queue for the backend
+        payload = {
+            # Keys the report to its session, so the backend stores it without looking the session up
+            "session_id": self.session_id,
+            "project_id": self.project_id,
+            "round": server_round,
+            "num_clients": len(results),
+            "accuracy": avg_acc,
+            "loss": avg_loss,
+            "client_metrics": {"accuracies": accuracies, **(extra_client_metrics or {})},
+            "client_latencies": self.fit_latencies,
+            "stragglers": self.stragglers,
+            "timestamp": datetime.utcnow().isoformat(),
+            # Compute time each client reports for model.fit; client_latencies minus this is network/queueing
+            "timings": {"client_fit": {
+                str(r.metrics.get("client_id", proxy.cid)): r.metrics["fit_seconds"]
+                for proxy, r in results if "fit_seconds" in r.metrics
+            }}
+        }
+        # One row per client for the backend's client_round_metrics table (sent with the report in one batch call)
+        payload["client_records"] = [{
+            "round": server_round,
+            "client_id": str(r.metrics.get("client_id", proxy.cid)),
+            "accuracy": r.metrics.get("accuracy"),
+            "loss": r.metrics.get("loss"),
+            "num_examples": r.num_examples,
+            "fit_seconds": r.metrics.get("fit_seconds"),
+            # Recorded when the result was folded; its tensors are dropped by then
+            "bytes_sent": r.metrics.get("bytes_sent")
+        } for proxy, r in results]
+        # Held until evaluation is done, so the round's holdout score and full timing go out with it
+        self._pending_report = payload
+        self.add_timing("report_metrics", started)
+
+    def attach_evaluation(self, eval_result):
+        """Add the server-side holdout score of this round's model to the held report"""
+        if self._pending_report is not None and eval_result is not None:
+            loss, metrics = eval_result
+            self._pending_report["eval_loss"] = loss
+            self._pending_report["eval_accuracy"] = metrics.get("accuracy")
+
+    def flush_report(self):
+        """Send the held round report with the timing breakdown collected since the last one"""
+        payload, self._pending_report = self._pending_report, None
+        if payload is None:
+            return
+        now = time.monotonic()
+        timings = {phase: round(seconds, 4) for phase, seconds in (self._timings or {}).items()}
+        if self._round_started is not None:
+            timings["round_total"] = round(now - self._round_started, 4)
+        payload["timings"].update(timings)
+        self._timings, self._round_started = None, now
+        self._send_report(payload)
 
-    def save_and_upload_model(self, parameters):
+    def _send_report(self, payload):
+        client_records = payload.pop("client_records", [])
+        self.reporter.report_metrics(payload, client_records)
+        print(f"📊 Round {payload['round']} ({self.__class__.__name__}): Acc={payload['accuracy']:.4f} (queued)")
+
+    def save_and_upload_model(self, parameters, server_round):
         if not parameters: 
             return
-        timestamp = int(time.time())
-        filename = f"global_model_{timestamp}.pkl"
-        # Save locally
-        with open(filename, "wb") as f:
-            pickle.dump(parameters, f)
-        
-        # Upload
-        try:
-            with open(filename, "rb") as f:
-                requests.post(
-                    f"{API_BASE}/api/model/save", 
-                    files={'file': (filename, f, 'application/octet-stream')}
-                )
-            print(f"💾 Model uploaded: {filename}")
-        except Exception as e:
-            print(f"⚠️ Upload failed: {e}")
-        
-        if os.path.exists(filename):
-            os.remove(filename)
+        started = time.monotonic()
+        tensors = parameters.tensors
+
+        # Registry metadata: the backend records which session/round this model came from
+        params = {
+            "session_id": self.session_id,
+            "project_id": self.project_id,
+            "round": server_round,
+            "strategy": self.strategy_name,
+        }
+        if self._pending_report is not None:
+            params["accuracy"] = self._pending_report["accuracy"]
+            params["loss"] = self._pending_report["loss"]
+        params = {k: v for k, v in params.items() if v is not None}
 
-# --- 2. The Custom Strategies ---
+        def upload(session):
+            # Streamed straight from the aggregated tensors as a chunked body (no pickle, no temp file)
+            res = session.post(
+                f"{API_BASE}/api/model/save",
+                params=params,
+                data=iter_tensor_stream(tensors),
+                headers={"Content-Type": TENSOR_STREAM_MEDIA_TYPE},
+                timeout=self.reporter.timeout
+            )
+            if res.ok:
+                print(f"💾 Model uploaded: {res.json().get('model_path')} ({sum(len(t) for t in tensors)} bytes)")
+            return res
+
+        self.reporter.submit("model upload", upload)
+        # Only the hand-off is on the round's clock; the HTTP upload runs on the reporter thread
+        self.add_timing("save_and_upload_model", started)
+
+# --- 2. Streaming Aggregation ---
+# Folds each client's FitRes into running sums as it arrives instead of decoding
+# every client's weights at once, so peak server memory is O(model) not O(clients x model).
+# With AGG_WORKERS > 1 each fold is sharded across a thread pool (bit-identical to serial).
+class StreamingAggregationMixin:
+    _agg_executor = None
+
+    def begin_fit_round(self, server_round):
+        if AGG_WORKERS > 1 and self._agg_executor is None:
+            self._agg_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=AGG_WORKERS, thread_name_prefix="fl-aggregate"
+            )
+        self._aggregator = StreamingAggregator(workers=AGG_WORKERS, executor=self._agg_executor)
+
+    def accumulate_fit_result(self, fit_res):
+        """Fold one result into the round's sums, then drop its tensors so they can be freed"""
+        started = time.monotonic()
+        tensors = fit_res.parameters.tensors
+        self._aggregator.add([npy_array(t) for t in tensors], fit_res.num_examples)
+        fit_res.metrics["bytes_sent"] = sum(len(t) for t in tensors)   # For the round report, see report_metrics
+        fit_res.parameters.tensors = []
+        self.add_timing("aggregate_fold", started)
 
-class CustomFedAvg(FedAvg, ReportingMixin):
+    def aggregate_fit(self, server_round, results, failures):
+        if not results:
+            return None, {}
+        # Do not aggregate if there are failures and failures are not accepted
+        if not self.accept_failures and failures:
+            return None, {}
+
+        # Results not already folded by StreamingServer (e.g. plain fl.server.Server) are folded here
+        aggregator = getattr(self, "_aggregator", None)
+        if aggregator is None or aggregator.num_results == 0:
+            self.begin_fit_round(server_round)
+            for _, fit_res in results:
+                self.accumulate_fit_result(fit_res)
+
+        started = time.monotonic()
+        parameters_aggregated = ndarrays_to_parameters(self._aggregator.result())
+        self._aggregator = None
+        self.add_timing("aggregate_fit", started)
+
+        # Aggregate custom metrics if aggregation fn was provided
+        metrics_aggregated = {}
+        if self.fit_metrics_aggregation_fn:
+            fit_metrics = [(res.num_examples, res.metrics) for _, res in results]
+            metrics_aggregated = self.fit_metrics_aggregation_fn(fit_metrics)
+
+        return parameters_aggregated, metrics_aggregated
+
+class ReadySignalMixin:
+    """Sets `ready` (a multiprocessing Event) once the server is listening.
+
+    Flower binds the gRPC port before it calls Server.fit, so fit is where
+    the session's supervisor learns the port is safe to hand to clients.
+    """
+    ready = None    # Set per session in run_fl_session
+
+    def signal_ready(self):
+        if self.ready is not None:
+            self.ready.set()
+
+    def fit(self, num_rounds, timeout):
+        self.signal_ready()
+        return super().fit(num_rounds, timeout)
+
+class StreamingServer(ReadySignalMixin, fl.server.Server):
+    """fl.server.Server whose fit round hands each result to the strategy as soon as it arrives.
+
+    With a round deadline, the round is aggregated as soon as the deadline has
+    passed and at least `quorum` results are in; slower clients are left running.
+    Their late results are dropped, or with late_policy="carry" folded into the
+    next round. Clients still busy with a late fit are not sent new work.
+    """
+
+    def __init__(self, *, client_manager, strategy, deadline=None, quorum=1, late_policy="drop"):
+        super().__init__(client_manager=client_manager, strategy=strategy)
+        self.deadline = deadline
+        self.quorum = quorum
+        self.late_policy = late_policy
+        self._lock = threading.Lock()
+        self._in_flight = {}        # cid -> future of a fit that missed its round's deadline
+        self._late_results = []     # (client_proxy, fit_res) waiting to be carried into the next round
+        self._client_names = {}     # cid -> client_id reported in fit metrics
+
+    def _client_name(self, client_proxy, fit_res=None):
+        if fit_res is not None and "client_id" in fit_res.metrics:
+            self._client_names[client_proxy.cid] = str(fit_res.metrics["client_id"])
+        return self._client_names.get(client_proxy.cid, client_proxy.cid)
+
+    def _on_late_fit(self, client_proxy, future):
+        with self._lock:
+            self._in_flight.pop(client_proxy.cid, None)
+            if future.exception() is not None:
+                return
+            _, fit_res = future.result()
+            self._client_name(client_proxy, fit_res)
+            if self.late_policy == "carry" and fit_res.status.code == Code.OK:
+                self._late_results.append((client_proxy, fit_res))
+
+    def fit_round(self, server_round, timeout):
+        configure_started = time.monotonic()
+        client_instructions = self.strategy.configure_fit(
+            server_round=server_round,
+            parameters=self.parameters,
+            client_manager=self._client_manager,
+        )
+        self.strategy.add_timing("configure_fit", configure_started)
+        with self._lock:
+            busy = set(self._in_flight)
+            carried, self._late_results = self._late_results, []
+        client_instructions = [(c, ins) for c, ins in client_instructions if c.cid not in busy]
+        if not client_instructions:
+            print(f"fit_round {server_round}: no clients selected, cancel")
+            return None
+
+        self.strategy.begin_fit_round(server_round)
+        results, failures = [], []
+        latencies, stragglers = {}, []
+
+        for client_proxy, fit_res in carried:
+            self.strategy.accumulate_fit_result(fit_res)
+            results.append((client_proxy, fit_res))
+
+        # Not a context manager: leaving the `with` would wait for stragglers
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        started = time.monotonic()
+        submitted = {
+            executor.submit(fit_client, client_proxy, ins, timeout): client_proxy
+            for client_proxy, ins in client_instructions
+        }
+        deadline_at = started + self.deadline if self.deadline else None
+        pending = set(submitted)
+
+        while pending:
+            now = time.monotonic()
+            wait_for = None if deadline_at is None or now >= deadline_at else deadline_at - now
+            done, pending = concurrent.futures.wait(
+                pending, timeout=wait_for, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                client_proxy = submitted[future]
+                failure = future.exception()
+                if failure is not None:
+                    failures.append(failure)
+                    continue
+                _, fit_res = future.result()
+                if fit_res.status.code != Code.OK:
+                    failures.append((client_proxy, fit_res))
+                    continue
+                latencies[self._client_name(client_proxy, fit_res)] = round(time.monotonic() - started, 3)
+                self.strategy.accumulate_fit_result(fit_res)
+                results.append((client_proxy, fit_res))
+
+            # Past the deadline with a quorum: stop waiting for the slow ones
+            if deadline_at is not None and time.monotonic() >= deadline_at and len(results) >= self.quorum:
+                break
+
+        with self._lock:
+            for future in pending:
+                client_proxy = submitted[future]
+                stragglers.append(self._client_name(client_proxy))
+                self._in_flight[client_proxy.cid] = future
+                future.add_done_callback(lambda f, c=client_proxy: self._on_late_fit(c, f))
+        executor.shutdown(wait=False)
+        self.strategy.add_timing("fit_clients", started)   # Wall time waiting on clients (folds overlap with it)
+
+        if stragglers:
+            print(f"⏱️ Round {server_round}: aggregated {len(results)} results at the deadline, "
+                  f"{len(stragglers)} straggler(s) {'carried over' if self.late_policy == 'carry' else 'dropped'}: {stragglers}")
+        self.strategy.record_fit_timing(server_round, latencies, stragglers)
+
+        parameters_aggregated, metrics_aggregated = self.strategy.aggregate_fit(server_round, results, failures)
+        return parameters_aggregated, metrics_aggregated, (results, failures)
+
+    def evaluate_round(self, server_round, timeout):
+        with self._lock:
+            busy = set(self._in_flight)
+        if not busy:
+            return super().evaluate_round(server_round, timeout)
+
+        # Same as Flower's evaluate_round, minus clients still busy with a late fit
+        client_instructions = [
+            (c, ins) for c, ins in self.strategy.configure_evaluate(
+                server_round=server_round,
+                parameters=self.parameters,
+                client_manager=self._client_manager,
+            )
+            if c.cid not in busy
+        ]
+        if not client_instructions:
+            self.strategy.flush_report()    # No client evaluation this round after all
+            return None
+        results, failures = evaluate_clients(client_instructions, max_workers=self.max_workers, timeout=timeout)
+        loss_aggregated, metrics_aggregated = self.strategy.aggregate_evaluate(server_round, results, failures)
+        return loss_aggregated, metrics_aggregated, (results, failures)
+
+class BufferedAsyncServer(ReadySignalMixin, fl.server.Server):
+    """fl.server.Server without a round barrier (FedBuff-style asynchronous aggregation).
+
+    Every connected client is kept training: as soon as one returns it is sent
+    the newest global model again. Its update, taken as the delta against the
+    model version it started from, goes into the strategy's buffer; once the
+    buffer holds `buffer_size` updates it is applied and the model version is
+    bumped. num_rounds counts model versions.
+
+    A client whose fit fails is sent the model again right away. After
+    `max_failures` failures in a row it is benched until the next version;
+    if every connected client is benched the session stops early.
+    """
+
+    POLL_INTERVAL = 1.0     # Seconds between checks for newly connected clients
+
+    def __init__(self, *, client_manager, strategy, max_failures=FEDBUFF_MAX_FAILURES):
+        super().__init__(client_manager=client_manager, strategy=strategy)
+        self.max_failures = max_failures
+
+    def fit(self, num_rounds, timeout):
+        self.signal_ready()
+        history = History()
+        self.parameters = self._get_initial_parameters(timeout=timeout)
+        self._client_manager.wait_for(self.strategy.min_available_clients)
+
+        version = 0
+        snapshots = {0: parameters_to_ndarrays(self.parameters)}   # version -> weights, kept while a client trains on it
+        in_flight = {}      # future -> (client_proxy, base version, dispatch time)
+        failures = {}       # cid -> consecutive failed fits; benched at max_failures until the next version
+        latencies = {}
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        self.strategy.begin_fit_round(version + 1)
+        print(f"🔀 FedBuff: {num_rounds} versions, buffer of {self.strategy.buffer_size} updates")
+
+        while version < num_rounds:
+            # Hand the current model to every idle client (including ones that joined late)
+            busy = {client_proxy.cid for client_proxy, _, _ in in_flight.values()}
+            clients = self._client_manager.all()
+            for cid, client_proxy in clients.items():
+                if cid in busy or failures.get(cid, 0) >= self.max_failures:
+                    continue
+                ins = FitIns(self.parameters, self.strategy.fit_config(version))
+                future = executor.submit(fit_client, client_proxy, ins, timeout)
+                in_flight[future] = (client_proxy, version, time.monotonic())
+
+            if not in_flight and clients:
+                # Every connected client is benched: nothing can bump the version any more
+                print(f"❌ FedBuff: every client failed {self.max_failures} fits in a row, stopping at version {version}")
+                break
+            if not in_flight:
+                time.sleep(self.POLL_INTERVAL)     # Every client disconnected; wait for one to (re)join
+                continue
+
+            done, _ = concurrent.futures.wait(
+                in_flight, timeout=self.POLL_INTERVAL, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                client_proxy, base_version, dispatched = in_flight.pop(future)
+                error = future.exception()
+                if error is None and future.result()[1].status.code != Code.OK:
+                    error = future.result()[1].status.message
+                if error is not None:
+                    # Re-dispatched on the next pass of the loop unless it has failed too often
+                    failures[client_proxy.cid] = failures.get(client_proxy.cid, 0) + 1
+                    print(f"⚠️ FedBuff: fit failed on {client_proxy.cid} "
+                          f"({failures[client_proxy.cid]}/{self.max_failures}): {error}")
+                    continue
+                _, fit_res = future.result()
+                failures.pop(client_proxy.cid, None)
+
+                name = str(fit_res.metrics.get("client_id", client_proxy.cid))
+                latencies[name] = round(time.monotonic() - dispatched, 3)
+                self.strategy.accumulate_update(client_proxy, fit_res, snapshots[base_version], version - base_version)
+                if not self.strategy.buffer_full():
+                    continue
+
+                # Buffer full: apply it and publish a new model version
+                version += 1
+                self.strategy.record_fit_timing(version, latencies, [])
+                new_weights, fit_metrics = self.strategy.apply_buffer(version, snapshots[version - 1])
+                self.parameters = ndarrays_to_parameters(new_weights)
+                snapshots[version] = new_weights
+                history.add_metrics_distributed_fit(server_round=version, metrics=fit_metrics)
+                latencies, failures = {}, {}
+
+                res_cen = self.strategy.evaluate(version, parameters=self.parameters)
+                if res_cen is not None:
+                    history.add_loss_centralized(server_round=version, loss=res_cen[0])
+                    history.add_metrics_centralized(server_round=version, metrics=res_cen[1])
+                if version >= num_rounds:
+                    break
+
+            # Forget versions no client is still training on
+            live = {base_version for _, base_version, _ in in_flight.values()} | {version}
+            for old in [v for v in snapshots if v not in live]:
+                del snapshots[old]
+
+        # Let in-flight fits finish (their updates are discarded) so clients are idle for evaluation
+        if in_flight:
+            print(f"⏳ FedBuff: waiting for {len(in_flight)} in-flight update(s) to finish")
+            concurrent.futures.wait(in_flight, timeout=timeout)
+        executor.shutdown(wait=False)
+
+        res_fed = self.evaluate_round(server_round=version, timeout=timeout)
+        if res_fed is not None and res_fed[0] is not None:
+            history.add_loss_distributed(server_round=version, loss=res_fed[0])
+            history.add_metrics_distributed(server_round=version, metrics=res_fed[1])
+        return history
+
+# --- 3. Server-side Evaluation ---
+# When the project has a holdout dataset, evaluate_fn (HoldoutEvaluator) scores every
+# new global model on the server, so the client evaluate fan-out can be thinned out.
+#
+# The round report is sent once evaluation is over: right after the server-side
+# evaluation, or after the client evaluate round when one is due this round.
+class ServerEvaluationMixin:
+    client_eval_every = CLIENT_EVAL_EVERY
+    client_eval_follows = True  # The server runs evaluate_round right after evaluate() (Flower's loop)
+
+    def client_eval_due(self, server_round):
+        return self.client_eval_every > 0 and server_round % self.client_eval_every == 0
+
+    def configure_evaluate(self, server_round, parameters, client_manager):
+        if not self.client_eval_due(server_round):
+            return []   # Flower skips the evaluate round when no client is selected
+        started = time.monotonic()
+        instructions = super().configure_evaluate(server_round, parameters, client_manager)
+        self.add_timing("configure_evaluate", started)
+        self._evaluate_clients_started = time.monotonic()
+        return instructions
+
+    def evaluate(self, server_round, parameters):
+        started = time.monotonic()
+        result = super().evaluate(server_round, parameters)
+        if server_round > 0:
+            if result is not None:
+                self.add_timing("evaluate_server", started)
+            self.attach_evaluation(result)
+            if not (self.client_eval_follows and self.client_eval_due(server_round)):
+                self.flush_report()
+        return result
+
+    def aggregate_evaluate(self, server_round, results, failures):
+        self.add_timing("evaluate_clients", self._evaluate_clients_started)
+        started = time.monotonic()
+        aggregated = super().aggregate_evaluate(server_round, results, failures)
+        self.add_timing("aggregate_evaluate", started)
+        self.flush_report()
+        return aggregated
+
+# --- 4. The Custom Strategies ---
+
+class CustomFedAvg(ServerEvaluationMixin, StreamingAggregationMixin, FedAvg, ReportingMixin):
     def aggregate_fit(self, server_round, results, failures):
         aggregated_parameters, aggregated_metrics = super().aggregate_fit(server_round, results, failures)
         self.report_metrics(server_round, results)
         if aggregated_parameters:
-            self.save_and_upload_model(aggregated_parameters)
+            self.save_and_upload_model(aggregated_parameters, server_round)
         return aggregated_parameters, aggregated_metrics
 
-class CustomFedProx(FedProx, ReportingMixin):
+class CustomFedProx(ServerEvaluationMixin, StreamingAggregationMixin, FedProx, ReportingMixin):
     def aggregate_fit(self, server_round, results, failures):
         aggregated_parameters, aggregated_metrics = super().aggregate_fit(server_round, results, failures)
         self.report_metrics(server_round, results)
         if aggregated_parameters:
-            self.save_and_upload_model(aggregated_parameters)
+            self.save_and_upload_model(aggregated_parameters, server_round)
         return aggregated_parameters, aggregated_metrics
 
-# --- 3. The Main Loop ---
+class CustomFedBuff(ServerEvaluationMixin, StreamingAggregationMixin, FedAvg, ReportingMixin):
+    """Buffered asynchronous FedAvg, driven by BufferedAsyncServer.
+
+    Client deltas are weighted by examples * (1 + staleness) ** -staleness_exponent,
+    where staleness is how many versions the global model moved while the client
+    trained. Their weighted mean, scaled by server_lr, is added to the model.
+    """
+
+    client_eval_follows = False     # BufferedAsyncServer evaluates clients once, after the last version
+
+    def __init__(self, *, buffer_size=FEDBUFF_BUFFER_SIZE, staleness_exponent=FEDBUFF_STALENESS_EXPONENT,
+                 server_lr=FEDBUFF_SERVER_LR, **kwargs):
+        super().__init__(**kwargs)
+        self.buffer_size = buffer_size
+        self.staleness_exponent = staleness_exponent
+        self.server_lr = server_lr
+        self._buffered = []     # (client_proxy, fit_res) in the current buffer, for metrics
+        self._staleness = []
+
+    def fit_config(self, version):
+        config = self.on_fit_config_fn(version) if self.on_fit_config_fn else {}
+        return {**config, "model_version": version}
 
-def run_fl_session(session_id, strategy_name):
-    print(f"🚀 Starting Session {session_id} using {strategy_name}")
+    def staleness_weight(self, staleness):
+        return (1 + staleness) ** -self.staleness_exponent
+
+    def accumulate_update(self, client_proxy, fit_res, base_weights, staleness):
+        """Fold one client's delta against the version it trained on into the buffer"""
+        started = time.monotonic()
+        delta = [npy_array(t) - base for t, base in zip(fit_res.parameters.tensors, base_weights)]
+        self._aggregator.add(delta, fit_res.num_examples * self.staleness_weight(staleness))
+        fit_res.metrics["bytes_sent"] = sum(len(t) for t in fit_res.parameters.tensors)
+        fit_res.parameters.tensors = []
+        self._buffered.append((client_proxy, fit_res))
+        self._staleness.append(staleness)
+        self.add_timing("aggregate_fold", started)
+
+    def buffer_full(self):
+        return len(self._buffered) >= self.buffer_size
+
+    def apply_buffer(self, version, global_weights):
+        started = time.monotonic()
+        mean_delta = self._aggregator.result()
+        new_weights = [
+            (weights + self.server_lr * delta).astype(weights.dtype, copy=False)
+            for weights, delta in zip(global_weights, mean_delta)
+        ]
+        self.add_timing("aggregate_fit", started)
+
+        metrics_aggregated = {}
+        if self.fit_metrics_aggregation_fn:
+            fit_metrics = [(res.num_examples, res.metrics) for _, res in self._buffered]
+            metrics_aggregated = self.fit_metrics_aggregation_fn(fit_metrics)
+
+        # Reported per model version: the backend's `round` is the version number
+        self.report_metrics(version, self._buffered, {"staleness": self._staleness})
+        self.save_and_upload_model(ndarrays_to_parameters(new_weights), version)
+
+        self._buffered, self._staleness = [], []
+        self.begin_fit_round(version + 1)
+        return new_weights, metrics_aggregated
+
+# --- 5. The Main Loop ---
+
+def run_fl_session(session_id, strategy_name, port=8080, project_id=None, num_rounds=None, ready=None):
+    print(f"🚀 Starting Session {session_id} using {strategy_name} on port {port}")
+
+    # Scores each global model on the project's holdout (if one is registered); built once, reused every round
+    evaluator = HoldoutEvaluator(API_BASE, project_id) if project_id else None
     
     # DYNAMIC STRATEGY SELECTION
     if strategy_name == "FedProx":
@@ -97,50 +614,224 @@ def run_fl_session(session_id, strategy_name):
             fraction_fit=1.0,
             fraction_evaluate=1.0,
             min_fit_clients=2,
-            min_available_clients=2
+            min_available_clients=2,
+            evaluate_fn=evaluator
+        )
+    elif strategy_name == "FedBuff":
+        strategy = CustomFedBuff(
+            fraction_fit=1.0,
+            fraction_evaluate=1.0,
+            min_fit_clients=2,
+            min_available_clients=2,
+            evaluate_fn=evaluator
         )
     else:
         strategy = CustomFedAvg(
             fraction_fit=1.0,
             fraction_evaluate=1.0,
             min_fit_clients=2,
-            min_available_clients=2
+            min_available_clients=2,
+            evaluate_fn=evaluator
+        )
+
+    strategy.reporter = BackgroundReporter(API_BASE)
+    strategy.session_id, strategy.project_id, strategy.strategy_name = session_id, project_id, strategy_name
+
+    if strategy_name == "FedBuff":
+        # No round barrier; num_rounds below counts model versions
+        server = BufferedAsyncServer(client_manager=fl.server.SimpleClientManager(), strategy=strategy)
+    else:
+        server = StreamingServer(
+            client_manager=fl.server.SimpleClientManager(),
+            strategy=strategy,
+            deadline=ROUND_DEADLINE or None,
+            quorum=ROUND_QUORUM,
+            late_policy=LATE_RESULTS
         )
+    server.ready = ready
 
     # Start Server (Blocking)
-    fl.server.start_server(
-        server_address="0.0.0.0:8080",
-        config=fl.server.ServerConfig(num_rounds=5),
-        strategy=strategy
+    try:
+        fl.server.start_server(
+            server_address=f"{FL_BIND_HOST}:{port}",
+            server=server,
+            # The project's num_rounds (same number the backend uses to mark the session complete)
+            config=fl.server.ServerConfig(num_rounds=num_rounds or 5)
+        )
+    finally:
+        # Drain queued reports before the supervisor marks the session complete
+        strategy.flush_report()
+        strategy.reporter.close()
+
+class PortPool:
+    """Thread-safe pool of Flower ports"""
+
+    def __init__(self, spec):
+        self._free = self._parse(spec)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse(spec):
+        ports = []
+        for part in spec.split(","):
+            part = part.strip()
+            if "-" in part:
+                first, last = part.split("-")
+                ports.extend(range(int(first), int(last) + 1))
+            elif part:
+                ports.append(int(part))
+        if not ports:
+            raise ValueError(f"FL_PORTS is empty: {spec!r}")
+        return ports
+
+    def acquire(self):
+        """A free port, or None if every port is in use (never blocks)"""
+        with self._lock:
+            return self._free.pop(0) if self._free else None
+
+    def release(self, port):
+        with self._lock:
+            self._free.append(port)
+
+class SessionSupervisor:
+    """Runs each session's Flower server in its own worker process on a pooled port.
+
+    launch() never blocks the long-poll loop: a session that finds every port
+    busy is queued and started when a worker exits. Sessions the backend
+    reports as cancelled (see cancel) are dropped from the queue, or their
+    worker is terminated so its port goes back to the pool.
+    """
+
+    def __init__(self, ports):
+        self.ports = ports
+        # spawn, not fork: the manager has watcher threads and an open HTTP session
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self.workers = {}       # session_id -> (process, port)
+        self.queued = []        # sessions waiting for a free port, oldest first
+        self.cancelled = set()  # session_ids whose worker has been told to stop
+
+    def tracked(self):
+        """Session ids this manager is serving or has queued (sent with every long-poll)"""
+        with self._lock:
+            ids = set(self.workers) | {session["session_id"] for session in self.queued}
+            return sorted(ids - self.cancelled)
+
+    def launch(self, session):
+        with self._lock:
+            self.queued.append(session)
+        self._dispatch()
+        with self._lock:
+            if session in self.queued:
+                print(f"⏸️ Session {session['session_id']} queued: every port in {FL_PORTS} is busy")
+
+    def cancel(self, session_ids):
+        """Stop sessions the backend reports as cancelled (completed ones exit by themselves)"""
+        with self._lock:
+            for session in [s for s in self.queued if s["session_id"] in session_ids]:
+                self.queued.remove(session)
+                print(f"🛑 Session {session['session_id']} cancelled before it started")
+            for session_id in session_ids:
+                if session_id in self.workers and session_id not in self.cancelled:
+                    self.cancelled.add(session_id)
+                    print(f"🛑 Session {session_id} is no longer training, stopping its worker")
+                    self.workers[session_id][0].terminate()
+
+    def _dispatch(self):
+        """Start queued sessions while there are free ports"""
+        with self._lock:
+            while self.queued:
+                port = self.ports.acquire()
+                if port is None:
+                    return
+                session = self.queued.pop(0)
+                session_id = session["session_id"]
+                ready = self._ctx.Event()
+                proc = self._ctx.Process(
+                    target=run_fl_session,
+                    args=(session_id, session.get("strategy", "FedAvg"), port,
+                          session.get("project_id"), session.get("num_rounds"), ready),
+                    name=f"fl-session-{session_id}"
+                )
+                proc.start()
+                self.workers[session_id] = (proc, port)
+                threading.Thread(target=self._watch, args=(session_id, proc, port, ready), daemon=True).start()
+
+    def _watch(self, session_id, proc, port, ready):
+        # Clients are only pointed at the port once the worker's Flower server listens on it
+        while not ready.wait(timeout=1.0):
+            if not proc.is_alive():
+                break
+        if ready.is_set() and session_id not in self.cancelled:
+            report_server_port(session_id, port)
+
+        proc.join()
+        with self._lock:
+            del self.workers[session_id]
+            cancelled = session_id in self.cancelled
+            self.cancelled.discard(session_id)
+        self.ports.release(port)
+        self._dispatch()
+
+        if cancelled:
+            print(f"💤 Session {session_id} stopped. Port {port} returned to pool.")
+            return
+        # A crashed worker marks the session failed, so retention never treats its rounds as finished
+        status, endpoint = ("finished", "complete") if proc.exitcode == 0 else ("failed", "fail")
+        if proc.exitcode != 0:
+            print(f"⚠️ Session {session_id} worker exited with code {proc.exitcode}")
+        try:
+            requests.post(f"{API_BASE}/api/training/{endpoint}", params={"session_id": session_id}, timeout=10)
+        except Exception as e:
+            print(f"⚠️ Could not mark session {session_id} {status}: {e}")
+        print(f"💤 Session {session_id} {status}. Port {port} returned to pool.")
+
+def report_server_port(session_id, port):
+    """Tell the backend where this session's Flower server listens so clients can find it"""
+    try:
+        requests.post(
+            f"{API_BASE}/api/training/sessions/{session_id}/server",
+            json={"port": port, "host": FL_PUBLIC_HOST},
+            timeout=10
+        )
+    except Exception as e:
+        print(f"⚠️ Could not report port for session {session_id}: {e}")
+
+def wait_for_session(after_session_id, running=()):
+    """Block on the backend's long-poll until a session newer than after_session_id starts,
+    or one of the `running` sessions is cancelled (listed in the reply's `ended`)"""
+    res = requests.get(
+        f"{API_BASE}/api/training/wait",
+        params={"after": after_session_id, "timeout": WAIT_TIMEOUT, "running": list(running)},
+        timeout=WAIT_TIMEOUT + 10
     )
+    res.raise_for_status()
+    return res.json()
 
 def main():
-    print("⏳ FL Server Manager Online (Polling Mode)...")
+    supervisor = SessionSupervisor(PortPool(FL_PORTS))
+    print(f"⏳ FL Server Manager Online (Long-Poll Mode, ports {FL_PORTS})...")
+    last_session_id = 0
     
     while True:
         try:
-            # 1. Check Status
-            res = requests.get(f"{API_BASE}/api/training/status", timeout=5)
-            data = res.json()
+            # 1. Wait for the backend to signal a new session (returns 'idle' on timeout)
+            data = wait_for_session(last_session_id, supervisor.tracked())
+
+            # Sessions cancelled on the backend (e.g. a newer Start for the project) free their ports first
+            supervisor.cancel(data.get("ended", []))
             
             if data.get("status") == "training":
-                session_id = data.get("session_id")
-                strategy_name = data.get("strategy", "FedAvg")
-                
-                # 2. RUN TRAINING (This blocks until 5 rounds finish)
-                run_fl_session(session_id, strategy_name)
-                
-                # 3. Mark Complete
-                requests.post(f"{API_BASE}/api/training/complete")
-                print("💤 Training finished. Returning to idle.")
+                last_session_id = data.get("session_id")
                 
-            time.sleep(POLL_INTERVAL)
+                # 2. RUN TRAINING in a worker process (queued if no port is free); the supervisor marks it complete when it exits
+                supervisor.launch(data)
             
         except Exception as e:
-            print(f"⚠️ Polling Error: {e}")
-            time.sleep(5)
+            print(f"⚠️ Long-poll Error: {e}")
+            time.sleep(RETRY_DELAY)
 
 if __name__ == "__main__":
     main()
     
-# this file is the main entry point for the FL server. It continuously polls the backend for training sessions, dynamically selects the strategy, and reports metrics and models back to the backend.
\ No newline at end of file
+# this file is the main entry point for the FL server. It long-polls the backend for new training sessions, runs each one in its own worker process on a pooled port, dynamically selects the strategy, and reports metrics and models back to the backend.
\ No newline at end of file
@@ -0,0 +1,137 @@
+import queue
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+class BackgroundReporter:
+    """Ships round metrics and model uploads to the backend off the Flower server thread.
+
+    Work goes through a bounded queue drained by one worker thread that reuses a
+    pooled HTTP session and retries with exponential backoff. Consecutive metric
+    reports that pile up while the backend is slow, and the per-client records that
+    come with them, are sent as a single batch call.
+    """
+
+    def __init__(self, api_base, max_queue=64, max_batch=32, max_retries=5,
+                 backoff=0.5, max_backoff=10.0, timeout=30, put_timeout=2.0):
+        self.api_base = api_base
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.put_timeout = put_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._held = None   # Non-metrics item pulled while coalescing, sent next
+        self._thread = threading.Thread(target=self._run, name="fl-reporter", daemon=True)
+        self._thread.start()
+
+    # --- Producer side (called from aggregate_fit) ---
+
+    def report_metrics(self, payload, client_records=()):
+        self._put(("metrics", (payload, list(client_records))))
+
+    def submit(self, name, fn):
+        """Queue an arbitrary upload; fn(session) runs on the worker thread"""
+        self._put((name, fn))
+
+    def _put(self, item):
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+        except queue.Full:
+            print(f"⚠️ Reporter queue full, dropping {item[0]} report")
+
+    def flush(self):
+        """Block until everything queued so far has been sent (or given up on)"""
+        self._queue.join()
+
+    def close(self):
+        self.flush()
+        self._queue.put(("stop", None))
+        self._thread.join()
+        self.session.close()
+
+    # --- Worker side ---
+
+    def _next(self):
+        if self._held is not None:
+            item, self._held = self._held, None
+            return item
+        return self._queue.get()
+
+    def _run(self):
+        while True:
+            kind, value = self._next()
+            if kind == "stop":
+                self._queue.task_done()
+                return
+
+            if kind == "metrics":
+                batch = [value]
+                # Coalesce whatever other round reports are already waiting
+                while len(batch) < self.max_batch:
+                    try:
+                        next_kind, next_value = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if next_kind != "metrics":
+                        self._held = (next_kind, next_value)
+                        break
+                    batch.append(next_value)
+                self._send_metrics(batch)
+                for _ in batch:
+                    self._queue.task_done()
+            else:
+                self._with_retries(kind, value)
+                self._queue.task_done()
+
+    def _send_metrics(self, batch):
+        reports = [payload for payload, _ in batch]
+        client_records = [record for _, records in batch for record in records]
+        if len(reports) == 1 and not client_records:
+            url, body = f"{self.api_base}/api/training/metrics", reports[0]
+        else:
+            url, body = f"{self.api_base}/api/training/metrics/batch", {
+                "session_id": reports[0].get("session_id"), "reports": reports, "client_records": client_records
+            }
+
+        def post(session):
+            return session.post(url, json=body, timeout=self.timeout)
+
+        if self._with_retries("metrics", post):
+            rounds = ", ".join(str(p["round"]) for p in reports)
+            print(f"✅ Reported round(s) {rounds}")
+
+    def _with_retries(self, name, fn):
+        delay = self.backoff
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                res = fn(self.session)
+                # Client errors won't fix themselves; only retry transport errors and 5xx
+                if res is None or res.status_code < 500:
+                    if res is not None and res.status_code >= 400:
+                        print(f"❌ {name} rejected by backend: {res.status_code} {res.text[:200]}")
+                        return False
+                    return True
+                error = f"HTTP {res.status_code}"
+            except requests.RequestException as e:
+                error = str(e)
+            except Exception as e:
+                print(f"❌ {name} failed: {e}")
+                return False
+
+            if attempt < self.max_retries:
+                time.sleep(delay + random.uniform(0, delay / 2))
+                delay = min(delay * 2, self.max_backoff)
+        print(f"❌ {name} failed after {self.max_retries} attempts: {error}")
+        return False
+
+# used by the strategies in dynamic_server.py so aggregate_fit only enqueues work; the next round's configure_fit goes out without waiting on HTTP.
@@ -0,0 +1,87 @@
+import csv
+import importlib.util
+import io
+import os
+import tempfile
+import numpy as np
+import requests
+
+class HoldoutEvaluator:
+    """Flower `evaluate_fn` that scores each global model on the project's holdout CSV.
+
+    The project's model_code and holdout are downloaded and the Keras model is
+    built on the first call only; later rounds just swap in the new weights.
+    If the project has no holdout (or TensorFlow isn't installed here) the
+    evaluator switches itself off and Flower skips centralized evaluation.
+    """
+
+    def __init__(self, api_base, project_id, batch_size=256, timeout=60):
+        self.api_base = api_base
+        self.project_id = project_id
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.enabled = True
+        self._model = None
+        self._x = None
+        self._y = None
+
+    def __call__(self, server_round, parameters, config):
+        if not self.enabled:
+            return None
+        if self._model is None:
+            try:
+                self._load()
+            except Exception as e:
+                print(f"⚠️ Server-side evaluation disabled for project {self.project_id}: {e}")
+                self.enabled = False
+                return None
+
+        self._model.set_weights(parameters)
+        loss, accuracy = self._model.evaluate(self._x, self._y, batch_size=self.batch_size, verbose=0)
+        print(f"🧪 Round {server_round}: holdout Acc={accuracy:.4f}, Loss={loss:.4f} ({len(self._y)} rows)")
+        return float(loss), {"accuracy": float(accuracy)}
+
+    def _load(self):
+        res = requests.get(f"{self.api_base}/api/projects/{self.project_id}/model-code", timeout=self.timeout)
+        res.raise_for_status()
+        project = res.json()
+
+        res = requests.get(f"{self.api_base}/api/projects/{self.project_id}/holdout", timeout=self.timeout)
+        if res.status_code == 404:
+            raise RuntimeError("no holdout dataset registered")
+        res.raise_for_status()
+        self._x, self._y = self._parse_csv(res.text, project.get("target_column") or "target")
+
+        self._model = self._build_model(project["model_code"], self._x.shape[1])
+
+    @staticmethod
+    def _parse_csv(text, target_column):
+        # Same preparation as the clients: features standardized, target column split off
+        reader = csv.reader(io.StringIO(text))
+        header = [c.strip() for c in next(reader)]
+        if target_column not in header:
+            raise RuntimeError(f"holdout has no '{target_column}' column")
+        data = np.array([row for row in reader if row], dtype=np.float32)
+
+        target = header.index(target_column)
+        x = np.delete(data, target, axis=1)
+        y = data[:, target]
+        x = (x - x.mean(axis=0)) / (x.std(axis=0) + 1e-7)
+        return x, y
+
+    @staticmethod
+    def _build_model(model_code, input_shape):
+        import tensorflow  # noqa: F401  (only needed when a holdout is registered)
+
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
+            f.write(model_code)
+            temp_path = f.name
+        try:
+            spec = importlib.util.spec_from_file_location("project_model", temp_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        finally:
+            os.unlink(temp_path)
+        return module.create_model(input_shape)
+
+# used by run_fl_session in dynamic_server.py as the strategies' evaluate_fn, replacing (or thinning out, see CLIENT_EVAL_EVERY) the per-round client evaluation fan-out.
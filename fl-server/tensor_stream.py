@@ -0,0 +1,123 @@
+import io
+import json
+import struct
+import numpy as np
+
+# Compact tensor container used to stream global models to the backend, which
+# stores it as-is as the checkpoint (.flts). Version 2 puts the whole index up
+# front and aligns every buffer, so a stored checkpoint can be np.memmap'ed
+# tensor by tensor (backend/app/services/checkpoint.py reads it):
+#
+#   magic b"FLTS" | version u16 | index length u32                          (little endian)
+#   index JSON    : {"alignment": 64, "tensors": [{"name", "dtype", "shape",
+#                    "fortran_order", "offset", "nbytes"}, ...]}
+#   zero padding to `alignment`, then each raw buffer at its absolute `offset`
+#   (each followed by zero padding to the next multiple of `alignment`)
+#
+# Version 1 (per-tensor JSON header in front of each buffer) is still readable.
+# Raw buffers are written straight from the bytes Flower already holds, so
+# producing the stream copies nothing and needs no pickle or temp file.
+
+MAGIC = b"FLTS"
+VERSION = 2
+ALIGNMENT = 64          # Buffer alignment in the file (cache line / SIMD friendly)
+CHUNK_SIZE = 1 << 20    # Bytes per yielded slice; bounds memory held by the HTTP layer
+
+_STREAM_HEADER = struct.Struct("<4sHI")
+_TENSOR_HEADER = struct.Struct("<I")
+
+def _padding(n, alignment=ALIGNMENT):
+    return -n % alignment
+
+def npy_buffer(tensor_bytes):
+    """Split Flower's .npy-encoded tensor into (header dict, zero-copy memoryview of its data)"""
+    bio = io.BytesIO(tensor_bytes)
+    version = np.lib.format.read_magic(bio)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(bio)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(bio)
+    if dtype.hasobject:
+        raise ValueError("Object arrays can't be streamed as raw buffers")
+
+    data = memoryview(tensor_bytes)[bio.tell():]
+    header = {
+        "dtype": dtype.str,
+        "shape": list(shape),
+        "fortran_order": bool(fortran_order),
+        "nbytes": len(data)
+    }
+    return header, data
+
+def npy_array(tensor_bytes):
+    """Read-only ndarray view over Flower's .npy-encoded tensor, without copying the data"""
+    header, data = npy_buffer(tensor_bytes)
+    array = np.frombuffer(data, dtype=np.dtype(header["dtype"]))
+    return array.reshape(header["shape"], order="F" if header["fortran_order"] else "C")
+
+def build_index(headers, names=None):
+    """Index JSON for buffers described by npy_buffer() headers; offsets are absolute and aligned"""
+    entries = [
+        {"name": names[i] if names else f"tensor_{i}", **{k: h[k] for k in ("dtype", "shape", "fortran_order", "nbytes")}}
+        for i, h in enumerate(headers)
+    ]
+    # Offsets depend on the index length and the index contains the offsets: size it with
+    # placeholder offsets as wide as the final ones can be, then pad the JSON to that length
+    total = sum(e["nbytes"] + _padding(e["nbytes"]) for e in entries)
+    for e in entries:
+        e["offset"] = total + (1 << 40)
+    width = len(json.dumps({"alignment": ALIGNMENT, "tensors": entries}, separators=(",", ":")))
+    offset = _STREAM_HEADER.size + width
+    offset += _padding(offset)
+    for e in entries:
+        e["offset"] = offset
+        offset += e["nbytes"] + _padding(e["nbytes"])
+    index = json.dumps({"alignment": ALIGNMENT, "tensors": entries}, separators=(",", ":")).encode()
+    return index.ljust(width)   # JSON allows trailing whitespace
+
+def iter_tensor_stream(tensors, chunk_size=CHUNK_SIZE, names=None):
+    """Yield the container for a list of .npy-encoded tensors (e.g. Parameters.tensors)"""
+    buffers = [npy_buffer(t) for t in tensors]
+    index = build_index([header for header, _ in buffers], names)
+    yield _STREAM_HEADER.pack(MAGIC, VERSION, len(index)) + index
+    yield bytes(_padding(_STREAM_HEADER.size + len(index)))
+    for _, data in buffers:
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+        yield bytes(_padding(len(data)))
+
+def _read_exact(f, n):
+    buf = f.read(n)
+    if len(buf) != n:
+        raise ValueError("Truncated tensor stream")
+    return buf
+
+def _as_array(data, header):
+    array = np.frombuffer(data, dtype=np.dtype(header["dtype"]))
+    return array.reshape(header["shape"], order="F" if header["fortran_order"] else "C")
+
+def read_tensor_stream(f):
+    """Read a container (version 1 or 2) back into a list of NumPy arrays"""
+    magic, version, count = _STREAM_HEADER.unpack(_read_exact(f, _STREAM_HEADER.size))
+    if magic != MAGIC:
+        raise ValueError("Not a tensor stream")
+
+    if version == 1:
+        arrays = []
+        for _ in range(count):
+            (header_len,) = _TENSOR_HEADER.unpack(_read_exact(f, _TENSOR_HEADER.size))
+            header = json.loads(_read_exact(f, header_len))
+            arrays.append(_as_array(_read_exact(f, header["nbytes"]), header))
+        return arrays
+    if version != VERSION:
+        raise ValueError(f"Unsupported tensor stream version {version}")
+
+    # Version 2: `count` is the index length; buffers follow in index order
+    index = json.loads(_read_exact(f, count))
+    position = _STREAM_HEADER.size + count
+    arrays = []
+    for entry in index["tensors"]:
+        _read_exact(f, entry["offset"] - position)
+        arrays.append(_as_array(_read_exact(f, entry["nbytes"]), entry))
+        position = entry["offset"] + entry["nbytes"]
+    return arrays
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the server modules the way dynamic_server.py does (fl-server/ on the path)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from flwr.common import ndarrays_to_parameters
+from flwr.server.strategy.aggregate import aggregate
+
+from aggregation import StreamingAggregator
+from tensor_stream import npy_array
+
+SHAPES = [(300, 300), (300,), (300, 10), (10,)]
+
+def make_clients(num_clients, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        ([rng.standard_normal(shape).astype(np.float32) for shape in SHAPES], int(rng.integers(10, 500)))
+        for _ in range(num_clients)
+    ]
+
+def run(clients, workers, min_shard_size=1 << 10):
+    aggregator = StreamingAggregator(workers=workers, min_shard_size=min_shard_size)
+    for weights, num_examples in clients:
+        aggregator.add(weights, num_examples)
+    assert aggregator.parallel == (workers > 1)
+    return aggregator.result()
+
+def test_sharded_result_is_bit_identical_to_serial():
+    clients = make_clients(7)
+    serial = run(clients, workers=1)
+    for workers in (2, 4):
+        sharded = run(clients, workers=workers)
+        for a, b in zip(serial, sharded):
+            assert a.dtype == b.dtype
+            assert np.array_equal(a.view(np.uint32), b.view(np.uint32))
+
+def test_matches_flower_aggregate():
+    clients = make_clients(5)
+    expected = aggregate(clients)
+    for a, b in zip(run(clients, workers=1), expected):
+        np.testing.assert_allclose(a, b, rtol=1e-5, atol=1e-6)
+
+def test_folds_read_only_views_of_npy_tensors():
+    clients = make_clients(3)
+    aggregator = StreamingAggregator()
+    for weights, num_examples in clients:
+        tensors = ndarrays_to_parameters(weights).tensors
+        aggregator.add([npy_array(t) for t in tensors], num_examples)
+    for a, b in zip(aggregator.result(), aggregate(clients)):
+        np.testing.assert_allclose(a, b, rtol=1e-5, atol=1e-6)
+
+def test_keeps_client_dtypes():
+    weights = [np.arange(6, dtype=np.float64).reshape(2, 3), np.ones(4, dtype=np.float16)]
+    aggregator = StreamingAggregator()
+    aggregator.add(weights, 1)
+    aggregator.add(weights, 3)
+    result = aggregator.result()
+    assert [a.dtype for a in result] == [np.float64, np.float16]
+    np.testing.assert_allclose(result[0], weights[0])
+
+def test_rejects_mismatched_tensors():
+    aggregator = StreamingAggregator()
+    aggregator.add([np.zeros((2, 2), dtype=np.float32)], 1)
+    with pytest.raises(ValueError):
+        aggregator.add([np.zeros((3, 2), dtype=np.float32)], 1)
+    with pytest.raises(ValueError):
+        aggregator.add([np.zeros((2, 2), dtype=np.float32)] * 2, 1)
+
+def test_no_results():
+    assert StreamingAggregator(workers=4).result() is None
@@ -0,0 +1,226 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+from flwr.common import Code, FitRes, Status, ndarrays_to_parameters, parameters_to_ndarrays
+
+import dynamic_server
+from dynamic_server import BufferedAsyncServer, CustomFedAvg, CustomFedBuff, PortPool, SessionSupervisor
+
+class FakeReporter:
+    timeout = 1
+
+    def __init__(self):
+        self.reports = []
+
+    def report_metrics(self, payload, client_records=()):
+        self.reports.append((payload, list(client_records)))
+
+    def submit(self, name, fn):
+        pass
+
+class FakeProxy:
+    """Stands in for a Flower ClientProxy: fit() replays `outcomes` (weights or an exception), then repeats the last"""
+
+    def __init__(self, cid, outcomes, num_examples=10):
+        self.cid = cid
+        self.outcomes = list(outcomes)
+        self.num_examples = num_examples
+        self.calls = 0
+
+    def fit(self, ins, timeout):
+        self.calls += 1
+        outcome = self.outcomes[min(self.calls, len(self.outcomes)) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FitRes(Status(Code.OK, ""), ndarrays_to_parameters(outcome), self.num_examples,
+                      {"client_id": self.cid, "accuracy": 0.5, "loss": 1.0})
+
+class FakeClientManager:
+    def __init__(self, proxies):
+        self.proxies = {p.cid: p for p in proxies}
+
+    def all(self):
+        return dict(self.proxies)
+
+    def wait_for(self, num_clients, timeout=None):
+        return True
+
+def fit_res(weights, num_examples):
+    return FitRes(Status(Code.OK, ""), ndarrays_to_parameters(weights), num_examples, {"accuracy": 0.5})
+
+def make_strategy(cls, **kwargs):
+    strategy = cls(min_fit_clients=1, min_available_clients=1, fraction_evaluate=0.0, **kwargs)
+    strategy.reporter = FakeReporter()
+    return strategy
+
+# --- Reporting ---
+
+def test_round_report_carries_bytes_sent():
+    strategy = make_strategy(CustomFedAvg)
+    weights = [np.ones((8, 4), dtype=np.float32), np.zeros(4, dtype=np.float32)]
+    results = [(FakeProxy("a", []), fit_res(weights, 3)), (FakeProxy("b", []), fit_res(weights, 5))]
+    expected = sum(len(t) for t in results[0][1].parameters.tensors)
+
+    parameters, _ = strategy.aggregate_fit(1, results, [])
+    strategy.flush_report()
+
+    np.testing.assert_allclose(parameters_to_ndarrays(parameters)[0], weights[0])
+    (payload, records), = strategy.reporter.reports
+    assert payload["num_clients"] == 2
+    assert [r["bytes_sent"] for r in records] == [expected, expected]
+
+# --- FedBuff ---
+
+def run_fedbuff(proxies, num_rounds, buffer_size, max_failures=3):
+    initial = [np.zeros(3, dtype=np.float32)]
+    strategy = make_strategy(CustomFedBuff, buffer_size=buffer_size,
+                             initial_parameters=ndarrays_to_parameters(initial))
+    server = BufferedAsyncServer(client_manager=FakeClientManager(proxies), strategy=strategy,
+                                 max_failures=max_failures)
+    server.POLL_INTERVAL = 0.05
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(history=server.fit(num_rounds, timeout=None)))
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive(), "BufferedAsyncServer.fit hung"
+    return server, strategy
+
+def test_fedbuff_retries_a_failed_client_right_away():
+    # A single client that fails once: it must be sent the model again without waiting for a version bump
+    proxy = FakeProxy("a", [RuntimeError("boom"), [np.ones(3, dtype=np.float32)]])
+    server, strategy = run_fedbuff([proxy], num_rounds=1, buffer_size=1)
+    assert proxy.calls >= 2
+    np.testing.assert_allclose(parameters_to_ndarrays(server.parameters)[0], np.ones(3))
+    assert [payload["round"] for payload, _ in strategy.reporter.reports] == [1]
+
+def test_fedbuff_stops_when_every_client_keeps_failing():
+    proxies = [FakeProxy("a", [RuntimeError("down")]), FakeProxy("b", [RuntimeError("down")])]
+    server, strategy = run_fedbuff(proxies, num_rounds=3, buffer_size=2, max_failures=2)
+    assert [p.calls for p in proxies] == [2, 2]
+    assert strategy.reporter.reports == []
+
+# --- Session supervisor ---
+
+def test_port_pool_never_blocks():
+    pool = PortPool("8080-8081, 9000")
+    assert [pool.acquire(), pool.acquire(), pool.acquire()] == [8080, 8081, 9000]
+    assert pool.acquire() is None
+    pool.release(8081)
+    assert pool.acquire() == 8081
+    with pytest.raises(ValueError):
+        PortPool(" , ")
+
+class FakeProcess:
+    def __init__(self, target, args, name):
+        self.args = args
+        self.exitcode = None
+        self._exited = threading.Event()
+        FakeContext.started.append(self)
+
+    def start(self):
+        pass
+
+    def bind(self):
+        self.args[-1].set()     # The worker's `ready` event, set from Server.fit
+
+    def exit(self, code=0):
+        self.exitcode = code
+        self._exited.set()
+
+    def terminate(self):
+        self.exit(-15)
+
+    def is_alive(self):
+        return not self._exited.is_set()
+
+    def join(self, timeout=None):
+        self._exited.wait(timeout)
+
+class FakeContext:
+    started = []
+    Event = threading.Event
+    Process = FakeProcess
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    reported, completed = [], []
+    monkeypatch.setattr(dynamic_server, "report_server_port", lambda session_id, port: reported.append((session_id, port)))
+    monkeypatch.setattr(dynamic_server.requests, "post",
+                        lambda url, params=None, timeout=None: completed.append((url.rsplit("/", 1)[-1], params["session_id"])))
+    FakeContext.started = []
+    supervisor = SessionSupervisor(PortPool("8080"))
+    supervisor._ctx = FakeContext
+    supervisor.reported, supervisor.completed = reported, completed
+    return supervisor
+
+def test_port_reported_only_once_the_worker_is_bound(supervisor):
+    supervisor.launch({"session_id": 1})
+    proc, = FakeContext.started
+    time.sleep(0.1)
+    assert supervisor.reported == []
+    proc.bind()
+    wait_until(lambda: supervisor.reported == [(1, 8080)])
+    proc.exit()
+    wait_until(lambda: supervisor.completed == [("complete", 1)])
+    assert supervisor.tracked() == []
+
+def test_sessions_queue_without_blocking_and_start_when_a_port_frees(supervisor):
+    supervisor.launch({"session_id": 1})
+    supervisor.launch({"session_id": 2})     # No free port: returns at once, session queued
+    assert supervisor.tracked() == [1, 2]
+    assert len(FakeContext.started) == 1
+
+    FakeContext.started[0].exit()
+    wait_until(lambda: len(FakeContext.started) == 2)
+    assert FakeContext.started[1].args[0] == 2
+    wait_until(lambda: supervisor.completed == [("complete", 1)])    # Before the next test patches requests.post
+
+def test_cancelled_sessions_are_stopped_and_free_their_port(supervisor):
+    supervisor.launch({"session_id": 1})
+    supervisor.launch({"session_id": 2})
+    supervisor.launch({"session_id": 3})
+    supervisor.cancel([1, 2])
+
+    first = FakeContext.started[0]
+    assert first.exitcode == -15                # Running worker terminated
+    wait_until(lambda: len(FakeContext.started) == 2)
+    assert FakeContext.started[1].args[0] == 3  # Queued session 2 was dropped, 3 took the port
+    assert supervisor.tracked() == [3]
+    assert supervisor.completed == []           # Cancelled sessions are not marked complete
+
+def test_crashed_worker_marks_the_session_failed(supervisor):
+    supervisor.launch({"session_id": 1})
+    FakeContext.started[0].exit(1)
+    wait_until(lambda: supervisor.completed == [("fail", 1)])
+
+def test_completed_session_is_left_to_exit_on_its_own(supervisor, monkeypatch):
+    # After the last round's report the backend completes the session but does not list it in
+    # `ended`; the manager keeps polling and must let the worker finish its drain
+    replies = [{"status": "training", "session_id": 1, "ended": []}, {"status": "idle", "ended": []},
+               {"status": "idle", "ended": []}]
+    polls = []
+
+    def fake_wait(after, running):
+        polls.append(list(running))
+        if not replies:
+            raise KeyboardInterrupt
+        return replies.pop(0)
+
+    monkeypatch.setattr(dynamic_server, "wait_for_session", fake_wait)
+    monkeypatch.setattr(dynamic_server, "SessionSupervisor", lambda ports: supervisor)
+    with pytest.raises(KeyboardInterrupt):
+        dynamic_server.main()
+
+    proc, = FakeContext.started
+    assert polls == [[], [1], [1], [1]]
+    assert proc.is_alive() and proc.exitcode is None    # Never terminated
+    proc.exit()
+    wait_until(lambda: supervisor.completed == [("complete", 1)])
@@ -0,0 +1,41 @@
+import io
+import json
+import struct
+
+import numpy as np
+from flwr.common import ndarrays_to_parameters
+
+from tensor_stream import ALIGNMENT, iter_tensor_stream, npy_array, read_tensor_stream
+
+def make_arrays():
+    rng = np.random.default_rng(0)
+    return [
+        rng.standard_normal((17, 5)).astype(np.float32),
+        np.asfortranarray(rng.standard_normal((4, 3))),
+        np.arange(7, dtype=np.int64),
+        np.zeros((0,), dtype=np.float32),
+    ]
+
+def test_round_trip():
+    arrays = make_arrays()
+    tensors = ndarrays_to_parameters(arrays).tensors
+    data = b"".join(bytes(chunk) for chunk in iter_tensor_stream(tensors, chunk_size=32))
+    for original, restored in zip(arrays, read_tensor_stream(io.BytesIO(data))):
+        assert restored.dtype == original.dtype
+        np.testing.assert_array_equal(restored, original)
+
+def test_buffers_are_aligned():
+    tensors = ndarrays_to_parameters(make_arrays()).tensors
+    data = b"".join(bytes(chunk) for chunk in iter_tensor_stream(tensors))
+    assert len(data) % ALIGNMENT == 0
+
+    _, _, index_length = struct.unpack("<4sHI", data[:10])
+    index = json.loads(data[10:10 + index_length])
+    for entry in index["tensors"]:
+        assert entry["offset"] % ALIGNMENT == 0
+
+def test_npy_array_is_a_view():
+    tensor = ndarrays_to_parameters([np.arange(10, dtype=np.float32)]).tensors[0]
+    array = npy_array(tensor)
+    assert not array.flags.writeable
+    np.testing.assert_array_equal(array, np.arange(10, dtype=np.float32))
@@ -138,6 +138,15 @@ export const apiService = {
       });
       return res.data;
     },
+    // Centralized training runs as a background job; these follow/cancel it
+    getCentralizedJob: async (jobId) => {
+      const res = await api.get(`/training/centralized/jobs/${jobId}`);
+      return res.data;
+    },
+    cancelCentralizedJob: async (jobId) => {
+      const res = await api.post(`/training/centralized/jobs/${jobId}/cancel`);
+      return res.data;
+    },
     getComparison: async () => {
       const res = await api.get("/training/comparison");
       return res.data;
@@ -150,13 +159,23 @@ export const apiService = {
       const res = await api.post("/training/metrics", metricsData);
       return res.data;
     },
-    getHistory: async (sessionId = null) => {
-      const url = sessionId ? `/metrics?session_id=${sessionId}` : "/metrics";
-      const res = await api.get(url);
+    getHistory: async (sessionId = null, maxPoints = null) => {
+      // maxPoints: server-side min/max downsampling for long sessions (peaks and dips are kept)
+      const res = await api.get("/metrics", {
+        params: { session_id: sessionId || undefined, max_points: maxPoints || undefined }
+      });
+      return res.data;
+    },
+    getLatest: async (maxPoints = null) => {
+      const res = await api.get("/metrics/latest", { params: { max_points: maxPoints || undefined } });
       return res.data;
     },
-    getLatest: async () => {
-      const res = await api.get("/metrics/latest");
+    getTimings: async (sessionIds = []) => {
+      // Per-round timing breakdown; several sessions can be compared side by side
+      const res = await api.get("/metrics/timings", {
+        params: { session_id: sessionIds },
+        paramsSerializer: { indexes: null } // session_id=1&session_id=2
+      });
       return res.data;
     }
   },
@@ -1,7 +1,11 @@
 // frontend/src/components/ClientList.jsx
 import React from 'react';
 
-const ClientList = ({ clients = [] }) => {
+const ClientList = ({ clients = [], latestMetrics = null }) => {
+  // Per-client fit latency and deadline misses from the latest round (see ROUND_DEADLINE on the FL server)
+  const latencies = latestMetrics?.client_latencies || {};
+  const stragglers = latestMetrics?.stragglers || [];
+
   return (
     <div className="mb-8 animate-fadeIn">
       <div className="flex items-center justify-between mb-4">
@@ -25,8 +29,11 @@ const ClientList = ({ clients = [] }) => {
              </p>
            </div>
         ) : (
-          clients.map((client, index) => (
-            <div key={index} className="bg-white p-4 rounded-xl shadow-sm border-l-4 border-green-500 flex justify-between items-center transition hover:shadow-md transform hover:-translate-y-0.5">
+          clients.map((client, index) => {
+            const isStraggler = stragglers.includes(client.client_id);
+            const latency = latencies[client.client_id];
+            return (
+            <div key={index} className={`bg-white p-4 rounded-xl shadow-sm border-l-4 ${isStraggler ? 'border-amber-500' : 'border-green-500'} flex justify-between items-center transition hover:shadow-md transform hover:-translate-y-0.5`}>
               <div>
                 <div className="font-bold text-gray-900 text-sm">{client.client_id}</div>
                 <div className="text-xs text-gray-500 flex items-center gap-1 mt-1">
@@ -34,12 +41,15 @@ const ClientList = ({ clients = [] }) => {
                     <span className="animate-ping absolute inline-flex h-full w-full rounded-full bg-green-400 opacity-75"></span>
                     <span className="relative inline-flex rounded-full h-2 w-2 bg-green-500"></span>
                   </span>
-                  Ready to train
+                  {isStraggler
+                    ? <span className="text-amber-600 font-semibold">Straggler (missed round deadline)</span>
+                    : latency !== undefined ? `Fit in ${latency.toFixed(1)}s` : 'Ready to train'}
                 </div>
               </div>
               <div className="text-2xl opacity-80">🏥</div>
             </div>
-          ))
+            );
+          })
         )}
       </div>
     </div>
@@ -7,6 +7,7 @@ const ComparisonPanel = ({ token }) => { // Token prop is still here to trigger
   const [loading, setLoading] = useState(false);
   const [results, setResults] = useState(null);
   const [error, setError] = useState('');
+  const [job, setJob] = useState(null); // Background centralized training job being followed
 
   const fetchComparison = useCallback(async () => {
     try {
@@ -28,6 +29,25 @@ const ComparisonPanel = ({ token }) => { // Token prop is still here to trigger
     fetchComparison();
   }, [fetchComparison]);
 
+  // Follow the queued job until it finishes (training runs in a backend worker process)
+  useEffect(() => {
+    if (!job || ['completed', 'failed', 'cancelled'].includes(job.status)) return;
+    const timer = setTimeout(async () => {
+      try {
+        const latest = await apiService.training.getCentralizedJob(job.job_id);
+        setJob(latest);
+        if (latest.status === 'completed') {
+          await fetchComparison(); // Refresh results on success
+        } else if (latest.status === 'failed') {
+          setError(latest.error || 'Training failed');
+        }
+      } catch (err) {
+        console.error("Failed to fetch job status", err);
+      }
+    }, 2000);
+    return () => clearTimeout(timer);
+  }, [job, fetchComparison]);
+
   const handleRunCentralized = async () => {
     if (!file) return;
     setLoading(true);
@@ -35,8 +55,8 @@ const ComparisonPanel = ({ token }) => { // Token prop is still here to trigger
     
     try {
       // FIX: Use apiService for file upload
-      await apiService.training.runCentralized(file);
-      await fetchComparison(); // Refresh results on success
+      const res = await apiService.training.runCentralized(file);
+      setJob(res.job);
     } catch (err) {
       setError(err.response?.data?.detail || 'Training failed');
     } finally {
@@ -44,6 +64,13 @@ const ComparisonPanel = ({ token }) => { // Token prop is still here to trigger
     }
   };
 
+  const handleCancel = async () => {
+    if (!job) return;
+    setJob(await apiService.training.cancelCentralizedJob(job.job_id));
+  };
+
+  const jobActive = job && !['completed', 'failed', 'cancelled'].includes(job.status);
+
   // Safe check to see if we have valid comparison data
   const hasData = results && results.federated && results.centralized;
 
@@ -88,16 +115,35 @@ const ComparisonPanel = ({ token }) => { // Token prop is still here to trigger
             />
             <button
               onClick={handleRunCentralized}
-              disabled={loading || !file}
+              disabled={loading || jobActive || !file}
               className={`px-6 py-2.5 rounded-lg font-bold text-white shadow-sm transition-all whitespace-nowrap ${
-                loading || !file
+                loading || jobActive || !file
                   ? 'bg-gray-400 cursor-not-allowed' 
                   : 'bg-blue-600 hover:bg-blue-700 hover:shadow-md transform hover:-translate-y-0.5'
               }`}
             >
-              {loading ? 'Training Model...' : 'Run Training'}
+              {loading ? 'Uploading...' : jobActive ? 'Training Model...' : 'Run Training'}
             </button>
+            {jobActive && (
+              <button
+                onClick={handleCancel}
+                disabled={job.status === 'cancelling'}
+                className="px-4 py-2.5 rounded-lg font-semibold text-red-600 bg-white border border-red-200 hover:bg-red-50 whitespace-nowrap"
+              >
+                {job.status === 'cancelling' ? 'Cancelling...' : 'Cancel'}
+              </button>
+            )}
           </div>
+          {jobActive && (
+            <div className="mt-3 text-sm text-blue-800">
+              {job.progress
+                ? `Epoch ${job.progress.epoch}/${job.progress.epochs} · accuracy ${job.progress.accuracy.toFixed(3)} · loss ${job.progress.loss.toFixed(3)}`
+                : job.status === 'queued' ? 'Waiting for a free training worker...' : 'Starting...'}
+            </div>
+          )}
+          {job?.status === 'cancelled' && (
+            <div className="mt-3 text-sm text-gray-500">Centralized training was cancelled.</div>
+          )}
           {error && (
             <div className="mt-3 p-2 bg-red-100 text-red-700 text-sm rounded border border-red-200">
               ⚠️ {error}
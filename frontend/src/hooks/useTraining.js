@@ -64,6 +64,11 @@ export const useTraining = (token) => {
             setMetrics(prev => [...prev, msg.data]);
             break;
 
+          case 'metrics_batch':
+            // Several rounds (and per-client records) ingested at once; append the round reports in order
+            setMetrics(prev => [...prev, ...msg.data.reports]);
+            break;
+
           case 'training_started':
             setStatus('training');
             setMetrics([]); // Clear old metrics for new session
@@ -74,6 +79,10 @@ export const useTraining = (token) => {
             fetchData(); // Refresh models list to show new global model
             break;
 
+          case 'training_failed':
+            setStatus('idle'); // The session's FL server crashed before its last round
+            break;
+
           case 'client_registered':
             // add new client to clients list with status 'online' or update existing client's status to 'online'
             setClients(prev => {
@@ -87,6 +96,11 @@ export const useTraining = (token) => {
             fetchData(); // Refresh models
             break;
 
+          case 'centralized_progress':
+          case 'centralized_job':
+            // Per-epoch progress / state of background centralized jobs (ComparisonPanel follows its own job)
+            break;
+
           default:
             console.warn("Unknown WebSocket message type:", msg.type);
             break;
@@ -91,7 +91,7 @@ const Dashboard = ({ token, onLogout }) => {
                 <Charts metrics={metrics} />
               </div>
               <div className="lg:col-span-1">
-                <ClientList clients={clients} />
+                <ClientList clients={clients} latestMetrics={metrics[metrics.length - 1]} />
               </div>
             </div>
           </div>